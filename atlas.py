@@ -0,0 +1,184 @@
+'''Packs every frame the game draws into one file of raw pixels, so loading
+them is a single read with no decoding, transforming or copying.
+
+Build it from the sprite sheet, from the repository root, with:
+    python atlas.py'''
+
+import mmap
+import os
+import struct
+
+import pygame as pg
+from pygame.math import Vector2
+
+from settings import *
+from sprites import Spritesheet
+
+# file header: magic, format version, width and height in pixels, number of
+# frames and the offset of the pixels, which follow the index
+HEADER = struct.Struct('<4sHHHHI')
+MAGIC = b'PMAT'
+VERSION = 1
+
+# each frame in the index: its group, row and column, and where it is in the
+# atlas in pixels
+ENTRY = struct.Struct('<BBBHH')
+
+# frames are looked up as frames[group][row][column]
+GROUPS = (
+    'pacman',  # eating facing right, up, down and left, then dying
+    'ghost',  # the four ghosts, eaten, frightened and one unused row
+    'pellet',  # a pellet and the two frames of a power pellet
+    'fruit',  # the bonus fruits
+)
+
+# pixels are stored in this byte order, with alpha instead of a colour key
+PIXEL_FORMAT = 'BGRA'
+
+
+def slice_frames(spritesheet_file):
+    '''Slice every frame out of the sprite sheet, making the rotated and
+    flipped ones. Needs a display mode to have been set.'''
+
+    spritesheet = Spritesheet(spritesheet_file)
+
+    def slice_frame_sequence(coords, num_frames):
+        '''Slice a sequence of contiguous frames.'''
+        frames = []
+        for i in range(num_frames):
+            frames.append(spritesheet.get_image(
+                coords.x, coords.y, TILESIZE, TILESIZE))
+            coords.x += TILESIZE
+        return frames
+
+    pacman_frames = [[], [], [], []]
+    ghost_frames = [[], [], [], [], [], [], []]
+
+    # slice Pac-Man's eating frames, he will be facing right
+    pacman_frames[0] = slice_frame_sequence(Vector2(60, 0), 4)
+
+    # using the sliced eating frames, create eating frames for each
+    # orientation, this is faster than rotating frames at run time
+    angle = 90
+    for orientation in range(1, 4):
+        for i in range(4):
+            if orientation != 3:
+                # append up and down orientations
+                pacman_frames[orientation].append(
+                    pg.transform.rotate(pacman_frames[0][i], angle))
+            else:
+                # flip the sprite horizontally
+                pacman_frames[orientation].append(
+                    pg.transform.flip(pacman_frames[0][i], True, False))
+        angle -= 180
+
+    # slice death frames
+    pacman_frames.append(slice_frame_sequence(Vector2(60, 20), 4))
+
+    # slice ghost frames
+    slice_coords = Vector2(0, 0)
+    for frame_trio in range(7):
+        ghost_frames[frame_trio] = slice_frame_sequence(slice_coords, 3)
+
+        # append a flipped frame after each ghost colour
+        ghost_frames[frame_trio].append(pg.transform.flip(
+            ghost_frames[frame_trio][1], True, False))
+        slice_coords.y += TILESIZE
+        slice_coords.x = 0
+
+    return {'pacman': pacman_frames,
+            'ghost': ghost_frames,
+            'pellet': [slice_frame_sequence(Vector2(60, 40), 3)],
+            'fruit': [slice_frame_sequence(Vector2(60, 60), 4)]}
+
+
+def pack_atlas(frames):
+    '''Lay the frames out one row of a group to a row of the atlas and
+    return the atlas file's contents.'''
+
+    rows = [(group, row, images) for group in GROUPS
+            for row, images in enumerate(frames[group])]
+    width = max(len(images) for group, row, images in rows) * TILESIZE
+    height = len(rows) * TILESIZE
+
+    # what the colour key hid is left transparent
+    atlas = pg.Surface((width, height), pg.SRCALPHA)
+    index = []
+    for atlas_row, (group, row, images) in enumerate(rows):
+        y = atlas_row * TILESIZE
+        for column, image in enumerate(images):
+            x = column * TILESIZE
+            atlas.blit(image, (x, y))
+            index.append(ENTRY.pack(GROUPS.index(group), row, column, x, y))
+
+    # keep the pixels word aligned, so they can be used where they lie
+    offset = HEADER.size + ENTRY.size * len(index)
+    offset += -offset % 16
+    header = HEADER.pack(MAGIC, VERSION, width, height, len(index), offset)
+    data = header + b''.join(index)
+    return (data + bytes(offset - len(data))
+            + pg.image.tobytes(atlas, PIXEL_FORMAT))
+
+
+def read_atlas(data):
+    '''Make the frames from the contents of an atlas file, as subsurfaces of
+    one surface sharing the memory of 'data', which must be writable and
+    stay alive as long as they do.'''
+
+    magic, version, width, height, count, offset = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} sprite atlas")
+
+    pixels = memoryview(data)[offset:offset + width * height * 4]
+    atlas = pg.image.frombuffer(pixels, (width, height), PIXEL_FORMAT)
+
+    frames = {group: [] for group in GROUPS}
+    for entry in range(count):
+        group, row, column, x, y = ENTRY.unpack_from(
+            data, HEADER.size + entry * ENTRY.size)
+        rows = frames[GROUPS[group]]
+        while len(rows) <= row:
+            rows.append([])
+        images = rows[row]
+        while len(images) <= column:
+            images.append(None)
+        images[column] = atlas.subsurface((x, y, TILESIZE, TILESIZE))
+    return frames
+
+
+def load_frames(spritesheet_file, atlas_file):
+    '''Every frame the game draws, mapped straight from the atlas file when
+    it's at least as new as the sprite sheet, otherwise sliced from the
+    sprite sheet and packed the same way in memory.'''
+
+    if (os.path.exists(atlas_file) and os.path.getmtime(atlas_file)
+            >= os.path.getmtime(spritesheet_file)):
+        with open(atlas_file, 'rb') as file:
+            # the mapping stays open as long as the frames use it. Surfaces
+            # don't check their memory can be written to, so it's mapped
+            # copy on write, and drawing onto a frame never touches the file
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    else:
+        # writable for the same reason
+        data = bytearray(pack_atlas(slice_frames(spritesheet_file)))
+    return read_atlas(data)
+
+
+def main():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pg.display.init()
+    # images need a display mode to be converted to
+    pg.display.set_mode((1, 1))
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    spritesheet_file = os.path.join(root, 'img', SPRITESHEET)
+    atlas_file = os.path.join(root, 'img', SPRITE_ATLAS)
+
+    data = pack_atlas(slice_frames(spritesheet_file))
+    with open(atlas_file, 'wb') as file:
+        file.write(data)
+    print(f"Sprite atlas written to {atlas_file}, {len(data)} bytes")
+
+
+if __name__ == '__main__':
+    main()
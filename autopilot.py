@@ -0,0 +1,746 @@
+import math
+import time
+from collections import deque
+
+from settings import *
+from junctions import DIRECTIONS, REVERSE, JunctionGraph, open_neighbours
+
+GRID_COLUMNS = int(GRID_WIDTH)
+GRID_ROWS = int(GRID_HEIGHT)
+
+SCATTER, CHASE, FRIGHT, EATEN = range(4)
+
+# how the search scores what happens along a path
+DEATH_VALUE = -1000
+GHOST_VALUE = 200
+NEAREST_PELLET_WEIGHT = .1  # per tile to the nearest pellet at a leaf
+MAX_CORRIDOR = 20  # give up following a corridor after this many tiles
+# a search stops this many seconds short of its budget, which is about what
+# finishing the tick or event it's on and unwinding takes
+DEADLINE_MARGIN = .0001
+
+# Pac-Man and a ghost meet when their hitboxes overlap, which for the real
+# game's 8 pixel hitboxes is when they're this many tiles apart
+CATCH_DISTANCE = 8 / TILESIZE
+# slack for times and positions adding up to an event a hair short of it
+EPSILON = 1e-9
+
+
+class ModelGhost:
+    '''A ghost in the forward model, moving a tile at a time.'''
+
+    __slots__ = ('ghost', 'tile', 'direction', 'progress', 'mode',
+                 'mode_timer', 'scatter_time', 'fright_timer', 'first_move')
+
+    def __init__(self, ghost):
+        self.ghost = ghost  # the real ghost, for its personality and timings
+
+    def get_state(self):
+        return (self.tile, self.direction, self.progress, self.mode,
+                self.mode_timer, self.scatter_time, self.fright_timer,
+                self.first_move)
+
+    def set_state(self, state):
+        (self.tile, self.direction, self.progress, self.mode,
+         self.mode_timer, self.scatter_time, self.fright_timer,
+         self.first_move) = state
+
+
+class ForwardModel:
+    '''Tile-level model of the level for the autopilot to search with.
+
+    Pac-Man moves exactly one tile per tick and the ghosts move their share
+    of tiles at their own speeds, choosing directions with the same rules as
+    'Ghost.choose_direction' and targeting with each ghost's own
+    'chase_target'. Scatter/chase and fright timers tick along with it.
+    Frightened ghosts take their first open direction rather than a random
+    one, and Clyde scatters for as long as Pac-Man is in his radius rather
+    than for a fixed time.'''
+
+    def __init__(self, game):
+        self.game = game
+
+        # the open neighbour in each direction of every open tile, None when
+        # it's a wall
+        self.neighbours = open_neighbours(game.walls)
+
+        self.noup_tiles = {(int(coords.x) // TILESIZE,
+                            int(coords.y) // TILESIZE)
+                           for coords in game.noup_coords}
+        self.tick = TILESIZE / game.player.speed
+        self.ghosts = [ModelGhost(ghost) for ghost in
+                       (game.blinky, game.pinky, game.inky, game.clyde)]
+
+        # by time.perf_counter, following a corridor raises TimeoutError
+        # once this has passed, so that a search keeps to its budget
+        self.deadline = math.inf
+
+    def tile_of(self, position):
+        '''Tile a position is in, wrapped onto the grid for the tunnel.'''
+
+        return (int(position.x + TILESIZE * .5) // TILESIZE % GRID_COLUMNS,
+                int(position.y + TILESIZE * .5) // TILESIZE)
+
+    def direction_index(self, direction):
+        return DIRECTIONS.index((int(direction.x), int(direction.y)))
+
+    def sync(self):
+        '''Copy the state of the real pellets and ghosts into the model.'''
+
+        game = self.game
+        # some tiles have pellets stacked on them, so store their total score
+        self.pellets = {}
+        self.power_tiles = set()
+        for pellet in game.pellets:
+            if not pellet.bonus:
+                tile = self.tile_of(pellet.position)
+                self.pellets[tile] = (self.pellets.get(tile, 0)
+                                      + pellet.eaten_score)
+                if pellet.powered:
+                    self.power_tiles.add(tile)
+
+        for model in self.ghosts:
+            ghost = model.ghost
+            model.tile = self.tile_of(ghost.last_tile)
+            if ghost.direction.length_squared():
+                model.direction = self.direction_index(ghost.direction)
+                model.progress = (ghost.position.distance_to(ghost.last_tile)
+                                  / TILESIZE)
+            else:
+                model.direction = 2
+                model.progress = 0
+            if model.tile not in self.neighbours:
+                model.tile = self.tile_of(ghost.position)
+                model.progress = 0
+
+            if ghost.eaten_mode:
+                model.mode = EATEN
+            elif ghost.fright_mode:
+                model.mode = FRIGHT
+            elif ghost.scatter_mode and not ghost.ignore_scatter:
+                model.mode = SCATTER
+            else:
+                model.mode = CHASE
+            model.mode_timer = ghost.state_timer
+            model.scatter_time = ghost.scatter_time
+            model.fright_timer = ghost.fright_timer
+            model.first_move = ghost.first_move
+
+    def pellet_distances(self):
+        '''Distance in tiles from every open tile to its nearest pellet.'''
+
+        distances = dict.fromkeys(self.pellets, 0)
+        queue = deque(self.pellets)
+        while queue:
+            tile = queue.popleft()
+            distance = distances[tile] + 1
+            for neighbour in self.neighbours[tile]:
+                if neighbour is not None and neighbour not in distances:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
+        return distances
+
+    def ghost_target(self, model, pacman_tile, facing):
+        '''Target in pixels, like the real ghost's 'target_tile'.'''
+
+        ghost = model.ghost
+        if model.mode == EATEN:
+            return ghost.eaten_target_tile.x, ghost.eaten_target_tile.y
+        if model.mode == SCATTER:
+            return ghost.maze_corner.x, ghost.maze_corner.y
+
+        blinky = self.ghosts[0].tile
+        return ghost.chase_target(
+            (pacman_tile[0] * TILESIZE, pacman_tile[1] * TILESIZE), facing,
+            (blinky[0] * TILESIZE, blinky[1] * TILESIZE),
+            (model.tile[0] * TILESIZE, model.tile[1] * TILESIZE))
+
+    def choose_direction(self, model, pacman_tile, facing):
+        '''Same choice as 'Ghost.choose_direction': the open direction closest
+        to the target, no U-turns, no going up on no-up tiles, ties going to
+        the higher priority direction.'''
+
+        neighbours = self.neighbours[model.tile]
+        reverse = REVERSE[model.direction]
+        target_x, target_y = self.ghost_target(model, pacman_tile, facing)
+
+        best = None
+        best_dist = 0
+        for index in range(4):
+            neighbour = neighbours[index]
+            if neighbour is None:
+                continue
+            if index == reverse and not model.first_move:
+                continue
+            if index == 0 and model.tile in self.noup_tiles:
+                continue
+            if model.mode == FRIGHT:
+                best = index
+                break
+
+            dist = ((neighbour[0] * TILESIZE + TILESIZE * .5 - target_x)**2
+                    + (neighbour[1] * TILESIZE + TILESIZE * .5 - target_y)**2)
+            if best is None or dist < best_dist:
+                best = index
+                best_dist = dist
+
+        model.first_move = False
+        if best is not None:
+            model.direction = best
+
+    def advance_ghosts(self, pacman_tile, facing):
+        '''Move the ghosts along by one tick and update their timers.'''
+
+        tick = self.tick
+        for model in self.ghosts:
+            ghost = model.ghost
+            if model.tile not in self.neighbours:
+                continue  # somewhere the model doesn't cover, leave it be
+
+            if model.mode == FRIGHT:
+                model.fright_timer += tick
+                if model.fright_timer >= ghost.fright_time:
+                    model.mode = CHASE
+                speed = ghost.fright_speed
+            elif model.mode == EATEN:
+                speed = ghost.eaten_speed
+            else:
+                model.mode_timer += tick
+                if not ghost.ignore_scatter:
+                    if (model.mode == SCATTER
+                            and model.mode_timer >= model.scatter_time):
+                        model.mode = CHASE
+                        model.mode_timer = 0
+                    elif (model.mode == CHASE
+                          and model.mode_timer >= ghost.chase_time):
+                        model.mode = SCATTER
+                        model.mode_timer = 0
+                speed = ghost.ORIGINAL_SPEED
+
+            model.progress += speed * tick / TILESIZE
+            while model.progress >= 1:
+                model.progress -= 1
+                next_tile = self.neighbours[model.tile][model.direction]
+                if next_tile is not None:
+                    model.tile = next_tile
+                if (model.mode == EATEN and
+                        (model.tile[0] * TILESIZE, model.tile[1] * TILESIZE)
+                        == tuple(ghost.eaten_target_tile)):
+                    model.mode = CHASE
+                self.choose_direction(model, pacman_tile, facing)
+
+    def follow_corridor(self, tile, direction):
+        '''Move Pac-Man a tile per tick from 'tile' in 'direction', round
+        corners, up to the next junction. Returns the tile and direction he
+        ends up at and with, the value of what happened on the way, the
+        pellets he ate as (tile, score) pairs and whether he's still alive.'''
+
+        neighbours = self.neighbours
+        pellets = self.pellets
+        ghosts = self.ghosts
+        eaten = []
+        value = 0
+        alive = True
+
+        for step in range(MAX_CORRIDOR):
+            if time.perf_counter() > self.deadline:
+                raise TimeoutError
+            next_tile = neighbours[tile][direction]
+            if next_tile is None:
+                break
+            facing = DIRECTIONS[direction]
+
+            old_tiles = [ghost.tile for ghost in ghosts]
+            last_tile, tile = tile, next_tile
+            self.advance_ghosts(tile, facing)
+
+            score = pellets.pop(tile, 0)
+            if score:
+                eaten.append((tile, score))
+                value += score
+                if tile in self.power_tiles:
+                    self.frighten_ghosts()
+
+            for ghost, old_tile in zip(ghosts, old_tiles):
+                # caught on the same tile or passed each other in the tick
+                if ghost.tile == tile or (ghost.tile == last_tile
+                                          and old_tile == tile):
+                    if ghost.mode == FRIGHT:
+                        ghost.mode = EATEN
+                        value += GHOST_VALUE
+                    elif ghost.mode != EATEN:
+                        value += DEATH_VALUE
+                        alive = False
+            if not alive:
+                break
+
+            # stop at junctions, otherwise follow the corridor round corners
+            exits = [index for index in range(4)
+                     if index != REVERSE[direction]
+                     and neighbours[tile][index] is not None]
+            if len(exits) != 1:
+                break
+            direction = exits[0]
+
+        return tile, direction, value, eaten, alive
+
+    def frighten_ghosts(self):
+        for model in self.ghosts:
+            if model.mode != EATEN:
+                if model.mode != FRIGHT:
+                    model.direction = REVERSE[model.direction]
+                model.mode = FRIGHT
+                model.fright_timer = 0
+
+
+class MacroGhost(ModelGhost):
+    '''A ghost in the macro model, 'progress' tiles along 'segment'.
+
+    Within a corridor of Pac-Man's, a ghost's position and timers are as of
+    Pac-Man's position 'since', and are only brought up to date when it
+    needs handling at 'wake', which is 'due' for its next event or 'meets'
+    if it meets Pac-Man before then. 'rate' is its speed in tiles per tick,
+    out of its 'rates' for each mode.'''
+
+    __slots__ = ('segment', 'rates', 'since', 'rate', 'due', 'meets', 'wake')
+
+    def get_state(self):
+        return super().get_state() + (self.segment,)
+
+    def set_state(self, state):
+        super().set_state(state[:-1])
+        self.segment = state[-1]
+
+
+def first_meeting(gap, closing, window, either_side=False):
+    '''First time in 'window' ticks that a gap of 'gap' tiles, changing by
+    'closing' tiles a tick, is under CATCH_DISTANCE, or None. With
+    'either_side' the gap is measured along one corridor and may be
+    negative, otherwise it's a distance through a junction.'''
+
+    if abs(gap) < CATCH_DISTANCE if either_side else gap < CATCH_DISTANCE:
+        return 0
+    if either_side and gap < 0:
+        gap, closing = -gap, -closing
+    if closing >= 0:
+        return None
+    time = (gap - CATCH_DISTANCE) / -closing
+    return time if time <= window else None
+
+
+class MacroModel(ForwardModel):
+    '''Forward model that moves everything a whole corridor at a time.
+
+    The maze is compiled into a junction graph and Pac-Man and the ghosts
+    are placed along its segments. Between events everything moves in a
+    straight line at a steady speed, so the model only stops where something
+    can happen: a ghost reaching a junction and choosing a way on, a mode
+    timer running out, Pac-Man reaching a power pellet, or Pac-Man and a
+    ghost meeting, when they meet being worked out rather than checked tile
+    by tile. Time is in ticks like the tile model, which it otherwise
+    follows, except that being caught is judged by distance like the real
+    game's hitboxes rather than by sharing a tile.'''
+
+    def __init__(self, game):
+        super().__init__(game)
+
+        # eaten ghosts turn back to normal part way along a corridor
+        stops = {self.tile_of(ghost.eaten_target_tile) for ghost in game.ghosts}
+        self.graph = JunctionGraph(self.neighbours, stops)
+        self.ghosts = [MacroGhost(ghost) for ghost in
+                       (game.blinky, game.pinky, game.inky, game.clyde)]
+
+    def sync(self):
+        '''Copy the real game into the model and put the ghosts on the
+        segments they're part way along.'''
+
+        super().sync()
+
+        player = self.game.player
+        pacman_tile = self.tile_of(player.position)
+        facing = (int(player.facing_direction.x),
+                  int(player.facing_direction.y))
+        along = self.graph.along
+        for model in self.ghosts:
+            model.rates = self.ghost_rates(model.ghost)
+            model.segment = None
+            if model.tile not in self.neighbours:
+                continue
+            if (model.tile, model.direction) not in along:
+                # stood still or facing a wall, so about to choose
+                self.choose_direction(model, pacman_tile, facing)
+                model.progress = 0
+            if (model.tile, model.direction) in along:
+                model.segment, index = along[(model.tile, model.direction)]
+                model.progress += index
+
+    def ghost_rates(self, ghost):
+        '''Tiles a ghost moves per tick in each mode.'''
+
+        scale = self.tick / TILESIZE
+        return (ghost.ORIGINAL_SPEED * scale, ghost.ORIGINAL_SPEED * scale,
+                ghost.fright_speed * scale, ghost.eaten_speed * scale)
+
+    def catch_up(self, model, position):
+        '''Move a ghost along and run its timers up to when Pac-Man is at
+        'position'.'''
+
+        time = position - model.since
+        if time:
+            if model.mode == FRIGHT:
+                model.fright_timer += time * self.tick
+            elif model.mode != EATEN:
+                model.mode_timer += time * self.tick
+            model.progress += model.rate * time
+            model.since = position
+
+    def schedule(self, model, segment, position):
+        '''Work out when an up to date ghost next reaches a junction or has
+        a timer run out, and whether it meets Pac-Man, at 'position' along
+        'segment', before then.'''
+
+        ghost = model.ghost
+        mode = model.mode
+        model.rate = rate = model.rates[mode]
+        time = (model.segment.length - model.progress) / rate
+        if mode == FRIGHT:
+            timer_time = (ghost.fright_time - model.fright_timer) / self.tick
+        elif mode == EATEN or ghost.ignore_scatter:
+            timer_time = time
+        elif mode == SCATTER:
+            timer_time = (model.scatter_time - model.mode_timer) / self.tick
+        else:
+            timer_time = (ghost.chase_time - model.mode_timer) / self.tick
+        if timer_time < time:
+            time = timer_time if timer_time > 0 else 0
+        model.due = position + time
+
+        model.meets = None
+        model.wake = model.due
+        if mode != EATEN:
+            time = self.meeting_time(segment, position, model, time)
+            if time is not None:
+                model.meets = model.wake = position + time
+
+    def meeting_time(self, segment, position, model, window):
+        '''First time within 'window' that Pac-Man, 'position' along
+        'segment' and moving a tile a tick, meets a ghost, or None.'''
+
+        ghost_segment = model.segment
+        progress = model.progress
+        rate = model.rate
+
+        if ghost_segment is segment:
+            return first_meeting(position - progress, 1 - rate, window, True)
+        if ghost_segment is segment.reverse:
+            return first_meeting(position - (segment.length - progress),
+                                 1 + rate, window, True)
+
+        # otherwise they can only meet round a junction at an end of both
+        times = []
+        to_start = position
+        to_end = segment.length - position
+        ghost_to_start = progress
+        ghost_to_end = ghost_segment.length - progress
+        if segment.start == ghost_segment.start:
+            times.append(first_meeting(to_start + ghost_to_start, 1 + rate,
+                                       window))
+        if segment.start == ghost_segment.end:
+            times.append(first_meeting(to_start + ghost_to_end, 1 - rate,
+                                       window))
+        if segment.end == ghost_segment.start:
+            times.append(first_meeting(to_end + ghost_to_start, rate - 1,
+                                       window))
+        if segment.end == ghost_segment.end:
+            times.append(first_meeting(to_end + ghost_to_end, -1 - rate,
+                                       window))
+        times = [time for time in times if time is not None]
+        return min(times) if times else None
+
+    def handle_ghost_event(self, model, pacman_tile, facing):
+        '''Switch the mode of an up to date ghost if its timer has run out
+        and choose its way on if it has reached a junction.'''
+
+        ghost = model.ghost
+        if model.mode == FRIGHT:
+            if model.fright_timer >= ghost.fright_time - EPSILON:
+                model.mode = CHASE
+        elif model.mode != EATEN and not ghost.ignore_scatter:
+            if (model.mode == SCATTER
+                    and model.mode_timer >= model.scatter_time - EPSILON):
+                model.mode = CHASE
+                model.mode_timer = 0
+            elif (model.mode == CHASE
+                  and model.mode_timer >= ghost.chase_time - EPSILON):
+                model.mode = SCATTER
+                model.mode_timer = 0
+
+        segment = model.segment
+        if model.progress < segment.length - EPSILON:
+            return
+
+        model.tile = segment.end
+        model.direction = segment.directions[-1]
+        if (model.mode == EATEN and
+                (model.tile[0] * TILESIZE, model.tile[1] * TILESIZE)
+                == tuple(ghost.eaten_target_tile)):
+            model.mode = CHASE
+        self.choose_direction(model, pacman_tile, facing)
+
+        segments = self.graph.segments
+        if (model.tile, model.direction) not in segments:
+            # a dead end, the only way is back
+            model.direction = REVERSE[model.direction]
+        model.segment = segments[(model.tile, model.direction)]
+        model.progress = max(model.progress - segment.length, 0)
+
+    def frighten_ghosts(self):
+        '''Frighten the ghosts, turning them round where they are.'''
+
+        for model in self.ghosts:
+            if model.mode != EATEN:
+                if model.mode != FRIGHT and model.segment is not None:
+                    model.progress = model.segment.length - model.progress
+                    model.segment = model.segment.reverse
+                    model.direction = REVERSE[model.direction]
+                model.mode = FRIGHT
+                model.fright_timer = 0
+
+    def next_power_pellet(self, segment, index):
+        '''Index of the first power pellet left on 'segment' from 'index'
+        on, or one past the end if there isn't one.'''
+
+        for index in range(index, segment.length + 1):
+            tile = segment.tiles[index - 1]
+            if tile in self.power_tiles and tile in self.pellets:
+                return index
+        return segment.length + 1
+
+    def follow_corridor(self, tile, direction):
+        '''Move Pac-Man from 'tile' in 'direction' along a whole segment to
+        the next junction, stopping only for events on the way. Returns the
+        same as 'ForwardModel.follow_corridor'.'''
+
+        segment, position = self.graph.along[(tile, direction)]
+        end = segment.length
+        pellets = self.pellets
+        eaten = []
+        value = 0
+        alive = True
+        next_tile = position + 1  # index of the next tile to eat from
+        power_pellet = self.next_power_pellet(segment, next_tile)
+
+        ghosts = [model for model in self.ghosts if model.segment is not None]
+        for model in ghosts:
+            model.since = position
+            self.schedule(model, segment, position)
+
+        while alive and position < end:
+            if time.perf_counter() > self.deadline:
+                raise TimeoutError
+            until = power_pellet if power_pellet < end else end
+            for model in ghosts:
+                if model.wake < until:
+                    until = model.wake
+            position = until
+
+            # eat everything up to the tile being moved on to
+            while next_tile <= position + EPSILON:
+                tile = segment.tiles[next_tile - 1]
+                score = pellets.pop(tile, 0)
+                if score:
+                    eaten.append((tile, score))
+                    value += score
+                    if tile in self.power_tiles:
+                        for model in ghosts:
+                            self.catch_up(model, position)
+                        self.frighten_ghosts()
+                        for model in ghosts:
+                            self.schedule(model, segment, position)
+                        power_pellet = self.next_power_pellet(segment,
+                                                              next_tile + 1)
+                next_tile += 1
+
+            for model in ghosts:
+                if model.wake > position + EPSILON:
+                    continue
+                self.catch_up(model, position)
+                if model.meets is not None:
+                    if model.mode == FRIGHT:
+                        model.mode = EATEN
+                        value += GHOST_VALUE
+                    else:
+                        value += DEATH_VALUE
+                        alive = False
+                        break
+                else:
+                    index = min(max(math.ceil(position - EPSILON), 1), end)
+                    self.handle_ghost_event(
+                        model, segment.tile_at(index),
+                        DIRECTIONS[segment.directions[index - 1]])
+                self.schedule(model, segment, position)
+
+        for model in ghosts:
+            self.catch_up(model, position)
+
+        return segment.end, segment.directions[-1], value, eaten, alive
+
+
+class Autopilot:
+    '''Plays as Pac-Man by making his moves for him.
+
+    Each time Pac-Man heads for a new tile, the directions he could take from
+    it are searched junction to junction with the forward model, deepening
+    one junction at a time until the time budget runs out, and the best
+    direction from the deepest finished search is taken. Paths are scored
+    by pellets and frightened ghosts eaten, heavily penalised for getting
+    caught and, at the end, by how far it is to the nearest pellet.
+
+    Turning back is made at once, and heads Pac-Man for the tile he came
+    from, so having turned back he may not do so again until he gets there.
+    Otherwise he can dither back and forth between two tiles.'''
+
+    def __init__(self, game, budget=AUTOPILOT_BUDGET,
+                 macro_steps=AUTOPILOT_MACRO_STEPS):
+        self.game = game
+        self.budget = budget
+        self.model_class = MacroModel if macro_steps else ForwardModel
+
+        self.decisions = 0
+        self.overruns = 0  # decisions that took longer than the budget
+        self.longest = 0
+        self.search_time = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.decided_tile = None
+        self.turned_back = False
+
+    def new_level(self):
+        '''Build the forward model for the level that has just loaded.'''
+
+        self.model = self.model_class(self.game)
+        self.decided_tile = None
+        self.turned_back = False
+
+    def steer(self):
+        '''Called by Pac-Man before he acts on his queued moves.'''
+
+        player = self.game.player
+        model = self.model
+
+        if player.direction.length_squared():
+            tile = model.tile_of(player.next_tile)
+            heading = model.direction_index(player.direction)
+        else:
+            tile = model.tile_of(player.position)
+            heading = None
+
+        if (tile, heading) == self.decided_tile or tile not in model.neighbours:
+            return
+        self.decided_tile = (tile, heading)
+
+        direction = self.decide(tile, heading, not self.turned_back)
+        self.turned_back = (heading is not None
+                            and direction == REVERSE[heading])
+        if direction is not None and direction != heading:
+            player.queue_move(DIRECTIONS[direction])
+
+    def decide(self, tile, heading, may_turn_back=True):
+        '''Search from 'tile' and return the index of the best direction,
+        leaving out turning back unless 'may_turn_back' or there's no other
+        way.'''
+
+        start = time.perf_counter()
+        model = self.model
+        # bringing the model up to date counts against the budget too, and
+        # the model itself gives up part way along a corridor
+        self.deadline = model.deadline = start + self.budget - DEADLINE_MARGIN
+        model.sync()
+        self.distances = model.pellet_distances()
+
+        options = [index for index, neighbour in
+                   enumerate(model.neighbours[tile]) if neighbour is not None]
+        if not may_turn_back and heading is not None and len(options) > 1:
+            options = [index for index in options
+                       if index != REVERSE[heading]]
+        best = options[0] if heading is None or heading not in options else heading
+        depth = 0
+
+        # only one way to go, no need to look ahead
+        if len(options) > 1:
+            self.ghost_start = [ghost.get_state() for ghost in model.ghosts]
+            while depth < 20:
+                try:
+                    best = self.search_root(tile, options, depth + 1)
+                except TimeoutError:
+                    break
+                depth += 1
+
+        elapsed = time.perf_counter() - start
+        self.decisions += 1
+        if elapsed > self.budget:
+            self.overruns += 1
+        self.longest = max(self.longest, elapsed)
+        self.search_time += elapsed
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+        return best
+
+    def search_root(self, tile, options, depth):
+        best = None
+        best_value = None
+        for direction in options:
+            for ghost, state in zip(self.model.ghosts, self.ghost_start):
+                ghost.set_state(state)
+            value = self.search(tile, direction, depth)
+            if best_value is None or value > best_value:
+                best = direction
+                best_value = value
+        return best
+
+    def search(self, tile, direction, depth):
+        '''Value of Pac-Man following the corridor from 'tile' in 'direction'
+        up to the next junction, then taking the best way on from there.'''
+
+        if time.perf_counter() > self.deadline:
+            raise TimeoutError
+
+        model = self.model
+        neighbours = model.neighbours
+        saved_ghosts = [ghost.get_state() for ghost in model.ghosts]
+
+        tile, direction, value, eaten, alive = model.follow_corridor(
+            tile, direction)
+
+        if alive:
+            if depth > 1:
+                exits = [index for index in range(4)
+                         if index != REVERSE[direction]
+                         and neighbours[tile][index] is not None]
+                if not exits:
+                    exits = [REVERSE[direction]]
+                value += max(self.search(tile, exit, depth - 1)
+                             for exit in exits)
+            else:
+                value -= self.distances.get(tile, 0) * NEAREST_PELLET_WEIGHT
+
+        for tile, score in eaten:
+            model.pellets[tile] = score
+        for ghost, state in zip(model.ghosts, saved_ghosts):
+            ghost.set_state(state)
+
+        return value
+
+    def report(self):
+        '''Summarise how often and how deep the autopilot searched.'''
+
+        if not self.decisions:
+            return "Autopilot: no decisions made."
+
+        return (f"Autopilot: {self.decisions} decisions, "
+                f"{self.decisions / self.search_time:.0f} per second of "
+                f"search, {self.search_time / self.decisions * 1000:.2f} ms "
+                f"each, depth {self.depth_total / self.decisions:.1f} on "
+                f"average and {self.max_depth} at most, {self.overruns} over "
+                f"the {self.budget * 1000:g} ms budget and "
+                f"{self.longest * 1000:.2f} ms at most")
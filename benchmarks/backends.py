@@ -0,0 +1,63 @@
+'''Compares how long drawing a frame takes with each backend: blitting
+surfaces, and SDL's renderer copying textures with each of its render
+drivers that can be created here.
+
+The level is played from the input script of benchmarks.scenario, in a window
+under SDL's dummy driver unless SDL_VIDEODRIVER says otherwise. Only the
+software render driver works without a display, so set SDL_VIDEODRIVER to
+compare the GPU's drivers as well.
+
+Run from the repository root with:
+    python -m benchmarks.backends [--repeats n]'''
+
+import argparse
+import os
+
+# play in a window the same as the game does, without showing it
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from benchmarks.scenario import REPEATS, measure, new_game, read_script
+
+
+def render_drivers():
+    '''Names of SDL's render drivers, none without pygame's _sdl2
+    module.'''
+
+    try:
+        from pygame._sdl2 import video
+    except ImportError:
+        return []
+    return [info.name for info in video.get_drivers()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=REPEATS,
+                        help="times to play the level with each backend")
+    args = parser.parse_args()
+
+    seed, moves = read_script()
+    backends = [('surface', None)] + [('texture', driver)
+                                      for driver in render_drivers()]
+
+    print(f"{'backend':18} {'draw p50':>10} {'p99':>10} {'max':>10} "
+          f"{'allocated p50':>14}")
+    for backend, driver in backends:
+        name = backend if driver is None else f"{backend} {driver}"
+        game = new_game(backend, driver)
+        if backend == 'texture' and not game.renderer:
+            print(f"{name:18} not available")
+            continue
+
+        results, frames, events = measure(game, seed, moves, args.repeats)
+        draw = results['draw']
+        print(f"{name:18} {draw['p50']:7.0f} us {draw['p99']:7.0f} us "
+              f"{draw['max']:7.0f} us "
+              f"{results['draw allocated']['p50']:12.0f} B")
+        if game.renderer:
+            game.renderer.close()
+
+
+if __name__ == '__main__':
+    main()
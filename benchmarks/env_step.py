@@ -0,0 +1,87 @@
+'''Measures the per-step overhead of the environment API on top of the game's
+own simulation.
+
+Run from the repository root with:  python -m benchmarks.env_step'''
+
+import random
+import time
+
+from env import PacManEnv, PacManVectorEnv
+
+STEPS = 2000
+NUM_ENVS = 8
+
+
+def time_game_frames(env, frames):
+    '''Average time of a bare 'Game.step', the cost the API is built on.'''
+
+    game = env.game
+    env.reset(seed=0)
+    start = time.perf_counter()
+    for frame in range(frames):
+        if not game.playing:
+            env.reset(seed=0)
+        game.step()
+    return (time.perf_counter() - start) / frames
+
+
+def time_env_steps(env, steps, rng):
+    '''Average time of 'PacManEnv.step' with random actions.'''
+
+    env.reset(seed=0)
+    elapsed = 0
+    for step in range(steps):
+        action = rng.randrange(5)
+        start = time.perf_counter()
+        _, _, terminated, truncated, _ = env.step(action)
+        elapsed += time.perf_counter() - start
+        if terminated or truncated:
+            env.reset()
+    return elapsed / steps
+
+
+def time_observation_updates(env, steps):
+    '''Average time of the incremental observation update on its own.'''
+
+    env.reset(seed=0)
+    start = time.perf_counter()
+    for step in range(steps):
+        env.update_observation()
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    rng = random.Random(0)
+    env = PacManEnv(frame_skip=1)
+
+    frame_time = time_game_frames(env, STEPS)
+    step_time = time_env_steps(env, STEPS, rng)
+    observation_time = time_observation_updates(env, STEPS)
+
+    pixel_times = []
+    for options in ({'downsample': 1, 'grayscale': False},
+                    {'downsample': 4, 'grayscale': True}):
+        pixel_env = PacManEnv(frame_skip=1, pixels=True, **options)
+        pixel_times.append((options,
+                            time_env_steps(pixel_env, STEPS // 4, rng)))
+
+    vector_env = PacManVectorEnv(NUM_ENVS, frame_skip=1)
+    vector_env.reset(seed=0)
+    start = time.perf_counter()
+    for step in range(STEPS // NUM_ENVS):
+        vector_env.step([rng.randrange(5) for i in range(NUM_ENVS)])
+    vector_time = (time.perf_counter() - start) / (STEPS // NUM_ENVS)
+
+    print(f"Game.step:                 {frame_time * 1e6:8.1f} us")
+    print(f"PacManEnv.step (1 frame):  {step_time * 1e6:8.1f} us")
+    print(f"  observation update:      {observation_time * 1e6:8.1f} us")
+    for options, pixel_time in pixel_times:
+        print(f"  with pixels {options}: {pixel_time * 1e6:8.1f} us")
+    print(f"PacManVectorEnv.step ({NUM_ENVS}):  {vector_time * 1e6:8.1f} us, "
+          f"{NUM_ENVS / vector_time:.0f} env steps/s")
+    print("Steps that land on a pause also play it out, so the env step "
+          "includes those frames.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+'''Compares playing games frame by frame with fast-forwarding them in macro
+steps, which play the frames nothing needs deciding in together, and checks
+that both play out the same.
+
+Each game is played from the same seed and random moves, one every so many
+frames, by 'Simulation.fast_forward' with and without 'MacroSteps'. The game
+is compared after every move's frames, down to the timers, and the frames
+played a CPU second and the steps they took are reported for each.
+
+Run from the repository root with:  python -m benchmarks.fast_forward'''
+
+import random
+import time
+
+from settings import *
+from fastforward import MacroSteps
+from simulation import Simulation
+
+GAMES = 10
+MOVES = 100  # the most in a game
+# frames between moves, as an environment's frame skip would be
+MOVE_EVERY = (4, 16, 60)
+
+
+def outcome(game):
+    '''What there is to compare of the game as it stands, to within the
+    rounding that adding up times and moves in different steps gives.'''
+
+    def rounded(values):
+        return tuple(round(value, 6) + 0 for value in values)
+
+    player = game.player
+    return ((rounded(player.position), rounded(player.direction),
+             player.score, player.lives, game.dots_remain, game.playing,
+             round(game.pause_countdown, 6)),
+            tuple((rounded(ghost.position), rounded(ghost.direction),
+                   ghost.scatter_mode, ghost.fright_mode, ghost.eaten_mode,
+                   round(ghost.state_timer, 6), round(ghost.fright_timer, 6))
+                  for ghost in game.ghosts))
+
+
+def play(seed, every, macro_steps):
+    '''Play a game of random moves made 'every' frames. Returns how it stood
+    after each move, the frames played, the steps they took and the CPU
+    seconds they took.'''
+
+    game = Simulation()
+    game.rng.seed(seed)
+    game.load_level()
+    game.playing = True
+    game.time_delta = 1 / FPS
+    if macro_steps:
+        game.macro_steps = MacroSteps(game)
+
+    steps = 0
+    step = game.step
+
+    def counted_step():
+        nonlocal steps
+        steps += 1
+        return step()
+
+    game.step = counted_step
+    rng = random.Random(seed)
+    outcomes = []
+    frames = 0
+    start = time.process_time()
+    for move in range(MOVES):
+        if not game.playing:
+            break
+        game.player.queue_move(rng.choice(((0, -1), (-1, 0), (0, 1),
+                                           (1, 0))))
+        frames += game.fast_forward(every)
+        outcomes.append(outcome(game))
+    return outcomes, frames, steps, time.process_time() - start
+
+
+def main():
+    print(f"{'frames a move':>13} {'frame by frame':>16} {'macro steps':>13} "
+          f"{'frames a step':>14} {'same':>6}")
+    for every in MOVE_EVERY:
+        frames = steps = 0
+        cpu_time = {False: 0, True: 0}
+        same = 0
+        for seed in range(GAMES):
+            played = {}
+            for macro_steps in (False, True):
+                outcomes, game_frames, game_steps, seconds = play(
+                    seed, every, macro_steps)
+                played[macro_steps] = outcomes
+                cpu_time[macro_steps] += seconds
+            frames += game_frames
+            steps += game_steps
+            same += played[False] == played[True]
+
+        print(f"{every:13} {frames / cpu_time[False]:10.0f} fps "
+              f"{frames / cpu_time[True]:9.0f} fps {frames / steps:14.1f} "
+              f"{same:3}/{GAMES}")
+
+
+if __name__ == '__main__':
+    main()
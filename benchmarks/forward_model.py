@@ -0,0 +1,83 @@
+'''Compares how quickly the autopilot's tile-level and macro-stepping forward
+models fast-forward through the level.
+
+Run from the repository root with:  python -m benchmarks.forward_model'''
+
+import random
+import time
+
+from autopilot import ForwardModel, MacroModel
+from env import PacManEnv
+from junctions import REVERSE, JunctionGraph
+
+WALKS = 300
+CORRIDORS = 40  # per walk
+
+
+def time_walks(model, rng):
+    '''Walk Pac-Man through the model taking random turns at junctions,
+    from the same starting state each time. Returns the time per tile
+    walked and the number of tiles.
+
+    The turns are taken at the maze's own junctions, and each corridor is
+    followed to its end however many times the model stops along it, at a
+    tile of its own or where Pac-Man is caught, so that with the same
+    random numbers every model walks the same way.'''
+
+    model.sync()
+    neighbours = model.neighbours
+    along = JunctionGraph(neighbours).along
+    start_ghosts = [ghost.get_state() for ghost in model.ghosts]
+    start_pellets = dict(model.pellets)
+    start_tile = model.tile_of(model.game.player.position)
+
+    tiles = 0
+    elapsed = 0
+    for walk in range(WALKS):
+        for ghost, state in zip(model.ghosts, start_ghosts):
+            ghost.set_state(state)
+        model.pellets = dict(start_pellets)
+        tile = start_tile
+        direction = None
+
+        start = time.perf_counter()
+        for corridor in range(CORRIDORS):
+            exits = [index for index in range(4)
+                     if neighbours[tile][index] is not None
+                     and (direction is None or index != REVERSE[direction])]
+            if not exits:
+                exits = [REVERSE[direction]]
+            direction = rng.choice(exits)
+            segment, index = along[(tile, direction)]
+            tiles += segment.length - index
+            # carry on even if caught
+            while True:
+                tile, direction, value, eaten, alive = model.follow_corridor(
+                    tile, direction)
+                if tile == segment.end:
+                    break
+                if neighbours[tile][direction] is None:
+                    # stopped where the corridor turns a corner
+                    direction = next(
+                        index for index in range(4)
+                        if index != REVERSE[direction]
+                        and neighbours[tile][index] is not None)
+        elapsed += time.perf_counter() - start
+
+    return elapsed / tiles, tiles
+
+
+def main():
+    env = PacManEnv(frame_skip=1)
+    env.reset(seed=0)
+    game = env.game
+
+    for model_class in (ForwardModel, MacroModel):
+        model = model_class(game)
+        per_tile, tiles = time_walks(model, random.Random(0))
+        print(f"{model_class.__name__ + ':':14} {per_tile * 1e6:6.2f} us "
+              f"per tile walked, over {tiles} tiles")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+'''Measures what serving metrics costs the game: the CPU time its process
+takes, recording frames and answering scrapes, and how many frames start
+late while the page is being scraped.
+
+The game is played at FPS from the input script of benchmarks.scenario,
+with a scraper in another process fetching the metrics page as often as
+asked, or as fast as it can.
+
+Run from the repository root with:  python -m benchmarks.metrics'''
+
+import multiprocessing
+import os
+import socket
+import time
+import urllib.request
+
+# play in a window the same as the game does, without showing it
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from settings import *
+from metrics import Metrics
+from benchmarks.scenario import new_game, read_script
+
+# scrapes a second, None for no metrics at all and 0 for as fast as they go
+SCRAPES = (None, 0.2, 1, 100, 0)
+SECONDS = 10
+
+
+def scrape(port, interval, stop, results):
+    '''Fetch the metrics page every 'interval' seconds until told to stop,
+    then put how many times and the slowest fetch in 'results'.'''
+
+    url = f'http://localhost:{port}/metrics'
+    count = 0
+    slowest = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        slowest = max(slowest, time.perf_counter() - start)
+        count += 1
+        stop.wait(interval)
+    results.put((count, slowest))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def play(game, seed, moves, scrapes):
+    '''Play SECONDS of the scripted level at FPS the way the game loop does,
+    served with 'scrapes' a second, recording each frame as the game loop
+    does. Returns the frames that started more than a frame late, the CPU
+    seconds the game's process used, the scrapes made and the slowest of
+    them.'''
+
+    game.rng.seed(seed)
+    game.load_level()
+    game.playing = True
+    game.time_delta = 1 / FPS
+
+    metrics = scraper = None
+    if scrapes is not None:
+        port = free_port()
+        metrics = Metrics(port)
+        context = multiprocessing.get_context('spawn')
+        stop = context.Event()
+        results = context.Queue()
+        scraper = context.Process(target=scrape, args=(
+            port, 1 / scrapes if scrapes else 0, stop, results))
+        scraper.start()
+        # let it start before timing anything
+        time.sleep(1)
+
+    late = 0
+    start = time.process_time()
+    last = next_frame = time.perf_counter()
+    for frame in range(SECONDS * FPS):
+        now = time.perf_counter()
+        if now - next_frame > 1 / FPS:
+            late += 1
+        game.time_delta = now - last
+        last = now
+
+        for move in moves.get(frame, ()):
+            game.player.queue_move(move)
+        if game.step():
+            game.draw()
+        # after the frame, as 'Game.play_frame' does
+        if metrics:
+            metrics.record(game, game.time_delta)
+
+        next_frame += 1 / FPS
+        time.sleep(max(0, next_frame - time.perf_counter()))
+    cpu_time = time.process_time() - start
+
+    count = slowest = 0
+    if metrics:
+        stop.set()
+        count, slowest = results.get()
+        scraper.join()
+        metrics.close()
+    return late, cpu_time, count, slowest
+
+
+def main():
+    seed, moves = read_script()
+    frames = SECONDS * FPS
+    game = new_game()
+
+    print(f"{'scrapes/s':>10} {'late frames':>12} {'CPU a frame':>12} "
+          f"{'scrapes':>8} {'slowest':>9}")
+    for scrapes in SCRAPES:
+        late, cpu_time, count, slowest = play(game, seed, moves, scrapes)
+        label = ('off' if scrapes is None else f"{scrapes:g}" if scrapes
+                 else 'flat out')
+        print(f"{label:>10} {late:12} {cpu_time / frames * 1e6:9.1f} us "
+              f"{count:8} {slowest * 1000:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+'''Measures how the game's cost grows with the size of the maze, on generated
+mazes from the arcade's 28x36 tiles up to 500x500, with proportionally many
+pellets and ghosts.
+
+Each size is measured in its own process: the time to load the level, the
+time per frame to update and to draw it, and memory. Then every function's
+share of a frame is profiled, and the cost curve shows how each grows with
+the number of tiles, flagging the code paths that grow faster than the maze.
+
+Run from the repository root with:  python -m benchmarks.scaling
+Drawing the largest maze holds its images in about 2 GB of memory, leave it
+out with --no-draw or pick smaller --sizes.'''
+
+import argparse
+import cProfile
+import math
+import os
+import pstats
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# render off screen, whatever display there is
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from settings import *
+from simulation import Simulation, read_maze_objects
+
+SIZES = ((28, 36), (56, 72), (112, 144), (250, 250), (500, 500))
+FRAMES = 120
+# the arcade maze has about this many pellets to each ghost
+PELLETS_PER_GHOST = 75
+# drawn for every wall tile, one of the wall edges in the sprite sheet
+WALL_GID = 48
+# how many of the functions taking the most of a frame at the largest size
+# are shown in the cost curve
+PROFILE_FUNCTIONS = 15
+# growth exponents above this are worse than linear in the number of tiles
+LINEAR_EXPONENT = 1.1
+
+NAMED_GHOSTS = ('blinky_spawn', 'pinky_spawn', 'inky_spawn', 'clyde_spawn')
+
+
+def maze_layout(columns, rows):
+    '''Which tiles of a generated maze are open: a lattice of one tile wide
+    corridors between 2x2 blocks, walled all around. The last row and column
+    inside the border are always corridors so that there are no dead ends,
+    which ghosts can't turn around in.'''
+
+    return [[0 < column < columns - 1 and 0 < row < rows - 1
+             and (column % 3 == 1 or row % 3 == 1 or column == columns - 2
+                  or row == rows - 2)
+             for column in range(columns)]
+            for row in range(rows)]
+
+
+def wall_rects(layout):
+    '''Cover the walls with as few rectangles as merging runs of wall tiles
+    with identical runs in the row above allows, as (column, row, width,
+    height) in tiles.'''
+
+    rects = []
+    above = {}  # (start, end) of each run in the row above, to its rect
+    for row, tiles in enumerate(layout):
+        runs = {}
+        column = 0
+        while column < len(tiles):
+            if tiles[column]:
+                column += 1
+                continue
+            start = column
+            while column < len(tiles) and not tiles[column]:
+                column += 1
+            rect = above.get((start, column))
+            if rect is None:
+                rect = [start, row, column - start, 0]
+                rects.append(rect)
+            rect[3] += 1
+            runs[(start, column)] = rect
+        above = runs
+    return rects
+
+
+def write_maze(columns, rows, filename, seed=0):
+    '''Write a generated maze of 'columns' x 'rows' tiles to a *.tmx file, in
+    the same layers and objects as the arcade maze. Every open tile but
+    Pac-Man's has a pellet, the four corners have power pellets, and there's
+    a ghost for every PELLETS_PER_GHOST pellets, at least the four named
+    ones. Returns the number of walls, pellets and ghosts.'''
+
+    layout = maze_layout(columns, rows)
+    open_tiles = [(column, row) for row in range(rows)
+                  for column in range(columns) if layout[row][column]]
+
+    # Pac-Man starts on the corridor crossing nearest the middle
+    player = (columns // 2 - (columns // 2) % 3 + 1,
+              rows // 2 - (rows // 2) % 3 + 1)
+    corners = {(1, 1), (columns - 2, 1), (1, rows - 2),
+               (columns - 2, rows - 2)}
+    pellets = [tile for tile in open_tiles if tile != player]
+    ghost_count = max(len(NAMED_GHOSTS), len(pellets) // PELLETS_PER_GHOST)
+    ghosts = random.Random(seed).sample(pellets, ghost_count)
+    walls = wall_rects(layout)
+
+    objects = []
+
+    def add_object(name, column, row, width=1, height=1):
+        objects.append(
+            f'  <object id="{len(objects) + 1}" name="{name}" '
+            f'x="{column * TILESIZE}" y="{row * TILESIZE}" '
+            f'width="{width * TILESIZE}" height="{height * TILESIZE}"/>')
+
+    groups = []
+
+    def add_group(name):
+        groups.append(f' <objectgroup id="{len(groups) + 2}" name="{name}">')
+        groups.extend(objects)
+        groups.append(' </objectgroup>')
+        objects.clear()
+
+    for column, row, width, height in walls:
+        add_object('wall', column, row, width, height)
+    add_group('wall_collisions')
+    for column, row in pellets:
+        add_object('power_pellet_spawn' if (column, row) in corners
+                   else 'pellet_spawn', column, row)
+    add_object('bonus_spawn', *player)
+    add_group('pellets')
+    add_object('player_spawn', *player)
+    for index, (column, row) in enumerate(ghosts):
+        name = (NAMED_GHOSTS[index] if index < len(NAMED_GHOSTS)
+                else 'ghost_spawn')
+        add_object(name, column, row)
+    add_group('player_and_ghosts')
+
+    tileset = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'maze', 'spritesheet.tsx')
+    data = ',\n'.join(','.join('0' if tile else str(WALL_GID) for tile in line)
+                      for line in layout)
+
+    with open(filename, 'w') as file:
+        file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<map version="1.5" orientation="orthogonal" '
+            f'renderorder="right-down" width="{columns}" height="{rows}" '
+            f'tilewidth="{TILESIZE}" tileheight="{TILESIZE}" infinite="0">\n'
+            f' <tileset firstgid="1" source="{tileset}"/>\n'
+            f' <layer id="1" name="walls" width="{columns}" height="{rows}">\n'
+            f'  <data encoding="csv">\n{data}\n</data>\n'
+            ' </layer>\n')
+        file.write('\n'.join(groups))
+        file.write('\n</map>\n')
+
+    return len(walls), len(pellets), ghost_count
+
+
+def timed(function, *args):
+    '''Seconds taken to call 'function'.'''
+
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def play_frames(game, frames, draw, profile=None):
+    '''Play 'frames' frames with Pac-Man turning at random, drawing those
+    the game would draw. Pauses are skipped so that every frame is played.
+    Returns the time of each frame's update and of each draw.'''
+
+    rng = random.Random(0)
+    updates = []
+    draws = []
+    for frame in range(frames):
+        if frame % 10 == 0:
+            game.player.queue_move(rng.choice(((0, -1), (-1, 0), (0, 1),
+                                               (1, 0))))
+        game.pause_countdown = 0
+
+        if profile:
+            profile.enable()
+        start = time.perf_counter()
+        shown = game.step()
+        updated = time.perf_counter()
+        if shown and draw:
+            game.render()
+        drawn = time.perf_counter()
+        if profile:
+            profile.disable()
+
+        updates.append(updated - start)
+        if shown and draw:
+            draws.append(drawn - updated)
+    return updates, draws
+
+
+def measure(columns, rows, frames, draw, batch_ghosts=False):
+    '''Measure one maze size. Run in a process of its own, so that memory
+    figures are of this size alone.'''
+
+    with tempfile.TemporaryDirectory() as directory:
+        maze_file = os.path.join(directory, 'maze.tmx')
+        walls, pellets, ghosts = write_maze(columns, rows, maze_file)
+
+        # the rules alone, without the maze's tiles and images the game
+        # loads to draw it
+        rules = Simulation()
+        rules.maze_file = maze_file
+        if draw:
+            from main import Game
+            game = Game(headless=True)
+            game.maze_file = maze_file
+        else:
+            game = rules
+        if batch_ghosts:
+            from swarm import GhostBatch
+            game.ghost_batch = GhostBatch(game, 0)
+
+        result = {'tiles': columns * rows, 'walls': walls, 'pellets': pellets,
+                  'ghosts': ghosts}
+        result['read maze'] = timed(read_maze_objects, maze_file)
+        # once first, so that neither timing includes one-off costs
+        rules.load_level()
+        if draw:
+            game.load_level()
+        # each load after this is told to read the maze again
+        rules.maze_key = None
+        result['load rules'] = timed(rules.load_level)
+        result['create walls'] = timed(rules.rebuild_walls)
+        result['create pellets'] = timed(rules.rebuild_pellets)
+
+        tracemalloc.start()
+        # read again, so that the maze's objects are counted too
+        rules.maze_key = None
+        rules.load_level()
+        result['traced memory'] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        if draw:
+            # the maze parsed and its images drawn as well
+            game.maze_key = None
+            result['load level'] = timed(game.load_level)
+            del rules
+
+        # enough lives to play through however many ghosts there are
+        game.player.lives = frames
+        snapshot = game.snapshot()
+        updates, draws = play_frames(game, frames, draw)
+        result['update'] = statistics.median(updates)
+        result['draw'] = statistics.median(draws) if draws else None
+        if batch_ghosts:
+            result['batched turns'] = game.ghost_batch.turns
+            result['single turns'] = game.ghost_batch.single_turns
+
+        # profile the same frames again, as a share of each frame
+        game.restore(snapshot)
+        profile = cProfile.Profile()
+        play_frames(game, frames, draw, profile)
+        stats = pstats.Stats(profile).stats
+        result['functions'] = {
+            f"{os.path.basename(filename)}:{line}({name})": total / frames
+            for (filename, line, name), (calls, primitive, total, cumulative,
+                                         callers) in stats.items()}
+
+    if resource:
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result['peak RSS'] = peak * (1 if sys.platform == 'darwin' else 1024)
+    return result
+
+
+def growth_exponent(tiles, values):
+    '''Slope of the least squares line through log value against log tiles:
+    about 1 for a cost that grows in step with the maze, 0 for a constant
+    one and 2 for one that grows with its square.'''
+
+    points = [(math.log(tile_count), math.log(value))
+              for tile_count, value in zip(tiles, values)
+              if value is not None and value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, y in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def describe(tiles, values):
+    '''The growth exponent over every size and between the two largest,
+    where costs that only start to grow faster on big mazes show up.'''
+
+    exponents = (growth_exponent(tiles, values),
+                 growth_exponent(tiles[-2:], values[-2:]))
+    text = " ".join("      -" if exponent is None else f"{exponent:7.2f}"
+                    for exponent in exponents)
+    if any(exponent is not None and exponent > LINEAR_EXPONENT
+           for exponent in exponents):
+        text += "  WORSE THAN LINEAR"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', nargs='+', metavar='COLUMNSxROWS',
+                        help="maze sizes in tiles, by default "
+                        + " ".join(f"{c}x{r}" for c, r in SIZES))
+    parser.add_argument('--frames', type=int, default=FRAMES,
+                        help="frames to play at each size")
+    parser.add_argument('--no-draw', action='store_true',
+                        help="only measure the simulation, without pygame")
+    parser.add_argument('--batch-ghosts', action='store_true',
+                        help="update the ghosts together in NumPy arrays")
+    arguments = parser.parse_args()
+
+    sizes = SIZES
+    if arguments.sizes:
+        sizes = [tuple(int(part) for part in size.lower().split('x'))
+                 for size in arguments.sizes]
+    draw = not arguments.no_draw
+
+    results = []
+    for columns, rows in sizes:
+        with ProcessPoolExecutor(1) as executor:
+            result = executor.submit(measure, columns, rows, arguments.frames,
+                                     draw, arguments.batch_ghosts).result()
+        results.append(result)
+
+        def milliseconds(name):
+            value = result.get(name)
+            return "       -" if value is None else f"{value * 1000:8.2f}"
+
+        print(f"{columns}x{rows}: {result['walls']} walls, "
+              f"{result['pellets']} pellets, {result['ghosts']} ghosts")
+        print(f"  load (ms):  read maze {milliseconds('read maze')}, rules "
+              f"{milliseconds('load rules')}, with sprites and images "
+              f"{milliseconds('load level')}")
+        print(f"  frame (ms): update {milliseconds('update')}, draw "
+              f"{milliseconds('draw')}")
+        if 'batched turns' in result:
+            print(f"  turns:      {result['batched turns']} worked out "
+                  f"together, {result['single turns']} one ghost at a time")
+        memory = f"  memory:     rules {result['traced memory'] / 2**20:.1f} MB"
+        if 'peak RSS' in result:
+            memory += f", peak RSS {result['peak RSS'] / 2**20:.1f} MB"
+        print(memory, flush=True)
+
+    tiles = [result['tiles'] for result in results]
+    print("\nGrowth with the number of tiles, overall and between the two "
+          "largest sizes (1 is linear):")
+    for name in ('read maze', 'load rules', 'create walls', 'create pellets',
+                 'load level', 'update', 'draw', 'traced memory',
+                 'peak RSS'):
+        print(f"  {name:16} "
+              f"{describe(tiles, [result.get(name) for result in results])}")
+
+    largest = results[-1]
+    functions = sorted(largest['functions'], reverse=True,
+                       key=largest['functions'].get)
+    curves = []
+    for function in functions[:PROFILE_FUNCTIONS]:
+        values = [result['functions'].get(function) for result in results]
+        curves.append((growth_exponent(tiles, values) or 0,
+                       describe(tiles, values), function))
+
+    print(f"\nThe {PROFILE_FUNCTIONS} functions taking the most of a frame, "
+          "steepest first:")
+    for exponent, description, function in sorted(curves, reverse=True):
+        print(f"  {function:50} {description}")
+
+
+if __name__ == '__main__':
+    main()
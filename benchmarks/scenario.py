@@ -0,0 +1,368 @@
+'''Plays a whole level from a fixed input script, timing every frame's update
+and draw and what each allocates, and checks them against a stored baseline.
+
+The script makes sure the level has everything in it: power pellets, ghosts
+being eaten, a death and the reset after it, the bonus fruit and the level
+clear flash. Exits with status 1 when a p50, p99 or max is over budget, or
+when the script no longer plays out that way and needs recording again.
+
+Timings are compared after scaling the baseline by how fast the machine
+runs a fixed piece of Python now, against how fast it ran it when the
+baseline was saved, so that a machine that's busier or slower than it was
+doesn't fail the budget on its own.
+
+Run from the repository root with:
+    python -m benchmarks.scenario [--budget ratio] [--save-baseline]
+    python -m benchmarks.scenario --record'''
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# play in a window the same as the game does, without showing it
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from settings import *
+from replay import MOVES, Recorder, Replay
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_FILE = os.path.join(DIRECTORY, 'scenario.txt')
+BASELINE_FILE = os.path.join(DIRECTORY, 'scenario_baseline.json')
+
+# how many times slower than the baseline a measurement may be
+BUDGET = 1.5
+# the max update and draw are a single frame each, which the scheduler can
+# hold up at any time, so they're allowed this many times the budget
+SPIKE_ALLOWANCE = 1.5
+# loops of the fixed piece of Python timed to tell how fast the machine is
+CALIBRATION_LOOPS = 200000
+# the level is timed this many times and each frame's quickest kept
+REPEATS = 3
+# a script must have played the level out within this many frames
+MAX_FRAMES = FPS * 600
+MAX_RECORDINGS = 20
+
+# names of the moves in the script, in the order of 'replay.MOVES'
+MOVE_NAMES = ('stop', 'up', 'left', 'down', 'right')
+
+# what happens in the level, each of which the script must get to
+EVENTS = ('power pellet', 'ghost eaten', 'death', 'reset', 'bonus fruit',
+          'level clear flash', 'level clear')
+
+MEASUREMENTS = ('update', 'draw', 'update allocated', 'draw allocated')
+STATISTICS = ('p50', 'p99', 'max')
+
+
+def read_script(filename=SCRIPT_FILE):
+    '''The level's random seed and a dictionary from frame number to the
+    moves made in that frame.'''
+
+    seed = None
+    moves = {}
+    with open(filename) as file:
+        for line in file:
+            line = line.split('#')[0].split()
+            if not line:
+                continue
+            if line[0] == 'seed':
+                seed = int(line[1])
+            else:
+                moves.setdefault(int(line[0]), []).append(
+                    MOVES[MOVE_NAMES.index(line[1])])
+    return seed, moves
+
+
+def write_script(seed, moves, filename=SCRIPT_FILE):
+    with open(filename, 'w') as file:
+        file.write("# input script for benchmarks.scenario, recorded with "
+                   "--record\n"
+                   "# the level's seed, then the frame each move is made in "
+                   f"at {FPS} frames a second\n"
+                   f"seed {seed}\n")
+        for frame in sorted(moves):
+            for move in moves[frame]:
+                file.write(f"{frame} {MOVE_NAMES[MOVES.index(move)]}\n")
+
+
+def new_game(backend=RENDER_BACKEND, driver=TEXTURE_DRIVER):
+    '''A game in a window that is never shown, with all of its own hooks
+    off.'''
+
+    from main import Game
+
+    game = Game(backend=backend, driver=driver)
+    game.latency = game.autopilot = game.telemetry = game.recorder = None
+    game.ghost_batch = None
+    return game
+
+
+def note_events(game, events, drawn):
+    '''Add to 'events' what's happening in the frame just stepped.'''
+
+    player = game.player
+    if any(ghost.fright_mode for ghost in game.ghosts):
+        events.add('power pellet')
+    if any(ghost.eaten_mode for ghost in game.ghosts):
+        events.add('ghost eaten')
+    if player.death_animation:
+        events.add('death')
+    elif not drawn and game.playing:
+        events.add('reset')
+    if game.bonus_spawned:
+        events.add('bonus fruit')
+    if player.level_clear and not game.maze_flash:
+        events.add('level clear flash')
+    if not game.playing and player.level_clear:
+        events.add('level clear')
+
+
+def play(game, seed, moves, allocations=False):
+    '''Play the scripted level, timing each update and draw, or measuring
+    the bytes each allocates at its peak with 'allocations'. Returns the
+    update and draw measurements, None for frames that weren't drawn, and
+    the events that happened.'''
+
+    game.rng.seed(seed)
+    game.load_level()
+    game.playing = True
+    game.time_delta = 1 / FPS
+    player = game.player
+
+    if allocations:
+        tracemalloc.start()
+
+        def measure():
+            tracemalloc.reset_peak()
+            return tracemalloc.get_traced_memory()[0]
+
+        def measured(start):
+            return tracemalloc.get_traced_memory()[1] - start
+    else:
+        measure = time.perf_counter
+
+        def measured(start):
+            return time.perf_counter() - start
+
+    updates = []
+    draws = []
+    events = set()
+    frame = 0
+    while game.playing and frame < MAX_FRAMES:
+        for move in moves.get(frame, ()):
+            player.queue_move(move)
+
+        start = measure()
+        drawn = game.step()
+        updates.append(measured(start))
+        if drawn:
+            start = measure()
+            game.draw()
+            draws.append(measured(start))
+        else:
+            draws.append(None)
+
+        note_events(game, events, drawn)
+        frame += 1
+
+    if allocations:
+        tracemalloc.stop()
+    return updates, draws, events
+
+
+def record(game):
+    '''Let the autopilot play levels, held back once for long enough to get
+    caught, until one of them has every event in it, and return its seed and
+    moves.'''
+
+    from autopilot import Autopilot
+
+    with tempfile.TemporaryDirectory() as directory:
+        for attempt in range(MAX_RECORDINGS):
+            autopilot = Autopilot(game)
+            game.autopilot = autopilot
+            game.recorder = Recorder(directory)
+            game.load_level()
+            game.playing = True
+            game.time_delta = 1 / FPS
+
+            events = set()
+            frame = 0
+            while game.playing and frame < MAX_FRAMES:
+                # half way through, stand still until a ghost gets him
+                if ('death' not in events
+                        and game.dots_remain < game.dots_total // 2):
+                    if game.autopilot:
+                        game.autopilot = None
+                        game.player.queue_move(None)
+                elif not game.autopilot:
+                    autopilot.decided_tile = None
+                    game.autopilot = autopilot
+                note_events(game, events, game.step())
+                frame += 1
+
+            game.autopilot = None
+            filename = game.recorder.save()
+            game.recorder = None
+            missing = [event for event in EVENTS if event not in events]
+            print(f"Attempt {attempt + 1}: {frame} frames, "
+                  + (f"missing {', '.join(missing)}" if missing
+                     else "every event"))
+            if not missing:
+                replay = Replay(filename)
+                return replay.seed, {
+                    frame: moves for frame, (time_delta, manual_pause, moves)
+                    in enumerate(replay.frames) if moves}
+            os.remove(filename)
+
+    sys.exit(f"No level played had every event in {MAX_RECORDINGS} attempts")
+
+
+def calibrate():
+    '''Microseconds the quickest of five runs of a fixed piece of plain
+    Python takes, for how fast the machine runs the game's code now.'''
+
+    quickest = math.inf
+    for run in range(5):
+        start = time.perf_counter()
+        values = {}
+        for number in range(CALIBRATION_LOOPS):
+            values[number % 97] = values.get(number % 89, 0) + number * 1.5
+        quickest = min(quickest, time.perf_counter() - start)
+    return quickest * 1e6
+
+
+def statistics(values):
+    '''The p50, p99 and max of the values that aren't None.'''
+
+    values = sorted(value for value in values if value is not None)
+    return {'p50': values[len(values) // 2],
+            'p99': values[min(len(values) * 99 // 100, len(values) - 1)],
+            'max': values[-1]}
+
+
+def measure(game, seed, moves, repeats):
+    '''Play the level 'repeats' times for timings and once more for
+    allocations. Returns the statistics of each measurement, in
+    microseconds and bytes, and the events of the last time played.'''
+
+    updates = draws = None
+    for repeat in range(repeats):
+        times = play(game, seed, moves)
+        if updates is None:
+            updates, draws, events = times
+        else:
+            # the level plays out the same every time, so the quickest of
+            # each frame is the one with the least noise
+            updates = [min(a, b) for a, b in zip(updates, times[0])]
+            draws = [None if a is None else min(a, b)
+                     for a, b in zip(draws, times[1])]
+
+    update_allocated, draw_allocated, events = play(game, seed, moves,
+                                                    allocations=True)
+
+    def microseconds(values):
+        return [None if value is None else value * 1e6 for value in values]
+
+    return {'update': statistics(microseconds(updates)),
+            'draw': statistics(microseconds(draws)),
+            'update allocated': statistics(update_allocated),
+            'draw allocated': statistics(draw_allocated)}, len(updates), events
+
+
+def compare(results, baseline, budget, speed=1):
+    '''Print the results against the baseline, with its timings scaled by
+    'speed'. Returns whether they're all within budget.'''
+
+    within = True
+    print(f"{'':18}" + ''.join(f"{statistic:>22}" for statistic in STATISTICS))
+    for name in MEASUREMENTS:
+        timing = name in ('update', 'draw')
+        unit = 'us' if timing else 'B'
+        cells = []
+        for statistic in STATISTICS:
+            value = results[name][statistic]
+            cell = f"{value:.0f} {unit}"
+            if baseline:
+                expected = baseline[name][statistic] * (speed if timing
+                                                        else 1)
+                allowed = expected * budget
+                if timing and statistic == 'max':
+                    allowed *= SPIKE_ALLOWANCE
+                ratio = value / expected if expected else 0
+                over = value > allowed
+                within = within and not over
+                cell += f" x{ratio:.2f}{' OVER' if over else ''}"
+            cells.append(cell)
+        print(f"{name:18}" + ''.join(f"{cell:>22}" for cell in cells))
+    return within
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help="how many times the baseline each measurement "
+                        f"may be, {BUDGET} by default")
+    parser.add_argument('--repeats', type=int, default=REPEATS,
+                        help="times to play the level for timings")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    parser.add_argument('--record', action='store_true',
+                        help="record a new input script with the autopilot")
+    args = parser.parse_args()
+
+    game = new_game()
+
+    if args.record:
+        seed, moves = record(game)
+        write_script(seed, moves)
+        print(f"Input script written to {SCRIPT_FILE}, "
+              f"{sum(map(len, moves.values()))} moves")
+        return
+
+    seed, moves = read_script()
+    calibration = calibrate()
+    results, frames, events = measure(game, seed, moves, args.repeats)
+    missing = [event for event in EVENTS if event not in events]
+    if missing:
+        print(f"The script no longer gets to: {', '.join(missing)}. Record "
+              "it again with --record")
+        sys.exit(1)
+
+    if args.save_baseline:
+        baseline = {name: {statistic: round(value, 1)
+                           for statistic, value in values.items()}
+                    for name, values in results.items()}
+        baseline['calibration'] = round(calibration, 1)
+        with open(BASELINE_FILE, 'w') as file:
+            json.dump(baseline, file, indent=2)
+            file.write('\n')
+        print(f"Baseline written to {BASELINE_FILE}")
+        compare(results, None, args.budget)
+        return
+
+    baseline = None
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as file:
+            baseline = json.load(file)
+    else:
+        print("No baseline to compare against, store one with "
+              "--save-baseline")
+
+    # baselines saved before calibrating aren't scaled
+    speed = 1
+    if baseline and baseline.get('calibration'):
+        speed = calibration / baseline['calibration']
+    print(f"{frames} frames, budget x{args.budget} of the baseline, whose "
+          f"timings are scaled by x{speed:.2f} for the machine's speed")
+    if not compare(results, baseline, args.budget, speed):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
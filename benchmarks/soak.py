@@ -0,0 +1,147 @@
+'''Plays thousands of headless games back to back the way the cabinet does,
+loading each level, playing it out and showing the post-game screen, and
+reports whether memory grows from one game to the next.
+
+Pac-Man turns at random, so every game ends in a game over, or is cut short
+after --frames frames. Every game is drawn, one frame in --render-every.
+The resident set size and the memory traced by tracemalloc are recorded
+after each game, and the allocations that grew most between the end of the
+warm up and the last game are listed by where they were made.
+
+Run from the repository root with:
+    python -m benchmarks.soak [--games n] [--frames n] [--render-every n]'''
+
+import argparse
+import gc
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from settings import *
+from metrics import resident_set_size
+
+GAMES = 2000
+FRAMES = 3600
+RENDER_EVERY = 15
+# games played before memory is expected to level off, as caches fill
+WARM_UP = 20
+# growth per game below this many bytes counts as flat
+FLAT = 64
+TOP_ALLOCATIONS = 10
+# frames of each allocation's traceback kept by tracemalloc
+TRACEBACK_LIMIT = 4
+
+
+def slope(values):
+    '''Least squares growth of 'values' per step.'''
+
+    count = len(values)
+    if count < 2:
+        return 0
+    mean_x = (count - 1) / 2
+    mean_y = sum(values) / count
+    covariance = sum((x - mean_x) * (y - mean_y)
+                     for x, y in enumerate(values))
+    variance = sum((x - mean_x)**2 for x in range(count))
+    return covariance / variance
+
+
+def play_game(game, rng, frames, render_every):
+    '''Load a level and play it out as 'Game.new_game' does, but as fast as
+    it goes, then show the post-game screen. Returns the frames played.'''
+
+    game.load_level()
+    game.playing = True
+    game.time_delta = 1 / FPS
+    frame = 0
+    while game.playing and frame < frames:
+        if frame % 10 == 0:
+            game.player.queue_move(rng.choice(((0, -1), (-1, 0), (0, 1),
+                                               (1, 0))))
+        if game.step() and frame % render_every == 0:
+            game.render()
+        frame += 1
+
+    if game.playing:
+        game.post_message = "Soak Test"
+        game.playing = False
+    game.show_post_game_screen()
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=GAMES)
+    parser.add_argument('--frames', type=int, default=FRAMES,
+                        help="longest a game may go on for")
+    parser.add_argument('--render-every', type=int, default=RENDER_EVERY)
+    args = parser.parse_args()
+
+    from main import Game
+
+    game = Game(headless=True)
+    # the post-game screen doesn't wait for a key, and no score beats this,
+    # so the high score file is left alone
+    game.wait_for_key = lambda: None
+    game.high_score = math.inf
+    rng = random.Random(0)
+
+    # filled in place, so that recording a game allocates nothing
+    resident = array('q', bytes(8 * args.games))
+    traced = array('q', bytes(8 * args.games))
+    tracemalloc.start(TRACEBACK_LIMIT)
+    # the snapshots themselves
+    ignored = tracemalloc.Filter(False, tracemalloc.__file__)
+    frames = 0
+    start = time.perf_counter()
+    baseline = None
+    for number in range(1, args.games + 1):
+        frames += play_game(game, rng, args.frames, args.render_every)
+        gc.collect()
+        resident[number - 1] = resident_set_size()
+        traced[number - 1] = tracemalloc.get_traced_memory()[0]
+
+        if number == WARM_UP:
+            baseline = tracemalloc.take_snapshot().filter_traces((ignored,))
+        if number % 100 == 0 or number == args.games:
+            print(f"{number:6} games, {frames} frames, "
+                  f"{time.perf_counter() - start:.0f} s: resident "
+                  f"{resident[number - 1] / 2**20:.1f} MiB, traced "
+                  f"{traced[number - 1] / 2**20:.2f} MiB", flush=True)
+
+    settled = slice(WARM_UP, None) if args.games > WARM_UP else slice(None)
+    resident_growth = slope(resident[settled])
+    traced_growth = slope(traced[settled])
+    print(f"\nAfter {min(WARM_UP, args.games)} games of warm up, memory grew "
+          f"by {traced_growth:.0f} bytes traced and {resident_growth:.0f} "
+          f"bytes resident a game")
+
+    if baseline:
+        differences = [difference for difference in
+                       tracemalloc.take_snapshot().filter_traces(
+                           (ignored,)).compare_to(baseline, 'traceback')
+                       if difference.size_diff > 0]
+        if differences:
+            print(f"Allocations that grew most since game {WARM_UP}:")
+        for difference in differences[:TOP_ALLOCATIONS]:
+            print(f"  {difference.size_diff:+9} bytes in "
+                  f"{difference.count_diff:+6} blocks, allocated by")
+            for line in difference.traceback.format(limit=4,
+                                                    most_recent_first=True):
+                print(f"    {line}")
+
+    if traced_growth > FLAT:
+        print(f"Memory grows by more than {FLAT} bytes a game")
+        sys.exit(1)
+    print("Memory stays flat")
+
+
+if __name__ == '__main__':
+    main()
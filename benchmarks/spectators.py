@@ -0,0 +1,123 @@
+'''Measures the bandwidth streaming a game to spectators takes and the CPU
+time it adds to the game's process for each spectator watching.
+
+The game is played at FPS from the input script of benchmarks.scenario, with
+the spectators in another process reading as fast as they can.
+
+Run from the repository root with:  python -m benchmarks.spectators'''
+
+import multiprocessing
+import os
+import selectors
+import socket
+import tempfile
+import time
+
+from settings import *
+from simulation import Simulation
+from stream import Broadcaster
+from benchmarks.scenario import read_script
+
+SPECTATORS = (0, 1, 4, 16, 64)
+SECONDS = 5
+
+
+def watch(address, count, connected, results):
+    '''Connect 'count' spectators and read everything sent to them until the
+    game hangs up, then put how many bytes each received in 'results'.'''
+
+    selector = selectors.DefaultSelector()
+    received = {}
+    for spectator in range(count):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.connect(address)
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+        received[sock] = 0
+    connected.set()
+
+    while selector.get_map():
+        for key, events in selector.select():
+            data = key.fileobj.recv(65536)
+            if data:
+                received[key.fileobj] += len(data)
+            else:
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+    results.put(list(received.values()))
+
+
+def play(spectators, seed, moves, directory):
+    '''Play SECONDS of the scripted level at FPS, streaming it to
+    'spectators' spectators, or not streaming at all with None. Returns the
+    CPU seconds the game's process used, the bytes each spectator received
+    and the broadcaster.'''
+
+    game = Simulation()
+    game.rng.seed(seed)
+    game.load_level()
+    game.playing = True
+    game.time_delta = 1 / FPS
+
+    broadcaster = watcher = None
+    if spectators is not None:
+        address = os.path.join(directory, f'game{spectators}.sock')
+        broadcaster = Broadcaster(address)
+        context = multiprocessing.get_context('spawn')
+        connected = context.Event()
+        results = context.Queue()
+        watcher = context.Process(target=watch, args=(
+            address, spectators, connected, results))
+        watcher.start()
+        connected.wait()
+
+    start = time.process_time()
+    next_frame = time.perf_counter()
+    for frame in range(SECONDS * FPS):
+        for move in moves.get(frame, ()):
+            game.player.queue_move(move)
+        if game.step() and broadcaster:
+            broadcaster.send_frame(game)
+
+        # keep to the frame rate like the game does, asleep in between
+        next_frame += 1 / FPS
+        time.sleep(max(0, next_frame - time.perf_counter()))
+    cpu_time = time.process_time() - start
+
+    received = []
+    if broadcaster:
+        broadcaster.close()
+        received = results.get()
+        watcher.join()
+    return cpu_time, received, broadcaster
+
+
+def main():
+    seed, moves = read_script()
+    frames = SECONDS * FPS
+
+    with tempfile.TemporaryDirectory() as directory:
+        base_time, received, broadcaster = play(None, seed, moves, directory)
+        print(f"Game alone: {base_time / frames * 1e6:7.1f} us of CPU a frame")
+        print(f"{'spectators':>10} {'CPU a frame':>13} {'per spectator':>14} "
+              f"{'encode':>9} {'send each':>10} {'KiB/s each':>11}")
+
+        for spectators in SPECTATORS:
+            cpu_time, received, broadcaster = play(spectators, seed, moves,
+                                                   directory)
+            if not spectators:
+                # nothing is encoded or sent with no one watching
+                print(f"{spectators:10} {cpu_time / frames * 1e6:10.1f} us")
+                continue
+
+            added = (cpu_time - base_time) / frames
+            send_time = broadcaster.send_time / broadcaster.messages_sent
+            bandwidth = sum(received) / len(received) / SECONDS / 1024
+            print(f"{spectators:10} {cpu_time / frames * 1e6:10.1f} us "
+                  f"{added / spectators * 1e6:11.1f} us "
+                  f"{broadcaster.encode_time / frames * 1e6:6.1f} us "
+                  f"{send_time * 1e6:7.1f} us {bandwidth:11.2f}")
+
+
+if __name__ == '__main__':
+    main()
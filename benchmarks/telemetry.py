@@ -0,0 +1,100 @@
+'''Measures what recording heat maps adds to each frame, the writes every
+TELEMETRY_FLUSH_INTERVAL seconds included, against TELEMETRY_BUDGET.
+
+The calls a frame of play makes are timed on their own, over enough frames
+for the writes to come round many times: a visit for Pac-Man and each ghost,
+a pellet eaten, and the tick that has the counts written out. That's more
+than most frames make, as a pellet is eaten only every few. The loop's own
+cost is timed without the calls and taken off. The slowest tick, which is
+the frame a write is due in, and a write waited on as on exit are timed
+too.
+
+Run from the repository root with:  python -m benchmarks.telemetry'''
+
+import os
+import tempfile
+import time
+
+from settings import *
+from simulation import Rect
+from telemetry import GRID_COLUMNS, GRID_ROWS, Telemetry
+
+# enough for a write every TELEMETRY_FLUSH_INTERVAL seconds at FPS to come
+# round WRITES times, and half an interval more for the last to be done in
+WRITES = 20
+FRAMES = round((WRITES + .5) * TELEMETRY_FLUSH_INTERVAL * FPS)
+REPEATS = 5
+GHOSTS = 4
+
+
+def actor_rects():
+    '''Rects for actors spread all over the maze, one for each tile.'''
+
+    return [Rect(column * TILESIZE + 3, row * TILESIZE + 3, 14, 14)
+            for row in range(GRID_ROWS) for column in range(GRID_COLUMNS)]
+
+
+def time_frames(telemetry, rects):
+    '''Time FRAMES frames of recording calls. Returns the time per frame
+    with and without the calls, and the slowest tick.'''
+
+    count = len(rects)
+    total = GRID_COLUMNS * GRID_ROWS
+    time_delta = 1 / FPS
+    pacman_visit = telemetry.pacman_visit
+    ghost_visit = telemetry.ghost_visit
+    pellet_eaten = telemetry.pellet_eaten
+    tick = telemetry.tick
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        rect = rects[frame % count]
+        pacman_visit(rect)
+        for ghost in range(GHOSTS):
+            ghost_visit(rects[(frame + ghost * 97) % count])
+        pellet_eaten(rect, frame % total, total)
+        tick(time_delta)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        rect = rects[frame % count]
+        for ghost in range(GHOSTS):
+            rects[(frame + ghost * 97) % count]
+    loop = time.perf_counter() - start
+
+    slowest = 0
+    for frame in range(FRAMES):
+        start = time.perf_counter()
+        tick(time_delta)
+        slowest = max(slowest, time.perf_counter() - start)
+
+    return elapsed / FRAMES, loop / FRAMES, slowest
+
+
+def main():
+    rects = actor_rects()
+    with tempfile.TemporaryDirectory() as directory:
+        telemetry = Telemetry(os.path.join(directory, 'telemetry.bin'))
+
+        # keep the quickest of each, the least disturbed by anything else
+        results = [time_frames(telemetry, rects) for repeat in range(REPEATS)]
+        frame_time = min(result[0] for result in results)
+        loop_time = min(result[1] for result in results)
+        slowest_tick = min(result[2] for result in results)
+
+        start = time.perf_counter()
+        telemetry.flush()
+        flush_time = time.perf_counter() - start
+
+    overhead = frame_time - loop_time
+    print(f"Recording a frame:  {overhead * 1e6:6.2f} us, budget "
+          f"{TELEMETRY_BUDGET * 1e6:.2f} us, "
+          f"{'within' if overhead <= TELEMETRY_BUDGET else 'OVER'} budget, "
+          f"over {FRAMES} frames and {WRITES} writes")
+    print(f"Slowest tick:       {slowest_tick * 1e6:6.2f} us")
+    print(f"Write on exit:      {flush_time * 1e6:6.0f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import math
+import time
+
+
+def percentile(samples, fraction):
+    '''Nearest-rank percentile of an already sorted list of samples.'''
+
+    if not samples:
+        return 0
+    index = min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+class InputLatencyTracker:
+    '''Measures the time from a movement key press being read from the event
+    queue to the first presented frame that shows Pac-Man turning. How long
+    the press waited in SDL's queue before it was read isn't counted, as
+    pygame's events don't say when they happened. Moves made by anything
+    but the keyboard aren't timestamped, so aren't measured.
+
+    Only turns made straight away are measured. A turn buffered until Pac-Man
+    reaches an opening waits on purpose, so timing it would measure the maze
+    rather than the game.'''
+
+    def __init__(self):
+        self.samples = []
+        self.pending = []  # timestamps of turns not yet on screen
+
+    def turn_made(self, timestamp):
+        '''Called when a key press has changed Pac-Man's direction.'''
+
+        self.pending.append(timestamp)
+
+    def frame_presented(self):
+        '''Called straight after the display is flipped.'''
+
+        if self.pending:
+            now = time.perf_counter()
+            self.samples.extend(now - stamp for stamp in self.pending)
+            self.pending.clear()
+
+    def report(self):
+        '''Summarise the measured latencies in milliseconds.'''
+
+        if not self.samples:
+            return "Input latency: no turns measured."
+
+        samples = sorted(self.samples)
+        summary = ", ".join(
+            f"p{round(fraction * 100)} {percentile(samples, fraction) * 1000:.1f}"
+            for fraction in (.5, .9, .99))
+        return (f"Input latency over {len(samples)} turns (ms): {summary}, "
+                f"max {samples[-1] * 1000:.1f}")
@@ -0,0 +1,351 @@
+import os
+import sys
+from contextlib import contextmanager
+
+# environments are headless, make sure pygame never tries to open a window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import math
+
+import numpy as np
+
+from settings import *
+from simulation import TIMER_EPSILON, Simulation
+
+GRID_COLUMNS = int(GRID_WIDTH)
+GRID_ROWS = int(GRID_HEIGHT)
+
+# observation channels, one tile grid each
+WALL_CHANNEL = 0
+PELLET_CHANNEL = 1
+POWER_PELLET_CHANNEL = 2
+CHASE_GHOST_CHANNEL = 3
+SCATTER_GHOST_CHANNEL = 4
+FRIGHT_GHOST_CHANNEL = 5
+EATEN_GHOST_CHANNEL = 6
+PACMAN_CHANNEL = 7
+NUM_CHANNELS = 8
+
+# weights for converting RGB to grayscale, out of 256
+GRAYSCALE_WEIGHTS = (77, 150, 29)
+
+# the direction each action moves in, action 0 makes no move and keeps
+# Pac-Man going the way he was
+ACTION_DIRECTIONS = (None, (0, -1), (-1, 0), (0, 1), (1, 0))
+
+
+def tile_of(rect):
+    '''Row and column of the tile a rect's centre is in. Clamped so that
+    actors half way through the tunnel stay on the grid.'''
+
+    column = min(max(rect.centerx // TILESIZE, 0), GRID_COLUMNS - 1)
+    row = min(max(rect.centery // TILESIZE, 0), GRID_ROWS - 1)
+    return row, column
+
+
+class PacManEnv:
+    '''Gym-style environment wrapping a Simulation, or a headless Game when
+    observations are pixels.
+
+    'reset' and 'step' follow the Gymnasium API. Observations are a uint8
+    array of NUM_CHANNELS tile grids (walls, pellets, power pellets, ghosts by
+    mode and Pac-Man), each cell counting how many of that thing are on the
+    tile. Walls and pellets are only drawn in full on reset, after that eaten
+    pellets are counted off and actors are moved cell by cell.
+    The reward is the change in score, so dying is penalised by the score
+    being halved.
+
+    Pauses (the pre-game countdown, eating a ghost, death and level clear) are
+    played through inside 'step', so every observation is one where an action
+    has an effect. The observation array is reused between steps, copy it to
+    keep it.
+
+    With 'pixels' set, observations are the rendered frame instead, as a
+    (height, width, 3) array, or (height, width) with 'grayscale'. Every
+    'downsample'th pixel is kept in each axis.
+
+    With 'macro_steps' set, frames in which nothing needs deciding are played
+    together, by 'fastforward.MacroSteps', with the same outcome. Only
+    animations, such as the frame Pac-Man's mouth is on, can differ.'''
+
+    def __init__(self, frame_skip=4, time_delta=1 / FPS, max_steps=None,
+                 pixels=False, downsample=1, grayscale=False,
+                 observation=None, macro_steps=False):
+        ''''observation' can be a preallocated array to write observations
+        into, which is how the vector environment batches them.'''
+
+        if pixels:
+            # only rendering needs pygame, tile observations go without it
+            from main import Game
+            self.game = Game(headless=True)
+        else:
+            self.game = Simulation()
+        if macro_steps:
+            from fastforward import MacroSteps
+            self.game.macro_steps = MacroSteps(self.game)
+        self.frame_skip = frame_skip
+        self.time_delta = time_delta
+        self.max_steps = max_steps
+        self.pixels = pixels
+        self.downsample = downsample
+        self.grayscale = grayscale
+
+        if observation is None:
+            observation = np.zeros(
+                self.observation_shape(pixels, downsample, grayscale),
+                np.uint8)
+        self.observation = observation
+
+        if pixels:
+            # byte offset of red, green and blue within each 32-bit pixel
+            shifts = self.game.screen.get_shifts()[:3]
+            if sys.byteorder == 'little':
+                self.rgb_bytes = [shift // 8 for shift in shifts]
+            else:
+                self.rgb_bytes = [3 - shift // 8 for shift in shifts]
+
+            if grayscale:
+                self.grayscale_sum = np.zeros(observation.shape, np.uint16)
+                self.grayscale_term = np.zeros(observation.shape, np.uint16)
+
+    @staticmethod
+    def observation_shape(pixels=False, downsample=1, grayscale=False):
+        '''Shape of the observations for the given options.'''
+
+        if not pixels:
+            return (NUM_CHANNELS, GRID_ROWS, GRID_COLUMNS)
+
+        shape = (math.ceil(HEIGHT / downsample), math.ceil(WIDTH / downsample))
+        return shape if grayscale else shape + (3,)
+
+    def reset(self, seed=None):
+        '''Start a new game and return the first observation and info.'''
+
+        game = self.game
+        if seed is not None:
+            game.rng.seed(seed)
+
+        game.load_level()
+        game.playing = True
+        game.time_delta = self.time_delta
+
+        self.steps = 0
+        self.last_score = 0
+        self.skip_pauses()
+        if self.pixels:
+            self.render_pixels()
+        else:
+            self.build_observation()
+
+        return self.observation, self.get_info()
+
+    def step(self, action):
+        '''Make the action's move, advance 'frame_skip' frames and return the
+        observation, reward, terminated, truncated and info.'''
+
+        game = self.game
+        direction = ACTION_DIRECTIONS[action]
+        if direction is not None:
+            game.player.queue_move(direction)
+
+        game.fast_forward(self.frame_skip)
+        self.skip_pauses()
+
+        self.steps += 1
+        if self.pixels:
+            self.render_pixels()
+        else:
+            self.update_observation()
+
+        score = game.player.score
+        reward = score - self.last_score
+        self.last_score = score
+
+        terminated = not game.playing
+        truncated = (not terminated and self.max_steps is not None
+                     and self.steps >= self.max_steps)
+
+        return self.observation, reward, terminated, truncated, self.get_info()
+
+    def skip_pauses(self):
+        '''Play out frames until the game is no longer paused or is over.'''
+
+        game = self.game
+        player = game.player
+        while game.playing and (game.pause_countdown > TIMER_EPSILON
+                                or player.death_animation
+                                or player.level_clear):
+            # the rest of the pause, and after it the frame that handles
+            # a death or level clear
+            game.fast_forward(max(1, math.ceil(
+                (game.pause_countdown - TIMER_EPSILON) / game.time_delta)))
+
+    def get_info(self):
+        game = self.game
+        return {'score': game.player.score,
+                'lives': game.player.lives,
+                'dots_remain': game.dots_remain,
+                'steps': self.steps}
+
+    @contextmanager
+    def pixel_view(self):
+        '''Zero-copy (height, width, 4) view of the rendered frame's memory,
+        taken through the surface's buffer protocol. Use 'rgb_bytes' to find
+        each colour's byte. The surface stays locked while a view of it
+        exists, so don't hold on to it past the 'with' block.'''
+
+        screen = self.game.screen
+        buffer = screen.get_buffer()
+        view = np.ndarray((HEIGHT, WIDTH, 4), np.uint8, buffer,
+                          strides=(screen.get_pitch(), 4, 1))
+        try:
+            yield view
+        finally:
+            del view
+            del buffer
+
+    def render_pixels(self):
+        '''Render the frame and write it, downsampled and grayscaled as asked,
+        into the observation. The only full pass over the frame is the render
+        itself, the rest works a channel at a time on strided views of it,
+        which is far quicker than reordering whole pixels.'''
+
+        self.game.render()
+        with self.pixel_view() as view:
+            view = view[::self.downsample, ::self.downsample]
+            observation = self.observation
+
+            if not self.grayscale:
+                for channel, byte in enumerate(self.rgb_bytes):
+                    np.copyto(observation[..., channel], view[..., byte])
+                return
+
+            total = self.grayscale_sum
+            term = self.grayscale_term
+            for channel, byte in enumerate(self.rgb_bytes):
+                np.multiply(view[..., byte], GRAYSCALE_WEIGHTS[channel],
+                            out=term, dtype=np.uint16)
+                if channel:
+                    total += term
+                else:
+                    total[:] = term
+            np.right_shift(total, 8, out=observation, casting='unsafe')
+
+    def build_observation(self):
+        '''Draw every channel from scratch, only needed on reset.'''
+
+        game = self.game
+        observation = self.observation
+        observation[:] = 0
+
+        for wall in game.walls:
+            rect = wall.rect
+            observation[WALL_CHANNEL,
+                        rect.top // TILESIZE:rect.bottom // TILESIZE,
+                        rect.left // TILESIZE:rect.right // TILESIZE] = 1
+
+        for pellet in game.pellet_list:
+            if pellet.alive() and not pellet.bonus:
+                observation[self.pellet_cell(pellet)] += 1
+        self.eaten_cursor = len(game.eaten_pellets)
+
+        self.actor_cells = []
+        self.place_actors()
+
+    def update_observation(self):
+        '''Clear pellets eaten since the last step and move the actors.'''
+
+        game = self.game
+        observation = self.observation
+
+        eaten_pellets = game.eaten_pellets
+        for index in eaten_pellets[self.eaten_cursor:]:
+            pellet = game.pellet_list[index]
+            if not pellet.bonus:
+                observation[self.pellet_cell(pellet)] -= 1
+        self.eaten_cursor = len(eaten_pellets)
+
+        # actors can share a cell, so they're counted in and out
+        for cell in self.actor_cells:
+            observation[cell] -= 1
+        self.place_actors()
+
+    def pellet_cell(self, pellet):
+        '''The maze has some pellets stacked on the same tile, so pellet
+        channels hold how many pellets are left on each tile.'''
+
+        channel = POWER_PELLET_CHANNEL if pellet.powered else PELLET_CHANNEL
+        return (channel,) + tile_of(pellet.rect)
+
+    def place_actors(self):
+        '''Add Pac-Man and the ghosts to their channels.'''
+
+        game = self.game
+        cells = self.actor_cells
+        cells.clear()
+
+        cells.append((PACMAN_CHANNEL,) + tile_of(game.player.rect))
+        for ghost in game.ghosts:
+            if ghost.eaten_mode:
+                channel = EATEN_GHOST_CHANNEL
+            elif ghost.fright_mode:
+                channel = FRIGHT_GHOST_CHANNEL
+            elif ghost.scatter_mode:
+                channel = SCATTER_GHOST_CHANNEL
+            else:
+                channel = CHASE_GHOST_CHANNEL
+            cells.append((channel,) + tile_of(ghost.rect))
+
+        observation = self.observation
+        for cell in cells:
+            observation[cell] += 1
+
+
+class PacManVectorEnv:
+    '''Steps several environments per call with batched arrays.
+
+    Each environment writes its observation straight into its slice of one
+    (num_envs, ...) array, so nothing is stacked or copied. Environments
+    that finish are reset straight away; their last info is kept under
+    'final_info', but their last observation is replaced by the new game's
+    first one.'''
+
+    def __init__(self, num_envs, **env_kwargs):
+        self.num_envs = num_envs
+        shape = PacManEnv.observation_shape(
+            env_kwargs.get('pixels', False), env_kwargs.get('downsample', 1),
+            env_kwargs.get('grayscale', False))
+        self.observations = np.zeros((num_envs,) + shape, np.uint8)
+        self.rewards = np.zeros(num_envs, np.int64)
+        self.terminated = np.zeros(num_envs, bool)
+        self.truncated = np.zeros(num_envs, bool)
+
+        self.envs = [PacManEnv(observation=self.observations[i], **env_kwargs)
+                     for i in range(num_envs)]
+
+    def reset(self, seed=None):
+        '''Reset every environment, seeding them 'seed', 'seed' + 1, etc.'''
+
+        infos = []
+        for i, env in enumerate(self.envs):
+            infos.append(env.reset(None if seed is None else seed + i)[1])
+        return self.observations, infos
+
+    def step(self, actions):
+        '''Step each environment with its action from 'actions'.'''
+
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, reward, terminated, truncated, info = env.step(int(actions[i]))
+            if terminated or truncated:
+                final_info = info
+                info = env.reset()[1]
+                info['final_info'] = final_info
+
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            infos.append(info)
+
+        return (self.observations, self.rewards, self.terminated,
+                self.truncated, infos)
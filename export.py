@@ -0,0 +1,154 @@
+'''Renders a recorded replay to raw RGB frames, as fast as they can be drawn.
+
+Run from the repository root with:
+    python export.py replay [--output file] [--start s] [--end s] [--jobs n]
+
+Frames are WIDTH x HEIGHT, 3 bytes a pixel, one for every frame of play, so
+they can be piped straight into an encoder, for example:
+    python export.py replays/game.replay --output - | ffmpeg -f rawvideo
+        -pixel_format rgb24 -video_size 560x720 -framerate 60 -i - game.mp4'''
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from settings import *
+from replay import Replay
+
+# render off screen, whatever display there is, and keep pygame's greeting
+# out of frames written to standard output
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+
+def frame_range(replay, start_time, end_time):
+    '''Indices of the first frame at or after 'start_time' seconds into the
+    replay and the first one at or after 'end_time'.'''
+
+    times = list(accumulate(time_delta for time_delta, *_ in replay.frames))
+    start = end = 0
+    for index, frame_time in enumerate(times):
+        if frame_time <= start_time:
+            start = index + 1
+        if end_time is None or frame_time <= end_time:
+            end = index + 1
+    return start, end
+
+
+def export_frames(replay_file, start, end, output):
+    '''Play the replay in a headless game and write the frames drawn from
+    'start' up to 'end' to the binary file 'output'. Returns how many were
+    written.
+
+    The game's render target is 32 bits a pixel, so each frame is blitted
+    into one surface kept for the whole export that is laid out as RGB in
+    memory, and written straight from that surface's buffer.'''
+
+    import pygame as pg
+    from main import Game
+
+    replay = Replay(replay_file)
+    game = Game(headless=True)
+    replay.start(game)
+
+    if sys.byteorder == 'little':
+        masks = (0xff, 0xff00, 0xff0000, 0)
+    else:
+        masks = (0xff0000, 0xff00, 0xff, 0)
+    rgb = pg.Surface((WIDTH, HEIGHT), 0, 24, masks)
+    row_bytes = WIDTH * 3
+    pitch = rgb.get_pitch()
+
+    written = 0
+    for index in replay.play(game, start, end):
+        game.render()
+        rgb.blit(game.screen, (0, 0))
+        # the surface is locked while its buffer is held, so let go of it
+        # before the next blit
+        buffer = memoryview(rgb.get_buffer())
+        if pitch == row_bytes:
+            output.write(buffer)
+        else:
+            # rows are padded to whole words
+            for row in range(0, pitch * HEIGHT, pitch):
+                output.write(buffer[row:row + row_bytes])
+        buffer.release()
+        written += 1
+
+    pg.quit()
+    return written
+
+
+def export_part(replay_file, start, end, part_file):
+    '''Export a range of frames to a file of its own, in another process.'''
+
+    with open(part_file, 'wb') as output:
+        return export_frames(replay_file, start, end, output)
+
+
+def export(replay_file, output, start, end, jobs):
+    '''Export frames 'start' to 'end', splitting them into ranges that are
+    rendered by 'jobs' processes at once and then joined in order. Each
+    process still has to play the frames before its range, but stepping the
+    game costs a small fraction of drawing it.'''
+
+    if jobs <= 1:
+        return export_frames(replay_file, start, end, output)
+
+    bounds = [start + (end - start) * job // jobs for job in range(jobs + 1)]
+    directory = None if output is sys.stdout.buffer else os.path.dirname(
+        os.path.abspath(output.name))
+    with tempfile.TemporaryDirectory(dir=directory) as parts_dir:
+        part_files = [os.path.join(parts_dir, f'{job}.rgb')
+                      for job in range(jobs)]
+        with ProcessPoolExecutor(jobs) as executor:
+            written = sum(executor.map(
+                export_part, [replay_file] * jobs, bounds[:-1], bounds[1:],
+                part_files))
+
+        for part_file in part_files:
+            with open(part_file, 'rb') as part:
+                shutil.copyfileobj(part, output, 1 << 20)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('replay')
+    parser.add_argument('--output', help="file to write the frames to, or - "
+                        "for standard output, defaults to the replay's name "
+                        "with .rgb")
+    parser.add_argument('--start', type=float, default=0,
+                        help="seconds into the replay to start at")
+    parser.add_argument('--end', type=float,
+                        help="seconds into the replay to stop at")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="processes to render ranges of frames in")
+    args = parser.parse_args()
+
+    replay = Replay(args.replay)
+    start, end = frame_range(replay, args.start, args.end)
+    play_time = sum(time_delta for time_delta, *_ in replay.frames[start:end])
+
+    began = time.perf_counter()
+    if args.output == '-':
+        written = export(args.replay, sys.stdout.buffer, start, end, args.jobs)
+        sys.stdout.buffer.flush()
+    else:
+        filename = args.output or os.path.splitext(args.replay)[0] + '.rgb'
+        with open(filename, 'wb') as output:
+            written = export(args.replay, output, start, end, args.jobs)
+    took = time.perf_counter() - began
+
+    print(f"Exported {written} {WIDTH}x{HEIGHT} RGB frames of {play_time:.1f} s "
+          f"of play in {took:.1f} s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
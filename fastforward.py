@@ -0,0 +1,317 @@
+import math
+
+from settings import *
+from simulation import TIMER_EPSILON, Clyde, Rect, tiles_under
+from junctions import DIRECTIONS, REVERSE, JunctionGraph, open_neighbours
+
+# a step ends this many frames short of where an event is worked out to be,
+# so that rounding never carries it a frame past one
+FRAME_EPSILON = 1e-6
+
+
+class MacroSteps:
+    '''Works out how many frames 'Simulation.fast_forward' can play as one
+    step, with the same outcome as playing them one at a time.
+
+    Between decision points nobody has a choice to make: a ghost in a
+    corridor can only follow it, and Pac-Man carries straight on. So the
+    maze is compiled into a junction graph, and a step runs up to the frame
+    in which the first of these could happen:
+
+    + a ghost reaches a junction, or a tile where it stops or its choice is
+      limited, where it chooses its way on, or any tile while it and another
+      are frightened. They each pick a way at random at every tile, and
+      within a step each ghost moves all the way before the next, so a step
+      can only have them picking in one frame, to take their turns with the
+      random numbers as they would have
+    + Pac-Man reaches a tile where he turns or stops, or touches a pellet,
+      one of which he eats a frame
+    + a pause, mode timer or the bonus fruit's timer runs out, or an eaten
+      ghost gets back and turns back
+    + Pac-Man could first touch a ghost, or come within Clyde's radius, or
+      touch a power pellet or the last pellet
+
+    Anything moving gets there in the step's last frame, where it turns as
+    it would have. The rest change how the ghosts move or count time from
+    the frame they happen in, and the ghosts move after Pac-Man, so they
+    get a frame of their own. Distances are measured in
+    straight lines at full speed and never overestimated. Moves Pac-Man is
+    given are made in a frame of their own, and with the autopilot steering
+    him every tile is a decision point, as it decides at each.'''
+
+    def __init__(self, game):
+        self.game = game
+        self.walls = None  # the walls the graph was compiled from
+
+    def compile_maze(self):
+        '''Compile the junction graph of the level that's loaded.'''
+
+        game = self.game
+        self.walls = game.walls
+        self.columns = int(game.maze_width) // TILESIZE
+        self.rows = int(game.maze_height) // TILESIZE
+        self.neighbours = open_neighbours(game.walls, self.columns, self.rows)
+
+        # an eaten ghost turns back to normal where it's headed, and no-up
+        # tiles leave a ghost fewer ways on, so both need handling on their
+        # own, wherever they are
+        stops = {self.tile_of(ghost.eaten_target_tile)
+                 for ghost in game.ghosts}
+        stops.update(self.tile_of(coords) for coords in game.noup_coords)
+        self.junctions = JunctionGraph(self.neighbours, stops).junctions
+
+        # tiles from a tile and direction to the next junction
+        self.corridors = {}
+
+    def tile_of(self, position):
+        '''The tile a position lines up with, off the grid for the tunnel's
+        ends.'''
+
+        return int(position.x) // TILESIZE, int(position.y) // TILESIZE
+
+    def direction_index(self, direction):
+        return DIRECTIONS.index((int(direction.x), int(direction.y)))
+
+    def corridor(self, tile, direction):
+        '''How many tiles it is from 'tile', setting off in 'direction' and
+        following the corridor round corners, to the next junction, or to the
+        tile off the edge of the maze where the tunnel wraps around.'''
+
+        key = (tile, direction)
+        length = self.corridors.get(key)
+        if length is not None:
+            return length
+
+        neighbours = self.neighbours
+        length = 0
+        while length < len(neighbours):
+            length += 1
+            if not 0 <= tile[0] + DIRECTIONS[direction][0] < self.columns:
+                break
+            tile = neighbours[tile][direction]
+            if tile is None or tile in self.junctions:
+                break
+            reverse = REVERSE[direction]
+            direction = next(index for index in range(4) if index != reverse
+                             and neighbours[tile][index] is not None)
+        self.corridors[key] = length
+        return length
+
+    def frames(self, limit):
+        '''How many frames of 'time_delta', at least 1 and at most 'limit',
+        the next step can play.'''
+
+        game = self.game
+        tick = game.time_delta
+        player = game.player
+
+        def frames_to(seconds):
+            if seconds > limit * tick:
+                return limit
+            return math.ceil(seconds / tick - FRAME_EPSILON)
+
+        if game.manual_pause:
+            return 1
+        if game.pause_countdown > TIMER_EPSILON:
+            # nothing moves until it's over
+            return max(1, min(limit, frames_to(game.pause_countdown)))
+        if player.lives < 0 or player.level_clear or player.death_animation:
+            return 1  # the frame that handles it
+
+        if game.autopilot:
+            game.autopilot.steer()
+        if player.input_queue or player.first_frame:
+            return 1
+
+        if game.walls is not self.walls:
+            self.compile_maze()
+
+        # got to in the last frame of the step
+        moving, touching = self.pacman_time()
+        frames = frames_to(moving)
+        frightened = sum(ghost.fright_mode for ghost in game.ghosts) > 1
+        for ghost in game.ghosts:
+            frames = min(frames, frames_to(
+                self.ghost_time(ghost, frightened and ghost.fright_mode)))
+        # given a frame of their own
+        frames = min(frames, frames_to(min(touching, self.check_time())) - 1)
+        return max(1, min(limit, frames))
+
+    def pacman_time(self):
+        '''Seconds until Pac-Man could reach a tile where something other than
+        carrying straight on happens or touch a pellet, and until he could
+        touch one that frightens the ghosts or clears the level.'''
+
+        game = self.game
+        player = game.player
+        if not player.direction.length_squared():
+            return math.inf, math.inf
+
+        distance = player.position.distance_to(player.next_tile)
+        if game.autopilot:
+            return (distance / player.speed,
+                    self.pellet_distance(distance, True) / player.speed)
+
+        neighbours = self.neighbours
+        direction = self.direction_index(player.direction)
+        turn = None
+        if (player.new_direction.length_squared()
+                and player.new_direction != player.direction):
+            turn = self.direction_index(player.new_direction)
+
+        tile = self.tile_of(player.next_tile)
+        if (tile not in neighbours and 0 <= tile[0] < self.columns
+                and 0 <= tile[1] < self.rows):
+            return 0, 0  # heading into a wall, which stops him next frame
+        while tile in neighbours and distance < self.columns * TILESIZE:
+            tile_neighbours = neighbours[tile]
+            if (tile_neighbours[direction] is None
+                    or (turn is not None
+                        and tile_neighbours[turn] is not None)
+                    or not 0 <= tile[0] + DIRECTIONS[direction][0]
+                    < self.columns):
+                break
+            tile = tile_neighbours[direction]
+            distance += TILESIZE
+        return (min(distance, self.pellet_distance(distance)) / player.speed,
+                self.pellet_distance(distance, True) / player.speed)
+
+    def pellet_distance(self, limit, powered=False):
+        '''Pixels Pac-Man can go straight on, up to 'limit', before his hit
+        box could touch a pellet's, or with 'powered' one that frightens the
+        ghosts or is the last.'''
+
+        player = self.game.player
+        hitbox = player.hitbox
+        dx, dy = int(player.direction.x), int(player.direction.y)
+        reach = int(limit) + 1
+        swept = Rect(hitbox.x - reach * (dx < 0), hitbox.y - reach * (dy < 0),
+                     hitbox.width + reach * abs(dx),
+                     hitbox.height + reach * abs(dy))
+
+        distance = limit
+        tiles = self.game.pellets.tiles
+        last = self.game.dots_remain <= 1
+        for tile in tiles_under(swept):
+            for pellet in tiles.get(tile, ()):
+                if powered and not (pellet.powered or last):
+                    continue
+                other = pellet.hitbox
+                if dx:
+                    if not (hitbox.y < other.y + other.height
+                            and other.y < hitbox.y + hitbox.height):
+                        continue
+                    ahead = (other.x - hitbox.x - hitbox.width if dx > 0
+                             else hitbox.x - other.x - other.width)
+                    behind = (other.x + other.width <= hitbox.x if dx > 0
+                              else other.x >= hitbox.x + hitbox.width)
+                else:
+                    if not (hitbox.x < other.x + other.width
+                            and other.x < hitbox.x + hitbox.width):
+                        continue
+                    ahead = (other.y - hitbox.y - hitbox.height if dy > 0
+                             else hitbox.y - other.y - other.height)
+                    behind = (other.y + other.height <= hitbox.y if dy > 0
+                              else other.y >= hitbox.y + hitbox.height)
+                # a pixel short, as his hit box is rounded to whole ones
+                if not behind:
+                    distance = min(distance, max(0, ahead - 1))
+        return distance
+
+    def ghost_time(self, ghost, every_tile=False):
+        '''Seconds until a ghost could reach a tile where it has a choice of
+        ways on, or the next tile with 'every_tile', when it's 0 if the ghost
+        is on one and picks its way this frame.'''
+
+        neighbours = self.neighbours
+        if ghost.between_tiles:
+            distance = ghost.position.distance_to(ghost.next_tile)
+            tile = self.tile_of(ghost.next_tile)
+            if (not every_tile and tile in neighbours
+                    and tile not in self.junctions):
+                reverse = REVERSE[self.direction_index(ghost.direction)]
+                direction = next(index for index in range(4)
+                                 if index != reverse
+                                 and neighbours[tile][index] is not None)
+                distance += self.corridor(tile, direction) * TILESIZE
+        elif every_tile:
+            return 0
+        else:
+            # it chooses its way at the start of the frame, so whichever
+            # corridor is shortest
+            tile = self.tile_of(ghost.position)
+            distance = TILESIZE
+            if (tile in neighbours and not ghost.position.x % TILESIZE
+                    and not ghost.position.y % TILESIZE):
+                distance = min(self.corridor(tile, direction)
+                               for direction in range(4)
+                               if neighbours[tile][direction] is not None
+                               ) * TILESIZE
+        return distance / ghost.speed
+
+    def check_time(self):
+        '''Seconds until the first of the things checked at the start of a
+        frame could happen: a timer running out, Pac-Man touching a ghost or
+        coming within Clyde's radius.'''
+
+        game = self.game
+        player = game.player
+        times = [math.inf]
+        if not game.bonus_spawned:
+            times.append(game.bonus_time - game.bonus_timer)
+
+        for ghost in game.ghosts:
+            if ghost.ignore_scatter:
+                pass
+            elif ghost.fright_mode:
+                times.append(ghost.fright_time - ghost.fright_timer)
+            elif (not ghost.eaten_mode
+                  and ghost.scatter_counter < ghost.num_scatter_threshold):
+                times.append((ghost.scatter_time if ghost.scatter_mode
+                              else ghost.chase_time) - ghost.state_timer)
+
+            if isinstance(ghost, Clyde):
+                times.append(self.clyde_time(ghost))
+
+            # an eaten ghost is harmless until it's back where it's headed,
+            # when it turns back, which starts its mode timer again
+            home = ghost.position == ghost.eaten_target_tile
+            if ghost.eaten_mode and home:
+                times.append(0)
+            if not ghost.eaten_mode or home:
+                # and a pixel more, as hit boxes are rounded to whole ones
+                reach = max(player.hitbox.width, player.hitbox.height,
+                            ghost.hitbox.width, ghost.hitbox.height) + 1
+                times.append(
+                    (self.gap(ghost.hitbox.topleft, player.hitbox.topleft)
+                     - reach) / (player.speed + ghost.speed))
+        return min(times)
+
+    def clyde_time(self, clyde):
+        '''Seconds until Clyde's scatter timer or radius could change where he
+        heads. He checks both as he reaches each tile.'''
+
+        if clyde.temp_scatter_mode:
+            left = clyde.temp_scatter_duration - clyde.temp_scatter_timer
+            if left > 0:
+                # it runs out at the end of a frame, so one more is safe
+                return left + self.game.time_delta
+            # over, which he notices at his next tile
+            return (clyde.position.distance_to(clyde.next_tile)
+                    / clyde.speed + self.game.time_delta)
+
+        if clyde.scatter_mode or clyde.eaten_mode or clyde.fright_mode:
+            return math.inf
+        player = self.game.player
+        return ((self.gap(clyde.position, player.position)
+                 - math.sqrt(clyde.scatter_radius))
+                / (player.speed + clyde.speed))
+
+    def gap(self, first, second):
+        '''How far apart two points are along whichever axis they're furthest
+        apart on, the nearer way round if either wraps around the maze.'''
+
+        width = self.game.maze_width
+        dx = abs(first[0] - second[0])
+        dx = min(dx, abs(width - dx), abs(width + TILESIZE - dx))
+        return max(dx, abs(first[1] - second[1]))
@@ -0,0 +1,106 @@
+import math
+import time
+
+from settings import *
+
+# how much each new measurement moves the running costs towards it
+SMOOTHING = .1
+
+
+class FrameSkipper:
+    '''Skips draws rather than letting the game jump when a frame can't be
+    both updated and drawn within 1/FPS seconds.
+
+    How long an update and a draw take is measured as the game plays. While
+    the two fit in a frame, every update is drawn. When they don't, several
+    updates are run for each draw, as few as lets the draws keep up and at
+    most 'limit' skipped draws in a row, and the game loop goes round that
+    many times less often. The time that passed is shared out between the
+    updates, so the game runs at the right speed whatever is skipped and no
+    update moves the actors much further than one at full speed would.'''
+
+    def __init__(self, limit=FRAME_SKIP_LIMIT):
+        self.limit = limit
+        self.budget = 1 / FPS
+        # running averages of the seconds an update and a draw take
+        self.update_cost = 0
+        self.draw_cost = 0
+        self.updates_per_draw = 1
+        # time planned for updates that weren't played, for the next frame
+        self.carried = 0
+
+        self.updates = 0
+        self.skipped = 0
+        self.update_time = 0
+        self.draw_time = 0
+        self.draws = 0
+
+    @property
+    def frame_rate(self):
+        '''How many times a second the game loop should go round.'''
+
+        return FPS / self.updates_per_draw
+
+    def play(self, game, mark=None):
+        '''Play the 'time_delta' since the last frame in as many updates as
+        planned and draw the last one. If the game ends or just resets, the
+        frame isn't drawn and the time of the updates left is played in the
+        next frame. 'mark' is called with 'step' or 'draw' as each starts,
+        for profiling.'''
+
+        updates = self.updates_per_draw
+        game.time_delta = (game.time_delta + self.carried) / updates
+        self.carried = 0
+        for update in range(updates):
+            if mark:
+                mark('step')
+            start = time.perf_counter()
+            shown = game.step()
+            elapsed = time.perf_counter() - start
+            self.update_cost += (elapsed - self.update_cost) * SMOOTHING
+            self.update_time += elapsed
+            self.updates += 1
+            if not shown:
+                # the rest can't be drawn either way, and once the game has
+                # ended there's nothing to play them in
+                if game.playing:
+                    self.carried = game.time_delta * (updates - update - 1)
+                break
+        else:
+            if mark:
+                mark('draw')
+            start = time.perf_counter()
+            game.draw()
+            elapsed = time.perf_counter() - start
+            self.draw_cost += (elapsed - self.draw_cost) * SMOOTHING
+            self.draw_time += elapsed
+            self.draws += 1
+            self.skipped += updates - 1
+
+        self.plan()
+
+    def plan(self):
+        '''Work out how many updates to run for each draw from now on.'''
+
+        spare = self.budget - self.update_cost
+        if self.update_cost + self.draw_cost <= self.budget:
+            updates = 1
+        elif spare <= 0:
+            # updating alone is too slow, skipping as much as we may
+            updates = self.limit + 1
+        else:
+            # n updates and a draw take no longer than n frames
+            updates = math.ceil(self.draw_cost / spare)
+        self.updates_per_draw = min(updates, self.limit + 1)
+
+    def report(self):
+        '''Summarise how many draws were skipped and what frames cost.'''
+
+        if not self.draws:
+            return "Frame skipping: no frames drawn."
+
+        return (f"Frame skipping: {self.skipped} of {self.updates} updates "
+                f"not drawn ({self.skipped / self.updates:.1%}), "
+                f"{self.update_time / self.updates * 1000:.2f} ms an update "
+                f"and {self.draw_time / self.draws * 1000:.2f} ms a draw on "
+                f"average, budget {self.budget * 1000:.2f} ms a frame")
@@ -0,0 +1,118 @@
+'''Shows the heat maps recorded with TELEMETRY over the maze.
+
+Run from the repository root with:  python heatmap.py [file] [--save directory]
+
+Left and right switch between the maps. With --save, no window is opened and
+each map is saved as a PNG named after it instead.'''
+
+import argparse
+import os
+from os import path
+
+import pygame as pg
+
+from settings import *
+from telemetry import MAP_NAMES, read_heat_maps
+
+TITLES = {
+    'pacman_time': "Where Pac-Man spends his time",
+    'ghost_time': "Where the ghosts spend their time",
+    'deaths': "Where Pac-Man gets caught",
+    'ghosts_eaten': "Where ghosts get eaten",
+    'pellets_eaten': "Pellets eaten",
+    'pellet_order': "Pellets eaten last",
+}
+
+
+def map_values(maps, name):
+    '''The values to show for a map. Pellet order is recorded as a sum, so
+    it's shown as the average of how far through the level each tile's
+    pellets were eaten.'''
+
+    if name != 'pellet_order':
+        return list(maps[name])
+    return [total / eaten if eaten else 0
+            for total, eaten in zip(maps['pellet_order'],
+                                    maps['pellets_eaten'])]
+
+
+def draw_heat_map(screen, maze_image, columns, values, title):
+    '''Draw the maze dimmed, then each tile shaded from yellow to red by its
+    share of the highest value.'''
+
+    screen.fill(BACKGROUND_COLOUR)
+    screen.blit(maze_image, (0, 0))
+
+    overlay = pg.Surface(screen.get_size(), pg.SRCALPHA)
+    overlay.fill((0, 0, 0, 140))
+    highest = max(values)
+    if highest:
+        for index, value in enumerate(values):
+            if value:
+                share = value / highest
+                row, column = divmod(index, columns)
+                overlay.fill((255, round(255 * (1 - share)), 0,
+                              round(90 + 150 * share)),
+                             (column * TILESIZE, row * TILESIZE,
+                              TILESIZE, TILESIZE))
+    screen.blit(overlay, (0, 0))
+
+    font = pg.font.Font(pg.font.match_font(FONT_NAME), 22)
+    for line, text in enumerate((title, f"highest: {highest:g}")):
+        text_surface = font.render(text, True, WHITE)
+        text_rect = text_surface.get_rect(center=(WIDTH * .5, 20 + line * 25))
+        screen.blit(text_surface, text_rect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('file', nargs='?', default=TELEMETRY_FILE)
+    parser.add_argument('--save', metavar='directory',
+                        help="save each map as a PNG instead of showing them")
+    args = parser.parse_args()
+
+    columns, rows, maps = read_heat_maps(args.file)
+
+    if args.save:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pg.init()
+    pg.display.set_caption("PAC-MAN heat maps")
+    screen = pg.display.set_mode((WIDTH, HEIGHT))
+
+    # TiledMap is only imported now, since pytmx needs pygame set up
+    from main import TiledMap
+    root = path.dirname(__file__)
+    maze_image = TiledMap(path.join(root, 'maze', 'maze.tmx')).make_map()
+
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+        for name in MAP_NAMES:
+            draw_heat_map(screen, maze_image, columns, map_values(maps, name),
+                          TITLES[name])
+            pg.image.save(screen, path.join(args.save, name + '.png'))
+        pg.quit()
+        return
+
+    shown = 0
+    while True:
+        name = MAP_NAMES[shown]
+        draw_heat_map(screen, maze_image, columns, map_values(maps, name),
+                      TITLES[name])
+        pg.display.flip()
+
+        event = pg.event.wait()
+        if event.type == pg.QUIT:
+            break
+        elif event.type == pg.KEYDOWN:
+            if event.key == pg.K_ESCAPE:
+                break
+            elif event.key in (pg.K_RIGHT, pg.K_d):
+                shown = (shown + 1) % len(MAP_NAMES)
+            elif event.key in (pg.K_LEFT, pg.K_a):
+                shown = (shown - 1) % len(MAP_NAMES)
+
+    pg.quit()
+
+
+if __name__ == '__main__':
+    main()
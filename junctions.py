@@ -0,0 +1,126 @@
+from settings import *
+
+GRID_COLUMNS = int(GRID_WIDTH)
+GRID_ROWS = int(GRID_HEIGHT)
+
+# the four directions, up, left, down, right, and the index of each one's
+# opposite. Matches the order the ghosts give their directions priority in.
+DIRECTIONS = ((0, -1), (-1, 0), (0, 1), (1, 0))
+REVERSE = (2, 3, 0, 1)
+
+
+def open_neighbours(walls, columns=GRID_COLUMNS, rows=GRID_ROWS):
+    '''The open neighbour of every open tile in each direction, None where
+    there's a wall, as a dictionary from (column, row) to four neighbours,
+    for a maze 'columns' by 'rows' tiles. Stepping off one side of the grid
+    wraps to the other.'''
+
+    blocked = [[False] * columns for row in range(rows)]
+    for wall in walls:
+        rect = wall.rect
+        for row in range(rect.top // TILESIZE, rect.bottom // TILESIZE):
+            for column in range(rect.left // TILESIZE,
+                                rect.right // TILESIZE):
+                blocked[row][column] = True
+
+    neighbours = {}
+    for row in range(rows):
+        for column in range(columns):
+            if blocked[row][column]:
+                continue
+            tile_neighbours = []
+            for dx, dy in DIRECTIONS:
+                next_column = (column + dx) % columns
+                next_row = row + dy
+                if (0 <= next_row < rows
+                        and not blocked[next_row][next_column]):
+                    tile_neighbours.append((next_column, next_row))
+                else:
+                    tile_neighbours.append(None)
+            neighbours[(column, row)] = tuple(tile_neighbours)
+    return neighbours
+
+
+class Segment:
+    '''A corridor walked in one direction, from a junction to the next one.
+
+    'tiles' are the tiles entered along the way, ending with the junction at
+    the far end, and 'directions' the direction of each of those steps.
+    A position on the segment is the number of tiles walked from 'start', so
+    'length' is the far end. 'reverse' is the same corridor walked back, where
+    the same spot is at 'length' minus the position.'''
+
+    __slots__ = ('start', 'end', 'tiles', 'directions', 'length', 'reverse')
+
+    def __init__(self, start, tiles, directions):
+        self.start = start
+        self.end = tiles[-1]
+        self.tiles = tuple(tiles)
+        self.directions = tuple(directions)
+        self.length = len(tiles)
+        self.reverse = None
+
+    def tile_at(self, position):
+        '''The last tile reached by 'position'.'''
+
+        index = int(position)
+        return self.tiles[index - 1] if index else self.start
+
+
+class JunctionGraph:
+    '''The maze compiled into junctions and the corridors between them.
+
+    Junctions are the open tiles with other than two ways out, which are the
+    only places anything has a choice of where to go, along with any 'stops'
+    that need handling on their own. Every other tile is part of a corridor,
+    which may turn corners and runs through the tunnel like any other.
+
+    'neighbours' maps each open tile to its neighbour in each direction, or
+    None where there's a wall, the same as the autopilot's forward model.'''
+
+    def __init__(self, neighbours, stops=()):
+        self.neighbours = neighbours
+        self.junctions = {tile for tile, tile_neighbours in neighbours.items()
+                          if len(tile_neighbours) - tile_neighbours.count(None)
+                          != 2}
+        self.junctions.update(tile for tile in stops if tile in neighbours)
+
+        # the segment from each junction in each open direction
+        self.segments = {}
+        # the segment and position for a tile and the direction being taken
+        # from it, for anything that starts part way along a corridor
+        self.along = {}
+        for junction in self.junctions:
+            for direction, neighbour in enumerate(neighbours[junction]):
+                if neighbour is not None:
+                    segment = self.trace(junction, direction)
+                    self.segments[(junction, direction)] = segment
+                    self.along[(junction, direction)] = (segment, 0)
+                    for index in range(1, segment.length):
+                        self.along[(segment.tiles[index - 1],
+                                    segment.directions[index])] = (segment,
+                                                                   index)
+
+        for segment in self.segments.values():
+            segment.reverse = self.segments[
+                (segment.end, REVERSE[segment.directions[-1]])]
+
+    def trace(self, junction, direction):
+        '''Follow the corridor from 'junction' in 'direction' to the next
+        junction.'''
+
+        neighbours = self.neighbours
+        tiles = []
+        directions = []
+        tile = junction
+        while True:
+            tile = neighbours[tile][direction]
+            tiles.append(tile)
+            directions.append(direction)
+            if tile in self.junctions:
+                return Segment(junction, tiles, directions)
+
+            # a corridor has only one way on that isn't back
+            reverse = REVERSE[direction]
+            direction = next(index for index in range(4) if index != reverse
+                             and neighbours[tile][index] is not None)
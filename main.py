@@ -1,39 +1,90 @@
 import pygame as pg
 import pytmx
 
-import os
+import argparse
 import sys
 
 from cryptography.fernet import Fernet
-from pygame.math import Vector2
 from os import path
 import math
+import time
 
 # files
 from settings import *
+from simulation import *
 from sprites import *
-
-
-class Game:
-    ''' Houses game initialisation, loading, loop, drawing and screens. '''
-
-    def __init__(self):
-        '''Initialise pygame, clock, font and windows.'''
+from atlas import load_frames
+from diagnostics import InputLatencyTracker
+from telemetry import Telemetry
+from replay import Recorder
+from autopilot import Autopilot
+from watcher import FileWatcher
+from profiler import ProfileCapture
+from frameskip import FrameSkipper
+from stream import Broadcaster
+from textures import TextureScreen
+from metrics import Metrics
+
+
+class Game(Simulation):
+    ''' Houses game initialisation, loading, loop, drawing and screens. The
+    rules are all in 'Simulation', which this draws and plays from the
+    keyboard. '''
+
+    # direction for each movement key, Space stops Pac-Man
+    movement_keys = {
+        pg.K_LEFT: (-1, 0), pg.K_a: (-1, 0),
+        pg.K_RIGHT: (1, 0), pg.K_d: (1, 0),
+        pg.K_UP: (0, -1), pg.K_w: (0, -1),
+        pg.K_DOWN: (0, 1), pg.K_s: (0, 1),
+        pg.K_SPACE: None,
+    }
+
+    def __init__(self, headless=False, backend=RENDER_BACKEND,
+                 driver=TEXTURE_DRIVER):
+        '''Initialise pygame, clock, font and windows. A headless game renders
+        off screen only and is driven by calling 'step' directly. 'backend'
+        and 'driver' are as RENDER_BACKEND and TEXTURE_DRIVER.'''
         pg.init()
+        super().__init__()
         # pg.mixer.init()  # sound engine
-        self.screen = pg.display.set_mode((WIDTH, HEIGHT))
-        pg.display.set_caption("PAC-MAN")
+        self.headless = headless
+        self.renderer = None  # drawing with textures when set
+        if headless:
+            # images still need a display mode to be converted to
+            if pg.display.get_surface() is None:
+                pg.display.set_mode((1, 1))
+            self.screen = self.window = pg.Surface((WIDTH, HEIGHT)).convert()
+        else:
+            self.create_window(backend, driver)
+            pg.display.set_caption("PAC-MAN")
 
         self.clock = pg.time.Clock()
         self.font_name = pg.font.match_font(FONT_NAME)
+        self.fonts = {}
+        self.text_surfaces = {}
         self.running = True
         self.playing = False
         self.key_debug_text = ""
-
-        self.maze_flash_duration = .25
-        self.maze_flash_alternate = .25
-
-        self.dots_threshold = 30
+        self.latency = (InputLatencyTracker()
+                        if MEASURE_INPUT_LATENCY and not headless else None)
+        self.autopilot = Autopilot(self) if AUTOPILOT else None
+        self.telemetry = Telemetry() if TELEMETRY and not headless else None
+        self.recorder = Recorder() if RECORD_REPLAYS and not headless else None
+        self.watcher = None
+        self.capture = None  # profiling the game loop when set
+        self.broadcaster = None  # streaming to spectators when set
+        self.metrics = None  # serving metrics when set
+        # seconds the last update and draw took, or None if it wasn't drawn
+        self.update_time = 0
+        self.draw_time = None
+        self.games_played = 0
+        self.frame_skip = (FrameSkipper()
+                           if FRAME_SKIP_LIMIT and not headless else None)
+        if BATCH_GHOSTS:
+            # only worth it for swarms of ghosts, and needs numpy
+            from swarm import GhostBatch
+            self.ghost_batch = GhostBatch(self)
 
         # load the high score and key and decrypt the score
         encryptor = SymmetricKeyEncrypt()
@@ -42,14 +93,103 @@ class Game:
             loaded_key, 'highscore.txt',  "Key and or high score has been tampered with!")
 
         # initalise file paths
-        self.root = path.dirname(__file__)
         self.img_dir = path.join(self.root, 'img')
-        self.maze_dir = path.join(self.root, 'maze')
         self.title_img = pg.image.load(path.join(self.img_dir,
                                                  'title_back.png'))
 
+        # every frame the sprites show, from the prebuilt atlas if there is one
+        self.frames = load_frames(path.join(self.img_dir, SPRITESHEET),
+                                  path.join(self.img_dir, SPRITE_ATLAS))
+        # frightened ghosts are slightly see-through
+        self.frames['ghost'][5][0].set_alpha(200)
+        self.pellet_frames = self.frames['pellet'][0]
+        self.fruit_frames = self.frames['fruit'][0]
+
         self.new_game()
 
+    def get_window_scale(self):
+        '''Find how much the render target should be scaled by to fill most
+        of the desktop. A whole number is used whenever it's at least double
+        the size, otherwise the pixels can't stay square without shrinking
+        the window.'''
+
+        if WINDOW_SCALE:
+            return WINDOW_SCALE
+
+        desktop_width, desktop_height = pg.display.get_desktop_sizes()[0]
+        # leave room for the title bar and task bar
+        scale = min(desktop_width / WIDTH, desktop_height * .9 / HEIGHT)
+        if scale >= 2:
+            scale = math.floor(scale)
+
+        return max(scale, 1)
+
+    def create_window(self, backend=RENDER_BACKEND, driver=TEXTURE_DRIVER):
+        '''Create the window and the surface everything is rendered to.
+
+        The game is always drawn to a WIDTH x HEIGHT surface, so scaling is a
+        single nearest-neighbour scale of that surface straight into the
+        window's surface each frame, however many sprites there are. With a
+        resizable window, SDL's SCALED mode does the scaling on the GPU
+        instead and the window's own surface is the render target. The
+        texture backend draws to a 'TextureScreen' in place of a surface.'''
+
+        if backend == 'texture' and self.create_texture_window(driver):
+            return
+
+        if RESIZABLE_WINDOW:
+            self.window = pg.display.set_mode((WIDTH, HEIGHT),
+                                              pg.SCALED | pg.RESIZABLE)
+            self.screen = self.window
+            return
+
+        scale = self.get_window_scale()
+        self.window_size = (round(WIDTH * scale), round(HEIGHT * scale))
+        self.window = pg.display.set_mode(self.window_size)
+
+        if self.window_size == (WIDTH, HEIGHT):
+            self.screen = self.window
+        else:
+            self.screen = pg.Surface((WIDTH, HEIGHT)).convert()
+
+    def create_texture_window(self, driver):
+        '''Create a window drawn by SDL's renderer from textures. Returns
+        False, having said why, if it can't be, to draw to surfaces
+        instead.'''
+
+        if RESIZABLE_WINDOW:
+            size = (WIDTH, HEIGHT)
+        else:
+            scale = self.get_window_scale()
+            size = (round(WIDTH * scale), round(HEIGHT * scale))
+
+        # images are still converted to the display's pixel format, so
+        # there has to be a display mode, which is kept hidden
+        pg.display.set_mode((1, 1), pg.HIDDEN)
+        try:
+            self.renderer = TextureScreen(size, driver, RESIZABLE_WINDOW)
+        except (ImportError, ValueError, pg.error) as error:
+            print(f"Can't draw with textures, drawing surfaces instead: "
+                  f"{error}")
+            return False
+
+        self.window_size = size
+        self.screen = self.window = self.renderer
+        return True
+
+    def present(self):
+        '''Scale the render target to the window if needed and show it.'''
+
+        if self.renderer:
+            self.renderer.present()
+        else:
+            if self.screen is not self.window:
+                pg.transform.scale(self.screen, self.window_size, self.window)
+            pg.display.flip()
+
+        if self.latency:
+            self.latency.frame_presented()
+
     def tint_image(self, image, colour):
         '''Tints an image a specifed colour using pygame blend modes. Used for
         making blue maze image.'''
@@ -62,221 +202,149 @@ class Game:
         return final_image
 
     def new_game(self):
-        ''' Initialise relevant attributes and load graphics and maze '''
+        '''Load a fresh level and play it.'''
+
+        self.load_level()
+        self.game_loop()
+
+        if self.recorder:
+            filename = self.recorder.save()
+            if filename:
+                print(f"Replay written to {filename}")
 
-        def slice_frame_sequence(coords, num_frames):
-            '''Slice a sequence of contiguous frames.'''
-            frames = []
-            for i in range(num_frames):
-                frames.append(self.spritesheet.get_image(
-                    coords.x, coords.y, TILESIZE, TILESIZE))
-                coords.x += TILESIZE
-            return frames
+    def load_level(self):
+        ''' Load the level, and the maze too if it has changed, then the
+        sprites that draw it '''
 
-        self.pause_countdown = 1.5
-        self.pre_game_countdown = True
-        self.manual_pause = False
+        # shown in place of anything hidden
+        self.blank_frame = pg.Surface((TILESIZE, TILESIZE))
+        self.blank_frame.fill(HOTPINK)
+        self.blank_frame.set_colorkey(HOTPINK)
 
-        self.bonus_time = 60  # spawn bonus fruit 60 seconds into game
-        self.bonus_timer = 0  # count the time elapsed since game begun
+        super().load_level()
 
-        self.bonus_spawned = False
-        self.noup_coords = []
+        self.all_sprites = LayeredBatch()  # for sprite layering
+        ActorSprite(self.player, self.frames['pacman'], self.blank_frame,
+                    PLAYER_LAYER, self.all_sprites)
+        for ghost in self.ghosts:
+            ActorSprite(ghost, self.frames['ghost'], self.blank_frame,
+                        GHOST_LAYER, self.all_sprites)
+        self.pellet_sprites = {}
+        self.pellet_version = None
+
+        # compares against the maze as it has just been loaded
+        if WATCH_FILES and not self.headless:
+            self.watcher = FileWatcher(self)
+
+    def read_maze(self):
+        '''Load the maze to draw along with its objects, when it has changed
+        since it was last loaded.'''
+
+        if not super().read_maze():
+            return False
+        self.maze = TiledMap(self.maze_file)
+        self.load_maze_images()
+        return True
+
+    def load_maze_images(self):
+        '''Draw the maze's tile layers into the white and blue maze images.'''
 
-        self.maze = TiledMap(path.join(self.maze_dir, 'maze.tmx'))
         self.maze_white = self.maze.make_map().convert()
-        self.maze_white.set_colorkey(BLACK)
 
         # create blue maze from white maze
         self.maze_blue = self.tint_image(self.maze_white, BLUE)
-        self.maze_img = self.maze_blue
-        self.maze_rect = self.maze_img.get_rect()
-        self.maze_flash = True
-
-        self.spritesheet = Spritesheet(os.path.join(self.img_dir, SPRITESHEET))
-
-        # LOAD GRAPHICS -------------------------------------------------------
-        pacman_frames = [[], [], [], []]
-        ghost_frames = [[], [], [], [], [], [], []]
-
-        # slice Pac-Man's eating frames, he will be facing right
-        slice_coords = Vector2(60, 0)
-        for i in range(4):
-            pacman_frames[0].append(self.spritesheet.get_image(
-                slice_coords.x, slice_coords.y, TILESIZE, TILESIZE))
-            slice_coords.x += TILESIZE
-
-        # using the sliced eating frames, create eating frames for each
-        # orientation, this is faster than rotating frames at run time
-        angle = 90
-        for orientation in range(1, 4):
-            for i in range(4):
-                if orientation != 3:
-                    # append up and down orientations
-                    pacman_frames[orientation].append(
-                        pg.transform.rotate(pacman_frames[0][i], angle))
-                else:
-                    # flip the sprite horizontally
-                    pacman_frames[orientation].append(
-                        pg.transform.flip(pacman_frames[0][i], True, False))
-            angle -= 180
-
-        # slice death frames
-        pacman_frames.append(slice_frame_sequence(Vector2(60, 20), 4))
-
-        # slice ghost frames
-        slice_coords = Vector2(0, 0)
-        for frame_trio in range(7):
-            for i in range(3):
-                ghost_frames[frame_trio].append(self.spritesheet.get_image(
-                    slice_coords.x, slice_coords.y, TILESIZE, TILESIZE))
-                slice_coords.x += TILESIZE
-
-            # append a flipped frame after each ghost colour
-            ghost_frames[frame_trio].append(pg.transform.flip(
-                ghost_frames[frame_trio][1], True, False))
-            slice_coords.y += TILESIZE
-            slice_coords.x = 0
-
-        pellet_frames = slice_frame_sequence(Vector2(60, 40), 3)
-        self.fruit_frames = slice_frame_sequence(Vector2(60, 60), 4)
-
-        self.all_sprites = pg.sprite.LayeredUpdates()  # for sprite layering
-        self.walls = pg.sprite.Group()
-        self.pellets = pg.sprite.Group()
-        self.power_pellets = pg.sprite.Group()
-        self.ghosts = pg.sprite.Group()
-        self.fruits = pg.sprite.Group()
-
-        # iterate through each object in Tiled object layers
-        # object proprieties are given in a dictionary for quick lookup
-        # pass in the appropriate frames for each object.
-        for tile_object in self.maze.tmxdata.objects:
-
-            if tile_object.name == 'pellet_spawn':
-                Pellet(self, tile_object.x, tile_object.y, pellet_frames)
-            elif tile_object.name == 'power_pellet_spawn':
-                PowerPellet(self, tile_object.x, tile_object.y, pellet_frames)
-            elif tile_object.name == 'bonus_spawn':
-                self.bonus_coords = Vector2(tile_object.x, tile_object.y)
-
-            elif tile_object.name == 'wall':
-                WallCollision(self, tile_object.x, tile_object.y,
-                              tile_object.width, tile_object.height)
-
-            elif tile_object.name == 'player_spawn':
-                self.player = Player(self, tile_object.x,
-                                     tile_object.y, pacman_frames)
-
-            elif tile_object.name == 'blinky_spawn':
-                self.blinky = Ghost(self, tile_object.x, tile_object.y,
-                                    ghost_frames)
-            elif tile_object.name == 'pinky_spawn':
-                self.pinky = Pinky(self, tile_object.x, tile_object.y,
-                                   ghost_frames)
-            elif tile_object.name == 'inky_spawn':
-                self.inky = Inky(self, tile_object.x, tile_object.y,
-                                 ghost_frames)
-            elif tile_object.name == 'clyde_spawn':
-                self.clyde = Clyde(self, tile_object.x, tile_object.y,
-                                   ghost_frames)
-
-            elif tile_object.name == 'no_up':
-                self.noup_coords.append(Vector2(tile_object.x, tile_object.y))
-
-        self.dots_remain = len(self.pellets.sprites())
-
-        self.game_loop()
+        # the mazes are mostly black, which run-length encoding skips over
+        # far faster than checking the colour key pixel by pixel
+        self.maze_white.set_colorkey(BLACK, pg.RLEACCEL)
+        self.maze_blue.set_colorkey(BLACK, pg.RLEACCEL)
 
     def game_loop(self):
         '''Main game loop - set playing to false to end game'''
 
-        while self.playing:
-            # get time delta in milliseconds
-            self.time_delta = self.clock.tick(FPS) / 1000
-            self.get_events()
-
-            # when the game is not paused
-            if self.pause_countdown <= 0 and not self.manual_pause:
-                self.pre_game_countdown = False
-                if not self.bonus_spawned:
-                    self.bonus_timer += self.time_delta
-
-                # force Blinky into chase mode if there is less than 30
-                # pellets on screen
-                if self.dots_remain < self.dots_threshold:
-                    setattr(self.blinky, 'ignore_scatter', True)
-
-                # break into game over screen if all lives are depleted
-                if getattr(self.player, 'lives') < 0:
-                    self.post_message = "Game Over!"
-                    self.playing = False
-                    break
-
-                # clear the level once all pellets have been eaten
-                if getattr(self.player, 'level_clear'):
-                    self.post_message = "Level Clear!"
-                    self.playing = False
-                    break
-
-                # reset position once death animation has finished playing
-                if getattr(self.player, 'death_animation'):
-                    self.reset_entities()
-
-                    # set ready for the next pre-game pause
-                    self.pause_countdown = 1.5
-                    self.pre_game_countdown = True
-                    continue
-
-                # check if it's time to spawn the bonus fruit
-                elif not self.bonus_spawned and self.bonus_timer >= self.bonus_time:
-                    BonusFruit(
-                        self,
-                        self.bonus_coords.x,
-                        self.bonus_coords.y,
-                        self.fruit_frames)
-                    self.bonus_spawned = True
-
-                self.update()  # game only updates when not paused
+        # the level loaded while starting up isn't played
+        if self.playing:
+            self.games_played += 1
 
+        while self.playing:
+            if self.capture:
+                # the same frame, profiled
+                self.capture.run_frame()
             else:
-                self.pause_countdown -= self.time_delta
-
-                if getattr(self.player, 'death_animation'):
-                    if self.pause_countdown <= 3:
-                        # play out death animation
-                        self.player.animate()
-                        for ghost in self.ghosts:
-                            # make ghosts disappear by setting sprite to
-                            # just hot pink
-                            ghost.image = ghost.frames[5][2]
-
-                elif getattr(self.player, 'level_clear'):
-                    self.maze_flash_duration += self.time_delta
-
-                    if self.pause_countdown <= 4:
-                        # enter vibe mode
-                        self.player.image = self.player.frames[-1][0]
-                        # make ghosts disappear
-                        for ghost in self.ghosts:
-                            ghost.image = ghost.frames[5][2]
-
-                        # flash the walls on a delay
-                        if self.maze_flash_duration >= self.maze_flash_alternate:
-                            self.maze_flash_duration = 0
-                            if self.maze_flash:
-                                self.maze_img = self.maze_white
-                            else:
-                                self.maze_img = self.maze_blue
-                            self.maze_img = self.maze_white if self.maze_flash else self.maze_blue
-                            self.maze_flash = not self.maze_flash
-
-            self.draw()  # always draw no matter if game is paused or not.
-
-    def update(self):
-        '''Call each sprites update method.'''
-
-        self.all_sprites.update()
+                self.play_frame()
+
+    def play_frame(self, mark=None):
+        '''Play one frame of the game loop: wait for its turn, handle events
+        and changed files, update and draw, with draws skipped if need be,
+        and idle while paused. 'mark' is called with each part of the frame,
+        as named in profiler.PHASES, as it starts, for profiling.'''
+
+        if mark:
+            mark('tick')
+        # get time delta in milliseconds
+        self.time_delta = self.clock.tick(self.frame_rate()) / 1000
+        frame_time = self.time_delta
+        if mark:
+            mark('events')
+        self.get_events()
+        if self.watcher:
+            if mark:
+                mark('watch')
+            self.watcher.poll()
+
+        if self.frame_skip:
+            self.frame_skip.play(self, mark)
+        else:
+            if mark:
+                mark('step')
+            start = time.perf_counter()
+            shown = self.step()
+            self.update_time = time.perf_counter() - start
+            self.draw_time = None
+            if shown:
+                if mark:
+                    mark('draw')
+                start = time.perf_counter()
+                self.draw()
+                self.draw_time = time.perf_counter() - start
+        if self.metrics:
+            self.metrics.record(self, frame_time)
+
+        if self.manual_pause:
+            if mark:
+                mark('idle')
+            self.idle_until_unpaused()
+
+    def frame_rate(self):
+        '''How many times a second the game loop goes round, fewer when
+        frames are being skipped.'''
+
+        return self.frame_skip.frame_rate if self.frame_skip else FPS
+
+    def sync_pellet_sprites(self):
+        '''Add and remove pellet sprites to match the pellets left in the
+        simulation, whenever those have changed since the last frame.'''
+
+        if self.pellets.version == self.pellet_version:
+            return
+        self.pellet_version = self.pellets.version
+
+        # only pellets still in the level keep their sprites
+        sprites = {}
+        for pellet in self.pellet_list:
+            sprite = self.pellet_sprites.pop(pellet, None)
+            if sprite is None:
+                frames = self.fruit_frames if pellet.bonus else self.pellet_frames
+                sprite = PelletSprite(pellet, frames)
+            if pellet.alive() != sprite.alive():
+                if sprite.alive():
+                    sprite.kill()
+                else:
+                    self.all_sprites.add(sprite)
+            sprites[pellet] = sprite
+
+        for sprite in self.pellet_sprites.values():
+            sprite.kill()
+        self.pellet_sprites = sprites
 
     def draw_background_grid(self):
         ''' Draw a faint grid for the background for testing purposes.'''
@@ -289,10 +357,21 @@ class Game:
             pg.draw.line(self.screen, LIGHTGREY, (0, y), (WIDTH, y))
 
     def draw(self):
-        '''Draw sprites, maze and HUD elements.'''
+        '''Render the frame, show it in the window and stream it to any
+        spectators.'''
+
+        self.render()
+        self.present()
+        if self.broadcaster:
+            self.broadcaster.send_frame(self)
+
+    def render(self):
+        '''Draw sprites, maze and HUD elements to the render target.'''
 
         self.screen.fill(BACKGROUND_COLOUR)
-        self.screen.blit(self.maze_img, (0, 0))
+        self.screen.blit(self.maze_blue if self.maze_flash else self.maze_white,
+                         (0, 0))
+        self.sync_pellet_sprites()
         self.all_sprites.draw(self.screen)
 
         # debug - draw text of currently pressed and registered key
@@ -326,14 +405,25 @@ class Game:
             self.draw_text("PAUSED", 30, WHITE,
                            WIDTH * .5, HEIGHT * .5 - 10)
 
-        pg.display.flip()
-
     def draw_text(self, text, size, colour, x, y):
         '''Called to draw text of varying sizes, colours and positions.'''
 
-        font = pg.font.Font(self.font_name, size)
-        # flag means anti-aliasing
-        text_surface = font.render(text, True, colour)
+        # most text is the same from one frame to the next, and each surface
+        # is only uploaded once by the texture backend, so keep lines drawn
+        # lately rendered
+        key = (text, size, colour)
+        text_surface = self.text_surfaces.get(key)
+        if text_surface is None:
+            if len(self.text_surfaces) >= TEXT_CACHE_SIZE:
+                self.text_surfaces.clear()
+
+            # loading a font is slow, so keep one of each size around
+            font = self.fonts.get(size)
+            if font is None:
+                font = self.fonts[size] = pg.font.Font(self.font_name, size)
+            # flag means anti-aliasing
+            text_surface = font.render(text, True, colour)
+            self.text_surfaces[key] = text_surface
         text_rect = text_surface.get_rect()
         text_rect.center = (x, y)
 
@@ -348,39 +438,82 @@ class Game:
         self.screen.blit(surf, (x, y))
 
     def get_events(self):
-        '''Catches non-gameplay key stokes and when the player presses close.'''
+        '''Catches key strokes and when the player presses close.'''
 
         for event in pg.event.get():
-            if event.type == pg.QUIT:
-                self.playing = False
-                self.running = False
-            elif event.type == pg.KEYUP:
-                if event.key == pg.K_ESCAPE:
-                    if self.pause_countdown <= 0:
-                        self.manual_pause = not self.manual_pause
-
-    def reset_entities(self):
-        '''Reset the states and position of ghosts and player.'''
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        '''Acts upon a single event. Movement keys are timestamped as they're
+        read and handed to Pac-Man's input buffer as moves. The time a key
+        press waited in SDL's event queue before that isn't measured.'''
+
+        # with the texture backend, closing the window doesn't quit SDL
+        if event.type == pg.QUIT or event.type == pg.WINDOWCLOSE:
+            self.playing = False
+            self.running = False
+        elif event.type == pg.KEYDOWN:
+            if event.key in self.movement_keys:
+                self.player.queue_move(self.movement_keys[event.key],
+                                       time.perf_counter())
+        elif event.type == pg.KEYUP:
+            if event.key == pg.K_ESCAPE:
+                if self.pause_countdown <= 0:
+                    self.manual_pause = not self.manual_pause
+            elif event.key == pg.K_F9:
+                self.toggle_profile()
+
+    def toggle_profile(self):
+        '''Start profiling the game loop from the next frame, or stop at the
+        end of this one and write the profile out.'''
+
+        if self.capture:
+            self.capture.stopping = True
+        else:
+            self.capture = ProfileCapture(self)
+            print("Profiling the game, press F9 again to stop.")
+
+    def idle_until_unpaused(self):
+        '''While manually paused the frame doesn't change, so rather than
+        redrawing it every frame, sleep until an event arrives.'''
+
+        # wake up often enough to pick up changed files in watch mode
+        timeout = (round(WATCH_INTERVAL * 1000) if self.watcher
+                   else IDLE_TIMEOUT)
+
+        while self.manual_pause and self.playing:
+            event = pg.event.wait(timeout)
+            if event.type == pg.NOEVENT or event.type == pg.WINDOWEXPOSED:
+                if self.watcher and self.watcher.poll():
+                    self.render()
+                self.present()
+            else:
+                self.handle_event(event)
 
-        self.player.reset_status()
-        for ghost in self.ghosts:
-            ghost.reset_status()
+        # don't count the time spent paused as a frame
+        self.clock.tick()
 
     def wait_for_key(self):
-        '''Loop to wait for key stroke during title and post-game screens.'''
+        '''Wait for key stroke during title and post-game screens. These
+        screens are static, so sleep until an event arrives instead of
+        polling every frame.'''
 
         waiting = True
         while waiting:
-            self.clock.tick(FPS)
-            for event in pg.event.get():
-                if event.type == pg.QUIT:
-                    self.running = False
+            event = pg.event.wait(IDLE_TIMEOUT)
+            if event.type == pg.NOEVENT or event.type == pg.WINDOWEXPOSED:
+                self.present()
+            elif event.type == pg.QUIT or event.type == pg.WINDOWCLOSE:
+                self.running = False
+                waiting = False
+            elif event.type == pg.KEYUP:
+                if event.key == pg.K_RETURN:
+                    self.running = True
+                    self.playing = True
                     waiting = False
-                if event.type == pg.KEYUP:
-                    if event.key == pg.K_RETURN:
-                        self.running = True
-                        self.playing = True
-                        waiting = False
+
+        # the first frame of the game shouldn't include time spent waiting
+        self.clock.tick()
 
     def show_title_screen(self):
         '''Draws a static title screen.'''
@@ -416,7 +549,7 @@ class Game:
         self.draw_text("Press Enter to play!", 22,
                        PAC_YELLOW, WIDTH * .5, HEIGHT * .75)
 
-        pg.display.flip()
+        self.present()
         self.wait_for_key()
 
     def show_post_game_screen(self):
@@ -472,7 +605,7 @@ class Game:
         self.draw_text("Press the enter key to play again!",
                        22, WHITE, WIDTH * .5, HEIGHT * 3 / .25)
 
-        pg.display.flip()
+        self.present()
 
         self.wait_for_key()
 
@@ -554,12 +687,48 @@ class SymmetricKeyEncrypt:
 def main():
     '''Instantiates game object and calls screen methods.'''
 
-    g = Game()
+    parser = argparse.ArgumentParser(description=TITLE)
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="profile the first SECONDS of play into "
+                        f"{PROFILE_DIR}, as F9 does")
+    parser.add_argument('--backend', choices=('surface', 'texture'),
+                        default=RENDER_BACKEND,
+                        help=f"how to draw, {RENDER_BACKEND} by default")
+    parser.add_argument('--driver', default=TEXTURE_DRIVER,
+                        help="SDL render driver for the texture backend")
+    args = parser.parse_args()
+
+    g = Game(backend=args.backend, driver=args.driver)
+    if SPECTATOR_ADDRESS:
+        g.broadcaster = Broadcaster()
+    if METRICS_PORT:
+        g.metrics = Metrics()
+    if args.profile:
+        g.capture = ProfileCapture(g, args.profile)
     g.show_title_screen()
     while getattr(g, "running"):
         g.new_game()
         g.show_post_game_screen()
 
+    if g.latency:
+        print(g.latency.report())
+    if g.autopilot:
+        print(g.autopilot.report())
+    if g.frame_skip:
+        print(g.frame_skip.report())
+    if g.broadcaster:
+        g.broadcaster.close()
+        print(g.broadcaster.report())
+    if g.capture:
+        g.capture.stop()
+    if g.telemetry:
+        g.telemetry.flush()
+        print(f"Heat maps written to {g.telemetry.filename}")
+    if g.metrics:
+        g.metrics.close()
+    if g.renderer:
+        g.renderer.close()
+
     # safely quit out of pygame and python
     pg.quit()
     sys.exit()
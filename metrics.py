@@ -0,0 +1,175 @@
+import bisect
+import os
+import resource
+import sys
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from settings import *
+
+# upper bounds in seconds of the frame time histogram's buckets, above the
+# last of which is the +Inf bucket
+FRAME_BUCKETS = (.008, .0167, .02, .025, .0333, .05, .1, .25)
+
+# how much each new update and draw time moves the running averages
+SMOOTHING = .1
+
+
+def resident_set_size():
+    '''Bytes of memory the process has resident, or at its peak where the
+    current size can't be read.'''
+
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Metrics:
+    '''Measures the game as it plays and serves the measurements as a plain
+    text page, in Prometheus' text format, on localhost's 'port' at
+    /metrics.
+
+    The game loop only ever writes numbers into this object's own lists and
+    attributes, and the server, on a thread of its own, only ever reads
+    them, so the game never waits on a lock and a scrape can't hold a frame
+    up. A scrape may see a frame half recorded, a bucket counted before the
+    total is, which the next scrape puts right.'''
+
+    def __init__(self, port=METRICS_PORT, window=METRICS_WINDOW):
+        # frame times in seconds, counted into the buckets and kept, oldest
+        # first, for as many of the last frames as add up to 'window' seconds
+        self.buckets = [0] * (len(FRAME_BUCKETS) + 1)
+        self.frame_total = 0
+        self.frames = 0
+        self.window = window
+        self.recent = deque()
+        self.recent_total = 0
+        self.last_frame = 0
+
+        # running averages of the seconds an update and a draw take
+        self.update_cost = 0
+        self.draw_cost = 0
+
+        self.sprites = 0
+        self.pellets = 0
+        self.ghosts = 0
+        self.dots_remain = 0
+        self.games_played = 0
+
+        self.server = HTTPServer(('localhost', port), MetricsHandler)
+        self.server.metrics = self
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name='metrics', daemon=True)
+        self.thread.start()
+
+    def record(self, game, frame_time):
+        '''Count a frame that took 'frame_time' seconds, how long its update
+        and draw took and what's in the game after it. Called by
+        'Game.play_frame' once the frame has been played.'''
+
+        if game.frame_skip:
+            self.update_cost = game.frame_skip.update_cost
+            self.draw_cost = game.frame_skip.draw_cost
+        else:
+            self.update_cost += ((game.update_time - self.update_cost)
+                                 * SMOOTHING)
+            if game.draw_time is not None:
+                self.draw_cost += (game.draw_time - self.draw_cost) * SMOOTHING
+
+        self.buckets[bisect.bisect_left(FRAME_BUCKETS, frame_time)] += 1
+        self.frame_total += frame_time
+        recent = self.recent
+        recent.append(frame_time)
+        self.recent_total += frame_time
+        # the oldest go once the rest still cover the window
+        while len(recent) > 1 and self.recent_total - recent[0] >= self.window:
+            self.recent_total -= recent.popleft()
+        self.frames += 1
+        self.last_frame = frame_time
+
+        self.sprites = len(game.all_sprites)
+        self.pellets = len(game.pellets)
+        self.ghosts = len(game.ghosts)
+        self.dots_remain = game.dots_remain
+        self.games_played = game.games_played
+
+    def page(self):
+        '''The metrics as they are now, in Prometheus' text format.'''
+
+        # copied first, so each is read once however the game moves on. The
+        # deque is copied in one go, without the game moving on part way
+        buckets = list(self.buckets)
+        recent = list(self.recent)
+        frame_total = self.frame_total
+        last_frame = self.last_frame
+
+        recent_total = sum(recent)
+        lines = []
+
+        def metric(name, kind, description, value):
+            lines.append(f"# HELP pacman_{name} {description}")
+            lines.append(f"# TYPE pacman_{name} {kind}")
+            lines.append(f"pacman_{name} {value}")
+
+        metric('fps', 'gauge', "Frames a second, from the last frame.",
+               1 / last_frame if last_frame else 0)
+        metric('fps_rolling', 'gauge',
+               f"Frames a second over the last {self.window} seconds.",
+               len(recent) / recent_total if recent_total else 0)
+
+        lines.append("# HELP pacman_frame_seconds Time between frames.")
+        lines.append("# TYPE pacman_frame_seconds histogram")
+        cumulative = 0
+        for bound, count in zip(FRAME_BUCKETS + ('+Inf',), buckets):
+            cumulative += count
+            lines.append(f'pacman_frame_seconds_bucket{{le="{bound}"}} '
+                         f"{cumulative}")
+        lines.append(f"pacman_frame_seconds_sum {frame_total}")
+        lines.append(f"pacman_frame_seconds_count {cumulative}")
+
+        metric('update_seconds', 'gauge',
+               "Running average of the time an update takes.",
+               self.update_cost)
+        metric('draw_seconds', 'gauge',
+               "Running average of the time a draw takes.", self.draw_cost)
+        metric('sprites', 'gauge', "Sprites drawn, in all_sprites.",
+               self.sprites)
+        metric('pellets', 'gauge', "Pellets left, bonus fruit included.",
+               self.pellets)
+        metric('ghosts', 'gauge', "Ghosts in the maze.", self.ghosts)
+        metric('dots_remain', 'gauge', "Dots left to clear the level.",
+               self.dots_remain)
+        metric('games_played_total', 'counter', "Games started.",
+               self.games_played)
+        metric('resident_memory_bytes', 'gauge',
+               "Memory the process has resident.", resident_set_size())
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    '''Answers scrapes of /metrics with the server's 'metrics' page.'''
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.page().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scrapes come every few seconds, forever
+        pass
@@ -0,0 +1,217 @@
+'''Watches many games at once, each played by the autopilot in a process of
+its own, tiled in one window.
+
+Run from the repository root with:
+    python monitor.py [--games n] [--scale s] [--smooth] [--fast]
+
+Each worker renders its game straight into frame buffers in shared memory,
+three of them in turn, and the monitor scales whichever was finished last
+into the game's tile at its own refresh rate. Frames never go through a
+pipe, and neither side ever waits on the other: a sequence number on each
+buffer, odd while it's being drawn, tells the monitor that a frame changed
+under it while it was scaling it, and that frame is skipped.'''
+
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+# keep pygame's greeting from being printed by every worker
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+import pygame as pg
+
+from settings import *
+
+# the header of each game's shared memory, in 64 bit slots: the buffer last
+# finished, whether the worker should stop, frames played and games started,
+# then each buffer's sequence number
+LATEST = 0
+STOP = 1
+FRAMES = 2
+GAMES = 3
+SEQUENCES = 4
+HEADER_SIZE = 64
+
+BUFFERS = 3
+# frames are 4 bytes a pixel, in the byte order surfaces over them use
+PIXEL_FORMAT = 'BGRA'
+FRAME_SIZE = WIDTH * HEIGHT * 4
+
+
+class FrameBuffers:
+    '''A game's header and frame buffers, in shared memory created by the
+    monitor, or attached to by name in a worker.'''
+
+    def __init__(self, name=None):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=HEADER_SIZE + BUFFERS * FRAME_SIZE)
+            self.memory.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        else:
+            # workers share the monitor's resource tracker, so it's only
+            # removed once, by the monitor
+            self.memory = shared_memory.SharedMemory(name)
+        self.name = self.memory.name
+
+        self.header = self.memory.buf[:HEADER_SIZE].cast('q')
+        self.views = [self.memory.buf[HEADER_SIZE + index * FRAME_SIZE:
+                                      HEADER_SIZE + (index + 1) * FRAME_SIZE]
+                      for index in range(BUFFERS)]
+        # surfaces drawing straight into the shared memory
+        self.surfaces = [pg.image.frombuffer(view, (WIDTH, HEIGHT),
+                                             PIXEL_FORMAT)
+                         for view in self.views]
+
+    def close(self):
+        '''Let go of the shared memory, which nothing may be using.'''
+
+        self.surfaces = []
+        for view in self.views:
+            view.release()
+        self.header.release()
+        self.memory.close()
+
+
+def play(name, seed, fast):
+    '''Play games with the autopilot one after another, rendering into the
+    frame buffers called 'name', until the monitor says to stop. Runs in a
+    worker process.'''
+
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    from main import Game
+    from autopilot import Autopilot
+
+    game = Game(headless=True)
+    game.autopilot = Autopilot(game)
+    game.time_delta = 1 / FPS
+    buffers = FrameBuffers(name)
+    header = buffers.header
+    rng = random.Random(seed)
+
+    next_frame = last_render = time.perf_counter()
+    while not header[STOP]:
+        if not game.playing:
+            game.rng.seed(rng.getrandbits(64))
+            game.load_level()
+            game.playing = True
+            header[GAMES] += 1
+
+        shown = game.step()
+        header[FRAMES] += 1
+        now = time.perf_counter()
+
+        # played flat out, there's no use drawing more often than the
+        # monitor looks
+        if shown and (not fast or now - last_render >= 1 / MONITOR_FPS):
+            buffer = (header[LATEST] + 1) % BUFFERS
+            header[SEQUENCES + buffer] += 1
+            game.screen = buffers.surfaces[buffer]
+            game.render()
+            header[SEQUENCES + buffer] += 1
+            header[LATEST] = buffer
+            last_render = now
+
+        if not fast:
+            next_frame += 1 / FPS
+            if next_frame < now - 1 / FPS:
+                # fallen behind, carry on from here rather than rush
+                next_frame = now
+            time.sleep(max(0, next_frame - now))
+
+    game.screen = None
+    buffers.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Watch many games played by the autopilot at once.")
+    parser.add_argument('--games', type=int, default=MONITOR_GAMES)
+    parser.add_argument('--scale', type=float, default=MONITOR_SCALE,
+                        help="size of each game's tile")
+    parser.add_argument('--smooth', action='store_true',
+                        help="scale smoothly rather than by nearest pixel")
+    parser.add_argument('--fast', action='store_true',
+                        help="play the games as fast as they can go")
+    args = parser.parse_args()
+
+    pg.init()
+    columns = math.ceil(math.sqrt(args.games))
+    rows = math.ceil(args.games / columns)
+    tile_size = (round(WIDTH * args.scale), round(HEIGHT * args.scale))
+    window = pg.display.set_mode((columns * tile_size[0],
+                                  rows * tile_size[1]))
+    scale = pg.transform.smoothscale if args.smooth else pg.transform.scale
+
+    games = [FrameBuffers() for index in range(args.games)]
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=play, args=(buffers.name, index,
+                                                  args.fast), daemon=True)
+               for index, buffers in enumerate(games)]
+    for worker in workers:
+        worker.start()
+
+    # each tile is scaled into 'scratch' and swapped in if it wasn't torn
+    tiles = [pg.Surface(tile_size, pg.SRCALPHA) for buffers in games]
+    scratch = pg.Surface(tile_size, pg.SRCALPHA)
+    positions = [((index % columns) * tile_size[0],
+                  (index // columns) * tile_size[1])
+                 for index in range(args.games)]
+    shown = [None] * args.games
+
+    clock = pg.time.Clock()
+    last_caption = time.perf_counter()
+    last_frames = 0
+    torn = 0
+    watching = True
+    while watching:
+        clock.tick(MONITOR_FPS)
+        for event in pg.event.get():
+            if event.type == pg.QUIT or (event.type == pg.KEYUP
+                                         and event.key == pg.K_ESCAPE):
+                watching = False
+
+        updated = []
+        for index, buffers in enumerate(games):
+            header = buffers.header
+            latest = header[LATEST]
+            sequence = header[SEQUENCES + latest]
+            if sequence % 2 or (latest, sequence) == shown[index]:
+                continue  # being drawn into, or nothing new
+
+            scale(buffers.surfaces[latest], tile_size, scratch)
+            if header[SEQUENCES + latest] != sequence:
+                torn += 1
+                continue
+            tiles[index], scratch = scratch, tiles[index]
+            shown[index] = (latest, sequence)
+            updated.append(window.blit(tiles[index], positions[index]))
+        pg.display.update(updated)
+
+        now = time.perf_counter()
+        if now - last_caption >= 1:
+            frames = sum(buffers.header[FRAMES] for buffers in games)
+            played = sum(buffers.header[GAMES] for buffers in games)
+            pg.display.set_caption(
+                f"{TITLE} - {args.games} games, "
+                f"{(frames - last_frames) / (now - last_caption):.0f} frames "
+                f"a second between them, {played} played, monitor at "
+                f"{clock.get_fps():.0f} FPS, {torn} torn frames skipped")
+            last_caption = now
+            last_frames = frames
+
+    for buffers in games:
+        buffers.header[STOP] = 1
+    for worker in workers:
+        worker.join(5)
+    tiles = scratch = None
+    for buffers in games:
+        buffers.close()
+        buffers.memory.unlink()
+    pg.quit()
+
+
+if __name__ == '__main__':
+    main()
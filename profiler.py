@@ -0,0 +1,165 @@
+import cProfile
+import os
+import pstats
+import time
+
+from settings import *
+
+# the parts of a frame of 'Game.game_loop', in the order they happen
+PHASES = ('tick', 'events', 'watch', 'step', 'draw', 'idle')
+
+# calls nested deeper than this are left out of the collapsed stacks
+MAX_STACK_DEPTH = 64
+
+
+def function_name(function):
+    '''How a function from cProfile's stats appears in a collapsed stack.'''
+
+    filename, line, name = function
+    if filename == '~':  # built in
+        label = name
+    else:
+        label = f"{os.path.basename(filename)}:{line}({name})"
+    # semicolons separate the frames of a stack
+    return label.replace(';', ',')
+
+
+def collapsed_stacks(stats, root):
+    '''Turn cProfile's stats into collapsed stacks, one 'root;a;b;c weight'
+    line per call path with the microseconds spent in its last function.
+
+    cProfile only records who called whom, not whole stacks, so a function
+    called from several places has its callees' time shared out between
+    those places in proportion to the time each spent in it.'''
+
+    callees = {}
+    roots = []
+    for function, (calls, primitive, total, cumulative, callers) in \
+            stats.items():
+        if not callers:
+            roots.append(function)
+        for caller, (*counts, edge_cumulative) in callers.items():
+            callees.setdefault(caller, []).append((function, edge_cumulative))
+
+    weights = {}
+
+    def walk(function, stack, share):
+        calls, primitive, total, cumulative, callers = stats[function]
+        stack = stack + (function_name(function),)
+        weight = round(total * share * 1e6)
+        if weight:
+            key = ';'.join(stack)
+            weights[key] = weights.get(key, 0) + weight
+        if len(stack) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_cumulative in callees.get(function, ()):
+            # recursion is already counted in the outermost call
+            if function_name(callee) in stack or not stats[callee][3]:
+                continue
+            walk(callee, stack,
+                 share * edge_cumulative / stats[callee][3])
+
+    for function in roots:
+        walk(function, (root,), 1)
+
+    return [f"{stack} {weight}" for stack, weight in weights.items()]
+
+
+class ProfileCapture:
+    '''Profiles 'Game.game_loop' while it runs, until stopped or for a set
+    number of seconds.
+
+    Each part of a frame (see PHASES) is profiled by its own cProfile
+    profile, switched over at markers between the parts, and how long each
+    part took is recorded for every frame. When the capture stops it writes
+    three files to PROFILE_DIR, named after when it started:
+    + .pstats, all of the profiles together, for pstats or snakeviz,
+    + .collapsed, collapsed stacks rooted at their phase, for flame graph
+      tools such as flamegraph.pl or speedscope,
+    + .frames.csv, milliseconds spent in each phase of every frame.
+
+    The game only checks whether there is a capture once a frame, so when
+    there's none, profiling costs nothing.'''
+
+    def __init__(self, game, seconds=None, directory=PROFILE_DIR):
+        self.game = game
+        self.seconds = seconds
+        self.directory = directory
+        self.stopping = False
+        self.started = None
+        self.name = time.strftime('profile-%Y%m%d-%H%M%S')
+
+        self.profiles = {phase: cProfile.Profile() for phase in PHASES}
+        self.frames = []  # each frame's time per phase, in seconds
+        self.phase = None
+        self.phase_start = 0
+        self.frame_times = None
+
+    def mark(self, phase):
+        '''End the phase being profiled and start profiling 'phase', or
+        stop if it's None.'''
+
+        if self.phase:
+            self.profiles[self.phase].disable()
+        now = time.perf_counter()
+        if self.phase:
+            self.frame_times[self.phase] = (self.frame_times.get(self.phase, 0)
+                                            + now - self.phase_start)
+        self.phase = phase
+        self.phase_start = now
+        if phase:
+            self.profiles[phase].enable()
+
+    def run_frame(self):
+        '''Play one frame of 'Game.game_loop' with 'Game.play_frame', with
+        a marker between each of its parts. Stops the capture at the end of the frame once it's been
+        asked to or its time is up.'''
+
+        game = self.game
+        if self.started is None:
+            self.started = time.perf_counter()
+        self.frame_times = {}
+
+        game.play_frame(self.mark)
+        self.mark(None)
+        self.frames.append(self.frame_times)
+
+        if self.stopping or (self.seconds is not None and
+                             time.perf_counter() - self.started
+                             >= self.seconds):
+            self.stop()
+
+    def stop(self):
+        '''Write out the capture and detach it from the game.'''
+
+        self.mark(None)
+        self.game.capture = None
+        if self.frames:
+            print(f"Profile of {len(self.frames)} frames written to "
+                  f"{self.save()}.*")
+
+    def save(self):
+        '''Write the three files and return their path without extension.'''
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.name)
+
+        profiles = [profile for profile in self.profiles.values()
+                    if profile.getstats()]
+        if profiles:
+            pstats.Stats(*profiles).dump_stats(base + '.pstats')
+
+        with open(base + '.collapsed', 'w') as file:
+            for phase, profile in self.profiles.items():
+                profile.create_stats()
+                for line in collapsed_stacks(profile.stats, phase):
+                    file.write(line + '\n')
+
+        with open(base + '.frames.csv', 'w') as file:
+            file.write('frame,' + ','.join(PHASES) + '\n')
+            for index, times in enumerate(self.frames):
+                file.write(f"{index}," + ','.join(
+                    f"{times[phase] * 1000:.3f}" if phase in times else ''
+                    for phase in PHASES) + '\n')
+
+        return base
@@ -0,0 +1,145 @@
+import os
+import random
+import struct
+import time
+
+from settings import *
+
+# file header: magic, format version, the level's random seed and the length
+# of the high score shown, which follows as text
+HEADER = struct.Struct('<4sHQH')
+MAGIC = b'PMRP'
+VERSION = 1
+
+# each frame: its time delta, whether it was manually paused and how many
+# moves were made, followed by that many move codes
+FRAME = struct.Struct('<dBB')
+
+# move codes, 0 being a stop
+MOVES = (None, (0, -1), (-1, 0), (0, 1), (1, 0))
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}
+
+
+class Recorder:
+    '''Records a game so it can be played back frame for frame, by
+    'export.py' for one.
+
+    The simulation is deterministic given its random seed, so all that's
+    recorded is the seed each level is played with, every frame's time
+    delta and manual pause, and the moves Pac-Man acted upon in each frame,
+    whether they came from the keyboard or the autopilot. Changes picked up
+    in watch mode aren't recorded, so those games won't play back the same.'''
+
+    def __init__(self, directory=REPLAY_DIR):
+        self.directory = directory
+        self.seed = 0
+        self.high_score = ''
+        self.frames = bytearray()
+        self.frame_count = 0
+        self.moves = []
+
+    def new_level(self, game):
+        '''Called as a level loads, to seed it and start a new recording.'''
+
+        self.seed = random.getrandbits(64)
+        game.rng.seed(self.seed)
+        self.high_score = str(getattr(game, 'high_score', ''))
+        self.frames.clear()
+        self.frame_count = 0
+        self.moves = []
+
+    def frame(self, time_delta, manual_pause):
+        '''Called at the start of every frame.'''
+
+        self.end_frame()
+        self.frame_count += 1
+        self.frames += FRAME.pack(time_delta, manual_pause, 0)
+
+    def moves_applied(self, input_queue):
+        '''Called with Pac-Man's input queue as the moves in it are acted
+        upon.'''
+
+        self.moves.extend(MOVE_CODES[direction]
+                          for direction, timestamp in input_queue)
+
+    def end_frame(self):
+        '''Add the moves made during the last frame to it.'''
+
+        if self.moves:
+            # the count is the frame's last byte
+            self.frames[-1] = len(self.moves)
+            self.frames += bytes(self.moves)
+            self.moves = []
+
+    def save(self):
+        '''Write the level played out to a new file in the directory. Returns
+        its name, or None if nothing was played.'''
+
+        self.end_frame()
+        if not self.frame_count:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        filename = os.path.join(
+            self.directory, time.strftime('%Y%m%d-%H%M%S') + '.replay')
+        high_score = self.high_score.encode()
+        with open(filename, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.seed, len(high_score)))
+            file.write(high_score)
+            file.write(self.frames)
+
+        self.frames.clear()
+        self.frame_count = 0
+        return filename
+
+
+class Replay:
+    '''A recorded level, read from a file written by 'Recorder.save'.'''
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as file:
+            data = file.read()
+
+        magic, version, self.seed, length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} isn't a version {VERSION} replay")
+        offset = HEADER.size
+        self.high_score = data[offset:offset + length].decode()
+        offset += length
+
+        # (time delta, manual pause, moves) for each frame
+        self.frames = []
+        while offset < len(data):
+            time_delta, manual_pause, count = FRAME.unpack_from(data, offset)
+            offset += FRAME.size
+            moves = [MOVES[code] for code in data[offset:offset + count]]
+            offset += count
+            self.frames.append((time_delta, bool(manual_pause), moves))
+
+    def start(self, game):
+        '''Load the recorded level into a game, ready for 'play'.'''
+
+        game.recorder = None
+        game.autopilot = None  # the moves it made were recorded
+        game.rng.seed(self.seed)
+        game.load_level()
+        game.playing = True
+        game.high_score = self.high_score
+
+    def play(self, game, start=0, end=None):
+        '''Play frames 'start' to 'end' of the level started in 'game',
+        yielding the index of each one that should be drawn once it's been
+        stepped. Frames before 'start' are still stepped, just not yielded,
+        as that's the only way to get to them.'''
+
+        player = game.player
+        for index, (time_delta, manual_pause, moves) in enumerate(
+                self.frames[:end]):
+            game.time_delta = time_delta
+            game.manual_pause = manual_pause
+            for direction in moves:
+                player.queue_move(direction)
+            if game.step() and index >= start:
+                yield index
+            if not game.playing:
+                break
@@ -23,12 +23,109 @@ GHOST_LAYER = 2
 WIDTH = 560
 HEIGHT = 720
 FPS = 60
+# static screens (title, post-game and paused) sleep until a key is pressed,
+# waking every this many milliseconds to show the frame again
+IDLE_TIMEOUT = 500
+
+# the game always renders at WIDTH x HEIGHT and is scaled up to the window.
+# 0 fits the window to the desktop, whole numbers keep the pixels square
+WINDOW_SCALE = 0
+# let SDL scale the render target to a freely resizable window instead
+RESIZABLE_WINDOW = False
+# draw by blitting surfaces ('surface'), or with SDL's 2D renderer from
+# textures uploaded once ('texture'), which falls back to surfaces on pygame
+# builds without the _sdl2 module. The renderer uses this SDL render driver,
+# such as 'software', 'opengl' or 'direct3d', or SDL's choice when None
+RENDER_BACKEND = 'surface'
+TEXTURE_DRIVER = None
+# print percentiles of the time between a key press being read and Pac-Man
+# turning
+MEASURE_INPUT_LATENCY = False
+
+# let the autopilot play, searching ahead for this many seconds per decision
+AUTOPILOT = False
+AUTOPILOT_BUDGET = .004
+# search with a model that moves a whole corridor at a time, only stopping
+# where something happens, rather than a tile at a time
+AUTOPILOT_MACRO_STEPS = False
+# update the ghosts together, scoring their moves in NumPy arrays, whenever
+# there are at least this many of them. 0 always updates them one at a time
+BATCH_GHOSTS = 0
+# when a frame can't be both updated and drawn within 1/FPS seconds, update
+# several times for each draw, skipping at most this many draws in a row, so
+# the game keeps its speed on slow machines. 0 draws every frame
+FRAME_SKIP_LIMIT = 0
 TITLE = "PAC-MAN"
 BACKGROUND_COLOUR = BLACK
 SPRITESHEET = 'spritesheet.png'
+# every frame sliced from the sprite sheet, packed by atlas.py
+SPRITE_ATLAS = 'atlas.bin'
 
 TILESIZE = 20
 GRID_WIDTH = WIDTH / TILESIZE
 GRID_HEIGHT = HEIGHT / TILESIZE
 
 FONT_NAME = 'Arial'
+# lines of text kept rendered for drawing again, such as the HUD's
+TEXT_CACHE_SIZE = 64
+
+# speeds in tiles per second
+PLAYER_SPEED = 6
+GHOST_SPEED = 5.9
+GHOST_FRIGHT_SPEED = 3.1
+GHOST_EATEN_SPEED = 10.1
+
+# ghost mode timers in seconds
+CHASE_TIME = 20
+SCATTER_TIME = 7
+FRIGHT_TIME = 10
+FRIGHT_FLASH_TIME = 3  # ghosts flash for this long before frightened mode ends
+
+BONUS_TIME = 60  # spawn bonus fruit this many seconds into the game
+DOTS_THRESHOLD = 30  # Blinky stops scattering when fewer pellets than this remain
+
+# record per-tile heat maps of where Pac-Man and the ghosts go, die and eat
+# into this file, written every this many seconds of play. Recording must
+# cost less than the budget in seconds per frame on average, which
+# benchmarks.telemetry checks. That's 0.06% of a frame, twice the 5 us it
+# took where it was set, so slower machines fit too. View them with
+# heatmap.py
+TELEMETRY = False
+TELEMETRY_FILE = 'telemetry.bin'
+TELEMETRY_FLUSH_INTERVAL = 10
+TELEMETRY_BUDGET = .00001
+
+# record each level played into a new file in this directory, to be played
+# back and exported to video by export.py
+RECORD_REPLAYS = False
+REPLAY_DIR = 'replays'
+
+# stream the game to spectators watching with spectate.py, listening on
+# this local (host, port), such as ('localhost', 8765), or on a Unix socket
+# at this path. Keyframes are sent every this many seconds, and spectators
+# who fall this many bytes behind skip ahead to the next one
+SPECTATOR_ADDRESS = None
+SPECTATOR_KEYFRAME_INTERVAL = 2
+SPECTATOR_BACKLOG = 65536
+
+# serve the FPS, frame times, update and draw times, what's in the maze,
+# games played and memory as a plain text page for a metrics scraper, on
+# this port of localhost at /metrics, or not at all when None. The rolling
+# FPS is over the last this many seconds
+METRICS_PORT = None
+METRICS_WINDOW = 5
+
+# profiles of the game loop, captured with F9 or main.py --profile, are
+# written into this directory
+PROFILE_DIR = 'profiles'
+
+# monitor.py shows this many games played by the autopilot at once, each
+# scaled to this fraction of its size, refreshing this many times a second
+MONITOR_GAMES = 16
+MONITOR_SCALE = .25
+MONITOR_FPS = 30
+
+# watch the maze and this file for changes while playing and rebuild whatever
+# changed, checking every this many seconds
+WATCH_FILES = False
+WATCH_INTERVAL = .25
@@ -0,0 +1,1779 @@
+import math
+import os
+import random
+from collections import Counter, namedtuple
+from os import path
+from xml.etree import ElementTree
+
+# files
+from settings import *
+
+# frames in each of the sprite sheet's animations
+PACMAN_FRAMES = 4  # per direction, and for dying
+FRUIT_FRAMES = 4
+
+# equality of vectors allows for this much floating point error
+VECTOR_EPSILON = 1e-6
+
+# timers add up time deltas, and a timer within this many seconds of running
+# out has, so that it runs out on the same frame however they're added up
+TIMER_EPSILON = 1e-9
+
+# an object from the maze's object layers, which mark out the walls, pellets
+# and spawn points
+MazeObject = namedtuple('MazeObject', 'name x y width height')
+
+
+def read_maze_objects(filename):
+    '''Read every object in a *.tmx file's object layers, in the order they
+    appear. The tile layers are only needed to draw the maze, which is left
+    to the view, so this doesn't need pytmx (which needs pygame).'''
+
+    objects = []
+    for group in ElementTree.parse(filename).getroot().iter('objectgroup'):
+        for tile_object in group.iter('object'):
+            objects.append(MazeObject(
+                tile_object.get('name'),
+                float(tile_object.get('x', 0)),
+                float(tile_object.get('y', 0)),
+                float(tile_object.get('width', 0)),
+                float(tile_object.get('height', 0))))
+    return objects
+
+
+def read_maze_size(filename):
+    '''Width and height in pixels of a *.tmx file's maze, read from its map
+    element without parsing the rest of the file.'''
+
+    for event, element in ElementTree.iterparse(filename, ('start',)):
+        return (int(element.get('width')) * int(element.get('tilewidth')),
+                int(element.get('height')) * int(element.get('tileheight')))
+
+
+def round_coordinate(value):
+    '''Round to a whole pixel the way pygame's Rect does, halves away from
+    zero.'''
+
+    whole = int(value)
+    if value - whole >= .5:
+        whole += 1
+    elif whole - value >= .5:
+        whole -= 1
+    return whole
+
+
+def tiles_under(rect):
+    '''Every tile a rect overlaps, for looking things up by tile.'''
+
+    columns = range(rect.x // TILESIZE,
+                    (rect.x + rect.width - 1) // TILESIZE + 1)
+    return [(column, row)
+            for row in range(rect.y // TILESIZE,
+                             (rect.y + rect.height - 1) // TILESIZE + 1)
+            for column in columns]
+
+
+class Vector:
+    '''2D vector that behaves like pygame's Vector2 where the game relies on
+    it. Adding and subtracting in place changes the vector itself, which
+    matters when several names share it, and vectors are equal to each other
+    or to (x, y) sequences when within VECTOR_EPSILON.'''
+
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x=0, y=None):
+        if y is None:
+            x, y = x
+        self.x = float(x)
+        self.y = float(y)
+
+    def __repr__(self):
+        return f"Vector({self.x}, {self.y})"
+
+    def __iter__(self):
+        return iter((self.x, self.y))
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        return (self.x, self.y)[index]
+
+    def __eq__(self, other):
+        if type(other) is Vector:
+            x, y = other.x, other.y
+        else:
+            try:
+                x, y = other
+            except (TypeError, ValueError):
+                return NotImplemented
+        return (abs(self.x - x) < VECTOR_EPSILON
+                and abs(self.y - y) < VECTOR_EPSILON)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __add__(self, other):
+        x, y = other
+        return Vector(self.x + x, self.y + y)
+
+    def __sub__(self, other):
+        x, y = other
+        return Vector(self.x - x, self.y - y)
+
+    def __iadd__(self, other):
+        x, y = other
+        self.x += x
+        self.y += y
+        return self
+
+    def __isub__(self, other):
+        x, y = other
+        self.x -= x
+        self.y -= y
+        return self
+
+    def __mul__(self, scalar):
+        return Vector(self.x * scalar, self.y * scalar)
+
+    def __neg__(self):
+        return Vector(-self.x, -self.y)
+
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y)
+
+    def length_squared(self):
+        return self.x * self.x + self.y * self.y
+
+    def distance_to(self, other):
+        x, y = other
+        dx = x - self.x
+        dy = y - self.y
+        return math.sqrt(dx * dx + dy * dy)
+
+
+class Rect:
+    '''Whole pixel rectangle with the parts of pygame's Rect the rules use.
+    Positions given as floats are rounded like pygame rounds them, so that
+    collisions happen on exactly the same frames.'''
+
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height):
+        self.x = round_coordinate(x)
+        self.y = round_coordinate(y)
+        self.width = round_coordinate(width)
+        self.height = round_coordinate(height)
+
+    def __repr__(self):
+        return f"Rect({self.x}, {self.y}, {self.width}, {self.height})"
+
+    @property
+    def topleft(self):
+        return self.x, self.y
+
+    @topleft.setter
+    def topleft(self, position):
+        x, y = position
+        self.x = round_coordinate(x)
+        self.y = round_coordinate(y)
+
+    @property
+    def center(self):
+        return self.x + self.width // 2, self.y + self.height // 2
+
+    @center.setter
+    def center(self, position):
+        x, y = position
+        self.x = round_coordinate(x) - self.width // 2
+        self.y = round_coordinate(y) - self.height // 2
+
+    @property
+    def centerx(self):
+        return self.x + self.width // 2
+
+    @property
+    def centery(self):
+        return self.y + self.height // 2
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def top(self):
+        return self.y
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def inflate(self, x, y):
+        '''A copy grown by 'x' and 'y' pixels around the same centre.'''
+
+        return Rect(self.x - int(x / 2), self.y - int(y / 2), self.width + x,
+                    self.height + y)
+
+    def colliderect(self, other):
+        if not (self.width and self.height and other.width and other.height):
+            return False
+        return (self.x < other.x + other.width
+                and self.y < other.y + other.height
+                and self.x + self.width > other.x
+                and self.y + self.height > other.y)
+
+
+class SnapshotRandom(random.Random):
+    '''Random number generator that only copies its state when it has been
+    used since the last copy. Getting the state of the Mersenne Twister means
+    copying over 600 numbers, which is most of the cost of a game snapshot,
+    while the game only draws random numbers when ghosts are frightened.'''
+
+    def seed(self, *args, **kwargs):
+        super().seed(*args, **kwargs)
+        self.saved_state = None
+
+    def random(self):
+        self.saved_state = None
+        return super().random()
+
+    def getrandbits(self, k):
+        self.saved_state = None
+        return super().getrandbits(k)
+
+    def getstate(self):
+        if self.saved_state is None:
+            self.saved_state = super().getstate()
+        return self.saved_state
+
+    def setstate(self, state):
+        super().setstate(state)
+        self.saved_state = state
+
+
+class PelletGroup:
+    '''The pellets left in the maze.
+
+    Like a pygame sprite group, pellets are kept in the order they were added,
+    which decides which of two stacked pellets is eaten first. They are also
+    filed under the tiles their hitboxes overlap, so collisions are only
+    checked against pellets nearby. 'version' changes whenever a pellet is
+    added or removed, so views can tell when to catch up.'''
+
+    def __init__(self):
+        self.order = {}  # when each pellet was added
+        self.tiles = {}
+        self.added = 0
+        self.version = 0
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, pellet):
+        return pellet in self.order
+
+    def add(self, pellet):
+        if pellet in self.order:
+            return
+        self.order[pellet] = self.added
+        self.added += 1
+        self.version += 1
+        for tile in tiles_under(pellet.hitbox):
+            self.tiles.setdefault(tile, []).append(pellet)
+
+    def remove(self, pellet):
+        if pellet not in self.order:
+            return
+        del self.order[pellet]
+        self.version += 1
+        for tile in tiles_under(pellet.hitbox):
+            self.tiles[tile].remove(pellet)
+
+    def collide(self, hitbox):
+        '''The pellet added first out of those whose hitbox overlaps
+        'hitbox', or None.'''
+
+        order = self.order
+        first = None
+        for tile in tiles_under(hitbox):
+            for pellet in self.tiles.get(tile, ()):
+                if (hitbox.colliderect(pellet.hitbox)
+                        and (first is None or order[pellet] < order[first])):
+                    first = pellet
+        return first
+
+
+class MovementUtilities:
+    '''Homogenised movement code that Pac-Man and the Ghosts inherit from.'''
+
+    def hitbox_collide(self, sprite, other):
+        '''Check if hit boxes of two sprites collided.'''
+
+        return sprite.hitbox.colliderect(other.hitbox)
+
+    def move(self,
+             position,
+             next_tile,
+             direction,
+             speed,
+             time_delta,
+             between_tiles=True):
+        '''Smoothly move from one tile to the next across multiple frames.
+        Also returns the seconds of 'time_delta' left on arriving at the next
+        tile, which the entity spends heading on from it, so that large time
+        deltas don't slow it down.'''
+
+        time_left = 0
+        if position != next_tile:
+            delta = next_tile - position
+            # time delta used to re-base movement on time rather then
+            # frame rate
+            next_step = direction * speed * time_delta
+            # comparison used to ensure that entity does not overshoot next
+            # tile, and stopping short of it by no more than rounding counts
+            # as getting there
+            if delta.length() > next_step.length() + VECTOR_EPSILON:
+                # keep on moving until the next tile is reached
+                position += next_step
+            else:
+                # entity has arrived at the tile, with none of the time delta
+                # to spare if it's only rounding, however the time was split
+                # into frames
+                time_left = (next_step.length() - delta.length()) / speed
+                if time_left < TIMER_EPSILON:
+                    time_left = 0
+                position = next_tile
+                between_tiles = False
+        elif between_tiles:
+            # stopped within rounding of the tile by the last move, which
+            # counts as having arrived, with all of the time delta to spare
+            time_left = time_delta
+            position = next_tile
+            between_tiles = False
+
+        return position, direction, between_tiles, time_left
+
+    def update_rect_and_hitbox(self):
+        '''update rect and hitbox to reflect any movement'''
+
+        self.rect.topleft = self.position
+        self.hitbox.center = self.position + self.offset
+
+    def update_last_next_tile(self, direction, last_tile, next_tile, rect):
+        '''Update the last and next tile for the entity.'''
+
+        current_tile = rect.centerx // TILESIZE, rect.centery // TILESIZE
+        last_tile = Vector(current_tile) * TILESIZE
+        next_tile = last_tile + direction * TILESIZE
+
+        return last_tile, next_tile
+
+    def screen_wrap_check(self, position, direction, next_tile, last_tile):
+        '''Update position when on the edges of screen.'''
+
+        maze_width = self.game.maze_width
+
+        # right wrap
+        if position.x >= maze_width:
+            position.x = float(-TILESIZE)
+            last_tile.x = float(0 - TILESIZE)
+            next_tile.x = position.x + (direction.x * TILESIZE)
+
+        # left wrap
+        elif position.x <= 0 - TILESIZE:
+            position.x = float(maze_width)
+            last_tile.x = float(maze_width)
+            next_tile.x = position.x + (direction.x * TILESIZE)
+
+        return position, next_tile, last_tile
+
+    def get_tile_state(self):
+        '''Position, last and next tile as plain tuples. Movement updates these
+        vectors in place and they're often the same object, which changes how
+        they move, so which of them are shared is recorded too.'''
+
+        position, last_tile, next_tile = (self.position, self.last_tile,
+                                          self.next_tile)
+        return ((position.x, position.y), (last_tile.x, last_tile.y),
+                (next_tile.x, next_tile.y), last_tile is position,
+                next_tile is position, next_tile is last_tile)
+
+    def set_tile_state(self, state):
+        '''Rebuild the vectors saved by 'get_tile_state', sharing the same ones
+        and syncing the rect and hitbox to the position.'''
+
+        position, last_tile, next_tile, last_is_position, next_is_position, \
+            next_is_last = state
+
+        self.position = Vector(position)
+        self.last_tile = self.position if last_is_position else Vector(last_tile)
+        if next_is_position:
+            self.next_tile = self.position
+        elif next_is_last:
+            self.next_tile = self.last_tile
+        else:
+            self.next_tile = Vector(next_tile)
+
+        self.update_rect_and_hitbox()
+
+
+class Player(MovementUtilities):
+    '''The movement, updating, and collision detection of Pac-Man'''
+
+    # frame angle for each direction of movement
+    frame_angles = {(1, 0): 0, (0, -1): 1, (0, 1): 2, (-1, 0): 3}
+
+    def __init__(self, game, x, y):
+        self.game = game
+
+        self.direction = Vector(0, 0)
+        self.new_direction = Vector(0, 0)
+        self.facing_direction = Vector(0, 0)
+        # moves with when they were made, in the order they were made
+        self.input_queue = []
+
+        self.position = Vector(x, y)
+        self.ORIGINAL_POSITION = Vector(x, y)
+
+        self.next_tile = self.position
+        self.last_tile = self.position
+
+        # the frame being shown, as (frame angle, frame), or None when hidden.
+        # Frame angle -1 is the death animation.
+        self.frame_angle = 0
+        self.new_frame_angle = 0
+        self.eat_animation_delay = .025
+        self.death_animation_delay = .25
+        self.last_frame_update = 0
+        self.eat_frame = 0
+        self.frame = (-1, self.eat_frame)
+
+        self.rect = Rect(x, y, TILESIZE, TILESIZE)
+
+        # smaller version of bounding box used for non-wall collision
+        self.hitbox = self.rect.inflate(-12, -12)
+        self.offset = Vector(self.rect.width * .5, self.rect.height * .5)
+
+        self.death_animation = False
+        self.level_clear = False
+        self.between_tiles = False
+        self.first_frame = False
+
+        self.speed = TILESIZE * PLAYER_SPEED
+        self.score = 0
+        self.lives = 2
+        self.eaten_multiplier = 1
+
+    def animate(self):
+        '''Either play death of eating animation depending on game state.'''
+        now = self.game.elapsed
+        # play eating animation
+        if not self.death_animation:
+            if now - self.last_frame_update > self.eat_animation_delay:
+                self.last_frame_update = now
+
+                self.eat_frame = (self.eat_frame + 1) % PACMAN_FRAMES
+
+                self.frame = (self.frame_angle, self.eat_frame)
+
+        # play death animation
+        elif now - self.last_frame_update > self.death_animation_delay:
+            self.last_frame_update = now
+
+            if self.eat_frame <= PACMAN_FRAMES - 1:
+                self.frame = (self.frame_angle, self.eat_frame)
+                self.eat_frame += 1
+            else:
+                # disappear once death animation has finished playing
+                self.frame = None
+
+    def reset_status(self):
+        '''Reset position, frame, flags, etc.'''
+
+        self.direction = Vector(0, 0)
+        self.facing_direction = Vector(0, 0)
+        self.position = Vector(self.ORIGINAL_POSITION.x,
+                               self.ORIGINAL_POSITION.y)
+
+        self.update_rect_and_hitbox()
+
+        self.first_frame = True
+        self.first_move = True
+        self.eat_frame = 0
+        self.frame_angle = 0
+        self.eaten_multiplier = 1
+        self.between_tiles = False
+        self.death_animation = False
+        self.frame = (-1, 0)
+
+    def apply_settings(self):
+        '''Take up Pac-Man's speed from settings after they are reloaded.'''
+
+        self.speed = TILESIZE * PLAYER_SPEED
+
+    def get_state(self):
+        '''Everything about Pac-Man that affects the simulation, as a tuple of
+        plain values. Restored by 'set_state'.'''
+
+        return (self.get_tile_state(), tuple(self.direction),
+                tuple(self.new_direction), tuple(self.facing_direction),
+                self.frame_angle, self.new_frame_angle, self.eat_frame,
+                self.between_tiles, self.first_frame, self.death_animation,
+                self.level_clear, self.score, self.lives,
+                self.eaten_multiplier, tuple(self.input_queue), self.frame,
+                self.last_frame_update)
+
+    def set_state(self, state):
+        '''Restore a state returned by 'get_state'.'''
+
+        (tile_state, direction, new_direction, facing_direction,
+         self.frame_angle, self.new_frame_angle, self.eat_frame,
+         self.between_tiles, self.first_frame, self.death_animation,
+         self.level_clear, self.score, self.lives, self.eaten_multiplier,
+         input_queue, self.frame, self.last_frame_update) = state
+
+        self.set_tile_state(tile_state)
+        self.direction = Vector(direction)
+        self.new_direction = Vector(new_direction)
+        self.facing_direction = Vector(facing_direction)
+        self.input_queue[:] = input_queue
+
+    def check_collision(self, ate=False):
+        '''Check if colliding with walls, pellets or ghosts. 'ate' is whether
+        a pellet was already eaten on the way this tick.'''
+
+        telemetry = self.game.telemetry
+        if telemetry:
+            telemetry.pacman_visit(self.rect)
+
+        self.check_walls_and_turns()
+
+        # checked every tick, even one a pellet is eaten in and the ghosts are
+        # left alone, so that each ghost's offset from Pac-Man stays current
+        collided_ghosts = [ghost for ghost in self.game.ghosts
+                           if self.swept_collide(ghost)]
+
+        # eating a pellet leaves the ghosts alone for the tick
+        ate = self.eat_pellet() or ate
+        if collided_ghosts and not ate:
+            for ghost in collided_ghosts:
+                if ghost.fright_mode:
+                    # eat the ghost
+                    self.game.pause_countdown = .5
+                    self.score += ghost.eaten_score * self.eaten_multiplier
+                    self.eaten_multiplier += 1
+                    ghost.toggle_eaten_mode(True, ghost.eaten_speed,
+                                            ghost.eaten_colour)
+                    if telemetry:
+                        telemetry.ghost_eaten(ghost.rect)
+
+                elif not ghost.fright_mode and not ghost.eaten_mode:
+                    # get caught
+                    self.lives -= 1
+                    if telemetry:
+                        telemetry.death(self.rect)
+
+                    self.game.pause_countdown = 5
+                    self.death_animation = True
+                    self.frame_angle = -1
+                    self.eat_frame = 0
+
+                    self.score //= 2
+                    break
+
+    def eat_pellet(self):
+        '''Eat the first pellet under Pac-Man, if there is one. Returns
+        whether he ate one.'''
+
+        telemetry = self.game.telemetry
+        eaten_pellet = self.game.pellets.collide(self.hitbox)
+        if eaten_pellet is None:
+            return False
+
+        self.score += eaten_pellet.eaten_score
+        # don't count the bonus fruit
+        if not eaten_pellet.bonus:
+            if telemetry:
+                telemetry.pellet_eaten(
+                    eaten_pellet.rect,
+                    self.game.dots_total - self.game.dots_remain,
+                    self.game.dots_total)
+            self.game.dots_remain -= 1
+
+            if self.game.dots_remain <= 0:
+                self.level_clear = True
+                self.game.pause_countdown = 5
+
+            elif eaten_pellet.powered:
+                for ghost in self.game.ghosts:
+                    if ghost.fright_mode and not ghost.eaten_mode:
+                        ghost.fright_timer = 0
+
+                    elif not ghost.eaten_mode:
+                        ghost.toggle_fright_mode(True, ghost.fright_speed,
+                                                 FRIGHT_BLUE)
+
+        self.game.eaten_pellets.append(eaten_pellet.index)
+        eaten_pellet.kill()
+        return True
+
+    def check_walls_and_turns(self):
+        '''Stop at walls, and on reaching a tile wrap around the maze's edges
+        and turn in the memorised direction if possible.'''
+
+        if self.direction != Vector(0, 0):
+            # wall collision
+            if self.game.collides_with_wall(self.rect):
+                self.position = self.last_tile
+                self.next_tile = self.last_tile
+                self.direction = Vector(0, 0)
+                self.between_tiles = False
+
+            if self.position == self.next_tile:
+                self.position, self.next_tile, self.last_tile = self.screen_wrap_check(
+                    self.position, self.direction, self.next_tile,
+                    self.last_tile)
+
+                # move in memorised direction if possible
+                if not self.check_for_walls(self.new_direction):
+                    self.direction = self.new_direction
+                    self.frame_angle = self.new_frame_angle
+                    self.facing_direction = self.direction
+                    self.between_tiles = True
+
+                self.last_tile, self.next_tile = self.update_last_next_tile(
+                    self.direction, self.last_tile, self.next_tile, self.rect)
+
+            self.update_rect_and_hitbox()
+
+    def swept_collide(self, ghost):
+        '''Check if Pac-Man and a ghost have touched since the last check,
+        either overlapping now or having passed through each other along a
+        row or column in between. Passing through takes a tick that moves
+        them further than their hit boxes are wide, which never happens at
+        the normal frame rate, but does when the simulation is stepped in
+        large time deltas.'''
+
+        offset_x = ghost.hitbox.x - self.hitbox.x
+        offset_y = ghost.hitbox.y - self.hitbox.y
+        last_offset = ghost.pacman_offset
+        ghost.pacman_offset = (offset_x, offset_y)
+
+        if self.hitbox_collide(self, ghost):
+            return True
+        if last_offset is None:
+            return False
+
+        last_x, last_y = last_offset
+        # an offset that jumps by half the maze is one of them wrapping
+        # around, not passing through
+        if (abs(offset_x - last_x) > self.game.maze_width / 2
+                or abs(offset_y - last_y) > self.game.maze_height / 2):
+            return False
+
+        # they overlapped in between if they swapped sides along one axis
+        # while staying within reach along the other
+        width = self.hitbox.width
+        height = self.hitbox.height
+        return ((offset_x * last_x < 0 and abs(offset_y) < height
+                 and abs(last_y) < height)
+                or (offset_y * last_y < 0 and abs(offset_x) < width
+                    and abs(last_x) < width))
+
+    def check_for_walls(self, new_direction):
+        '''Checks if memorised direction will lead to a wall.'''
+
+        self.position += new_direction * TILESIZE
+        self.rect.topleft = self.position
+
+        is_wall = self.game.collides_with_wall(self.rect)
+
+        self.position -= new_direction * TILESIZE
+        self.rect.topleft = self.position
+
+        return is_wall
+
+    def queue_move(self, direction, timestamp=None):
+        '''Buffer a move to be acted upon next update, so that taps shorter
+        than a frame aren't lost. 'direction' is an (x, y) unit direction, or
+        None to stop. 'timestamp' is when a key press was read, for measuring
+        input latency, and None for moves not made at the keyboard.'''
+
+        self.input_queue.append((direction, timestamp))
+
+    def apply_queued_moves(self):
+        '''Act upon the moves made since the last update and update vectors
+        accordingly.'''
+
+        if self.game.recorder and self.input_queue:
+            self.game.recorder.moves_applied(self.input_queue)
+
+        for direction, timestamp in self.input_queue:
+            if direction is None:
+                self.direction = Vector(0, 0)
+                continue
+
+            self.new_frame_angle = self.frame_angles[direction]
+            new_direction = Vector(direction)
+
+            self.position, self.next_tile, self.last_tile = self.screen_wrap_check(
+                self.position, self.direction, self.next_tile, self.last_tile)
+
+            self.new_direction = new_direction  # memorise direction
+
+            # check if this new direction is eligible
+            if not self.check_for_walls(self.new_direction):
+                if (self.game.latency and timestamp is not None
+                        and self.direction != self.new_direction):
+                    self.game.latency.turn_made(timestamp)
+
+                self.direction = self.new_direction
+                self.facing_direction = self.new_direction
+                self.frame_angle = self.new_frame_angle
+
+                self.last_tile, self.next_tile = self.update_last_next_tile(
+                    self.direction, self.last_tile, self.next_tile, self.rect)
+
+            self.between_tiles = True  # now on the move
+
+        self.input_queue.clear()
+
+    def update(self):
+        '''Sequentially call methods every frame.'''
+
+        if self.game.autopilot:
+            self.game.autopilot.steer()
+        self.apply_queued_moves()
+
+        ate = False
+        if not self.first_frame:  # to prevent a bug with Pac-man's animation
+            time_left = self.game.time_delta
+            while time_left:
+                self.position, self.direction, self.between_tiles, \
+                    time_left = self.move(self.position, self.next_tile,
+                                          self.direction, self.speed,
+                                          time_left, self.between_tiles)
+
+                self.update_rect_and_hitbox()
+                # arrived at a tile with time to spare, to move on from it,
+                # eating what's there on the way
+                if time_left:
+                    self.check_walls_and_turns()
+                    ate = self.eat_pellet() or ate
+
+        if self.direction != Vector(0, 0):
+            self.animate()
+
+        self.check_collision(ate)
+
+        self.first_frame = False
+
+
+class Ghost(MovementUtilities):
+    '''Base class for ghosts. Will make a beeline straight to Pac-Man.'''
+
+    def __init__(self, game, x, y):
+        self.game = game
+        game.ghosts.append(self)
+
+        self.position = Vector(x, y)
+        self.ORIGINAL_POSITION = Vector(x, y)
+
+        self.last_tile = self.position
+        self.next_tile = self.position
+
+        self.direction = Vector(0, 0)
+
+        # the frame being shown, as (colour, direction), or None when hidden.
+        # Colour 4 is eaten and 5 is frightened, which flashes between its
+        # first two frames.
+        self.frame_colour = 0
+        self.ORIGINAL_FRAME_COLOUR = 0
+        self.frame_direction = 2  # looking down on Pac-man with an intense stare
+        self.frame = (self.frame_colour, self.frame_direction)
+
+        self.rect = Rect(x, y, TILESIZE, TILESIZE)
+
+        # smaller bounding box used for non-wall collision.
+        self.hitbox = self.rect.inflate(-12, -12)
+        self.offset = Vector(10, 10)
+
+        self.speed = TILESIZE * GHOST_SPEED
+        self.ORIGINAL_SPEED = self.speed
+
+        self.target_tile = Vector(0, 0)
+        # corner 3 tiles from right side, one up from top
+        self.maze_corner = Vector(WIDTH - (TILESIZE * 3), TILESIZE * -1)
+
+        # directions ordered by priority
+        self.directions = [Vector(0, -1), Vector(-1, 0), Vector(0, 1),
+                           Vector(1, 0)]
+        self.between_tiles = False
+        self.first_move = True
+        self.first_frame = True
+
+        self.chase_time = CHASE_TIME
+
+        self.scatter_mode = True
+        self.scatter_time = SCATTER_TIME
+        self.state_timer = 0
+        self.scatter_counter = 0
+        self.scatter_threshold = 3
+        self.num_scatter_threshold = 5
+        self.ignore_scatter = False  # for Blinky
+
+        self.fright_mode = False
+        self.fright_time = FRIGHT_TIME
+        self.fright_timer = 0
+        self.fright_speed = TILESIZE * GHOST_FRIGHT_SPEED
+
+        # begin flashing when there's 3 seconds left
+        self.flash_time = self.fright_time - FRIGHT_FLASH_TIME
+        self.flash_duration = .25  # how long a ghost stays as one colour
+        self.flash_alternate = .25  # alternate between white in quarter-second intervals
+
+        self.eaten_mode = False
+        self.eaten_colour = GREEN
+        self.eaten_target_tile = Vector(
+            14, 14) * TILESIZE  # just outside ghost house
+        self.eaten_speed = TILESIZE * GHOST_EATEN_SPEED
+        self.eaten_score = 200
+
+        # where the hit box was from Pac-Man's at his last collision check,
+        # to tell if they passed through each other in between
+        self.pacman_offset = None
+
+    def set_target_tile(self):
+        '''Sets target tile for ghosts to pursue. Each ghost overrides
+        'chase_target' to find their own unique tile.'''
+
+        player = self.game.player
+        self.target_tile = Vector(self.chase_target(
+            player.position, player.facing_direction, self.game.blinky.position,
+            self.position))
+
+    def chase_target(self, pacman, facing, blinky, own):
+        '''Chase target from plain (x, y) positions of Pac-Man, his facing
+        direction, Blinky and this ghost, so that the autopilot's forward
+        model can use the same rules. In this case simply Pac-Man's current
+        position.'''
+
+        return pacman[0], pacman[1]
+
+    def check_distance_from_pacman(self):
+        '''Overridden by Clyde to check how close Pac-Man is to him'''
+
+    def calculate_distance(self, x1, y1, x2, y2, sqroot):
+        '''Distance calculation using Pythagoras' Theorem. Has a flag that - when set true - will square
+        root the distance.'''
+
+        dist = ((x1 - x2)**2 + (y1 - y2)**2)
+        if sqroot:
+            dist = math.sqrt(dist)
+        return dist
+
+    def choose_direction(self):
+        '''Choose a direction that will get the ghost to the target tile the fastest.'''
+
+        min_dist = 0
+        min_dist_index = 0
+        fright_list = []
+
+        # iterate through cardinal directions and check possibility of moving
+        # there
+        for index, unit_vector in enumerate(self.directions):
+
+            # discard up vector if ghost is in a 'no-up' tile
+            if unit_vector == Vector(0, -1):
+                if self.position in self.game.noup_coords:
+                    continue
+
+            # move ghost to the new position
+            self.position += unit_vector * TILESIZE
+            self.rect.topleft = self.position
+
+            dist = 0
+            # invalidate direction if it causes the ghost to U-turn
+            # if it's the ghost's first move it wont be checked.
+            if self.position == self.last_tile and self.first_move == False:
+                dist = -1
+            # invalidate direction if it causes the ghost to move into a wall
+            elif self.game.collides_with_wall(self.rect):
+                dist = -1
+
+            elif not self.fright_mode:
+                dist = self.calculate_distance(self.rect.centerx,
+                                               self.rect.centery,
+                                               self.target_tile.x,
+                                               self.target_tile.y, False)
+
+            # move back to original position
+            self.position -= unit_vector * TILESIZE
+            self.rect.topleft = self.position
+
+            if dist == -1:
+                continue
+
+            if self.fright_mode:
+                fright_list.append(index)
+            else:
+                # if both dist and min_dist are the same, the index remains
+                # the same
+                # doing this implements the direction priority system the
+                # original game had
+                if dist < min_dist or min_dist == 0:
+                    min_dist = dist
+                    min_dist_index = index
+
+        # pick a direction after all vectors have been checked
+        if self.fright_mode:
+            self.direction = self.directions[self.game.rng.choice(fright_list)]
+        else:
+            self.direction = self.directions[min_dist_index]
+            self.frame_direction = min_dist_index
+            self.frame = (self.frame_colour, self.frame_direction)
+
+        self.first_move = False
+
+    def toggle_fright_mode(self, mode, speed=None, colour=None):
+        '''Enter and exit frightened mode based on parameters passed'''
+
+        if self.fright_mode:  # exit mode
+            self.speed = self.ORIGINAL_SPEED
+
+        else:  # enter mode
+            self.direction = Vector(-self.direction.x, -self.direction.y)
+
+            # U-turn
+            self.next_tile.x, self.last_tile.x = self.last_tile.x, self.next_tile.x
+            self.next_tile.y, self.last_tile.y = self.last_tile.y, self.next_tile.y
+
+            self.update_rect_and_hitbox()
+
+            self.frame = (5, 0)
+            self.speed = speed
+
+        self.flash_duration = .25
+        self.fright_timer = 0
+        self.fright_mode = mode
+
+    def toggle_eaten_mode(self, mode, speed=None, colour=None):
+        '''Enter and exit eaten mode based on parameters passed'''
+
+        if not mode:  # exit mode
+            self.speed = self.ORIGINAL_SPEED
+            self.target_tile = self.maze_corner
+            self.frame_colour = self.ORIGINAL_FRAME_COLOUR
+
+        else:  # enter mode
+            self.toggle_fright_mode(False)
+            self.speed = speed
+            self.target_tile = self.eaten_target_tile
+            self.frame_colour = 4
+
+        self.eaten_mode = mode
+
+    def check_fright_flash(self):
+        '''Check if it's time to flash.'''
+        self.flash_duration += self.game.time_delta
+        if self.flash_duration >= self.flash_alternate:
+            # alternate colour
+            self.flash_duration = 0
+            self.frame = (5, 1) if self.frame == (5, 0) else (5, 0)
+
+    def check_current_state(self):
+        '''Check and change the state of ghosts when appropriate.'''
+
+        def start_chasing():
+            self.state_timer = 0
+            self.scatter_mode = False
+
+        def start_scattering():
+            self.state_timer = 0
+            self.scatter_mode = True
+            self.target_tile = self.maze_corner
+            self.scatter_counter += 1
+
+            if self.scatter_counter == self.scatter_threshold:
+                self.scatter_time -= 2
+
+        # ensures that ghosts will target maze corners on the first move
+        if self.first_move and self.scatter_mode:
+            self.target_tile = self.maze_corner
+            self.scatter_counter += 1
+
+        # Blinky only - ignore the changing between scatter and chase if less
+        # than 30 pellets remain
+        if self.ignore_scatter:
+            self.scatter_mode = False
+            return  # Blinky will now ignore checks below
+
+        # pause timer while in frightened or eaten mode
+        if not self.fright_mode and not self.eaten_mode:
+            self.state_timer += self.game.time_delta
+
+        elif self.fright_mode:
+            self.fright_timer += self.game.time_delta
+
+            if self.fright_timer >= self.fright_time - TIMER_EPSILON:
+                self.toggle_fright_mode(False)
+
+            elif self.fright_timer >= self.flash_time:
+                self.check_fright_flash()
+
+        if self.eaten_mode and self.position == self.eaten_target_tile:
+            self.toggle_eaten_mode(False)
+            self.game.player.eaten_multiplier = 1
+
+        if self.scatter_counter < self.num_scatter_threshold:
+            if (self.state_timer >= self.scatter_time - TIMER_EPSILON
+                    and self.scatter_mode):
+                start_chasing()
+
+            elif (self.state_timer >= self.chase_time - TIMER_EPSILON
+                  and not self.scatter_mode):
+                start_scattering()
+
+        else:
+            self.scatter_mode = False
+
+    def increment_temp_scatter_timer(self):
+        '''Overridden by Clyde'''
+
+    def get_state(self):
+        '''Everything about the ghost that affects the simulation, as a tuple
+        of plain values. Restored by 'set_state'.'''
+
+        # Clyde can chase Pac-Man's own position vector, which then moves
+        # along with him, so record which of Pac-Man's vectors it is
+        player = self.game.player
+        target_tile = self.target_tile
+        if target_tile is player.position:
+            target_link = 1
+        elif target_tile is player.last_tile:
+            target_link = 2
+        elif target_tile is player.next_tile:
+            target_link = 3
+        else:
+            target_link = 0
+
+        return (self.get_tile_state(), tuple(self.direction),
+                (target_tile.x, target_tile.y), target_link,
+                self.between_tiles, self.first_move, self.first_frame,
+                self.scatter_mode, self.scatter_time, self.state_timer,
+                self.scatter_counter, self.ignore_scatter, self.fright_mode,
+                self.fright_timer, self.flash_duration, self.eaten_mode,
+                self.speed, self.frame_colour, self.frame_direction,
+                self.frame, self.pacman_offset)
+
+    def set_state(self, state):
+        '''Restore a state returned by 'get_state'. Pac-Man must be restored
+        first, since the target tile can be one of his vectors.'''
+
+        (tile_state, direction, target_tile, target_link, self.between_tiles,
+         self.first_move, self.first_frame, self.scatter_mode,
+         self.scatter_time, self.state_timer, self.scatter_counter,
+         self.ignore_scatter, self.fright_mode, self.fright_timer,
+         self.flash_duration, self.eaten_mode, self.speed, self.frame_colour,
+         self.frame_direction, self.frame, self.pacman_offset) = state
+
+        self.set_tile_state(tile_state)
+        self.direction = Vector(direction)
+
+        player = self.game.player
+        if target_link == 1:
+            self.target_tile = player.position
+        elif target_link == 2:
+            self.target_tile = player.last_tile
+        elif target_link == 3:
+            self.target_tile = player.next_tile
+        else:
+            self.target_tile = Vector(target_tile)
+
+    def reset_status(self):
+        '''Reset position, frame, flags, etc.'''
+
+        self.direction = Vector(0, 0)
+        self.position = Vector(self.ORIGINAL_POSITION.x,
+                               self.ORIGINAL_POSITION.y)
+
+        self.update_rect_and_hitbox()
+
+        self.last_tile = self.position
+        self.next_tile = self.position
+
+        if self.fright_mode:
+            self.toggle_fright_mode(False)
+        elif self.eaten_mode:
+            self.toggle_eaten_mode(False)
+
+        self.state_timer = 0
+        self.scatter_mode = True
+        self.target_tile = self.maze_corner
+        self.first_move = True
+        self.first_frame = True
+        self.between_tiles = False
+        self.pacman_offset = None
+
+        self.frame_colour = self.ORIGINAL_FRAME_COLOUR
+        self.frame_direction = 2
+        self.frame = (self.frame_colour, self.frame_direction)
+
+    def apply_settings(self):
+        '''Take up speeds and mode timers from settings after they are
+        reloaded. Timers already running carry on against the new times.'''
+
+        self.ORIGINAL_SPEED = TILESIZE * GHOST_SPEED
+        self.fright_speed = TILESIZE * GHOST_FRIGHT_SPEED
+        self.eaten_speed = TILESIZE * GHOST_EATEN_SPEED
+        if self.eaten_mode:
+            self.speed = self.eaten_speed
+        elif self.fright_mode:
+            self.speed = self.fright_speed
+        else:
+            self.speed = self.ORIGINAL_SPEED
+
+        self.chase_time = CHASE_TIME
+        self.scatter_time = SCATTER_TIME
+        # scatters are shorter once the threshold has been reached
+        if self.scatter_counter >= self.scatter_threshold:
+            self.scatter_time -= 2
+        self.fright_time = FRIGHT_TIME
+        self.flash_time = self.fright_time - FRIGHT_FLASH_TIME
+
+    def update(self):
+        '''Sequentially call methods every frame.'''
+
+        self.check_current_state()
+        self.travel()
+
+    def travel(self):
+        '''Turn and move for the frame, once the ghost's state is checked.
+        Returns the number of turns made.'''
+
+        turns = 0
+        # only choose direction when aligned to a tile
+        if not self.between_tiles:
+            self.turn()
+            turns += 1
+
+        time_left = self.advance(self.game.time_delta)
+        while time_left:
+            self.turn()
+            turns += 1
+            time_left = self.advance(time_left)
+
+        self.end_frame()
+        return turns
+
+    def turn(self):
+        '''Choose which way to go on from the tile the ghost is on.'''
+
+        if not self.scatter_mode and not self.eaten_mode and not self.fright_mode:
+            self.check_distance_from_pacman()
+            self.set_target_tile()
+
+        self.position, self.next_tile, self.last_tile = self.screen_wrap_check(
+            self.position, self.direction, self.next_tile, self.last_tile)
+
+        self.choose_direction()
+        self.leave_tile()
+
+    def leave_tile(self):
+        '''Head for the next tile in the direction chosen.'''
+
+        self.last_tile, self.next_tile = self.update_last_next_tile(
+            self.direction, self.last_tile, self.next_tile, self.rect)
+        self.between_tiles = True
+
+    def advance(self, time_left):
+        '''Move along towards the next tile for up to 'time_left' seconds,
+        once any turn has been made. Returns the time left over on arriving
+        at a tile, to turn there and move on from it in, or 0.'''
+
+        self.position, self.direction, self.between_tiles, time_left = \
+            self.move(self.position, self.next_tile, self.direction,
+                      self.speed, time_left)
+
+        self.update_rect_and_hitbox()
+        # an eaten ghost stops where it's headed
+        if self.eaten_mode and self.position == self.eaten_target_tile:
+            return 0
+        return time_left
+
+    def end_frame(self):
+        '''Count the frame, once the ghost has moved for all of it.'''
+
+        self.increment_temp_scatter_timer()  # for Clyde
+
+        if self.game.telemetry and not self.eaten_mode:
+            self.game.telemetry.ghost_visit(self.rect)
+
+        self.first_frame = False
+
+
+class Pinky(Ghost):
+    '''Targets four tiles ahead of Pac-Man to flank.'''
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+
+        # 3 tiles from left side, one up from top
+        self.maze_corner = Vector((TILESIZE * 3), TILESIZE * -1)
+        self.frame_colour = 1
+        self.ORIGINAL_FRAME_COLOUR = 1
+        self.frame = (self.frame_colour, self.frame_direction)
+
+    def chase_target(self, pacman, facing, blinky, own):
+        '''Four tiles ahead of Pac-Man facing direction.'''
+        return (pacman[0] + facing[0] * (TILESIZE * 4),
+                pacman[1] + facing[1] * (TILESIZE * 4))
+
+
+class Inky(Ghost):
+    '''Finds vector from immediate tile to Blinky and adds it to immediate tile
+    position. Inky will join Blinky when Blinky is close to Pac-Man'''
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+
+        # 1 tile from right, 2 from bottom
+        self.maze_corner = Vector(WIDTH - TILESIZE, HEIGHT - (TILESIZE * 2))
+        self.frame_colour = 2
+        self.ORIGINAL_FRAME_COLOUR = 2
+        self.frame = (self.frame_colour, self.frame_direction)
+
+    def chase_target(self, pacman, facing, blinky, own):
+        '''Find vector to immediate position and add to immediate tile position.'''
+
+        immediate_x = pacman[0] + facing[0] * (TILESIZE * 2)
+        immediate_y = pacman[1] + facing[1] * (TILESIZE * 2)
+
+        return (immediate_x + (immediate_x - blinky[0]),
+                immediate_y + (immediate_y - blinky[1]))
+
+
+class Clyde(Ghost):
+    '''Makes a beeline straight to Pac-Man until they are less than eight tiles
+    away of each other, in which case Clyde will scatter to his corner for two
+    seconds.'''
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+
+        self.temp_scatter_duration = 2
+        self.temp_scatter_timer = 0
+        self.temp_scatter_mode = False
+        # squared to match un-rooted distance calculation
+        self.scatter_radius = (TILESIZE * 8)**2
+
+        self.maze_corner = Vector(TILESIZE, HEIGHT - (TILESIZE * 2))
+
+        self.frame_colour = 3
+        self.ORIGINAL_FRAME_COLOUR = 3
+        self.frame = (self.frame_colour, self.frame_direction)
+
+    def check_distance_from_pacman(self):
+        '''Simply checks distance from Pac-Man using pythag. No square rooting
+        for performance reasons.'''
+
+        dist = self.calculate_distance(self.position.x, self.position.y,
+                                       self.game.player.position.x,
+                                       self.game.player.position.y, False)
+
+        # scatter when Pac-Man is within radius
+        if dist <= self.scatter_radius:
+            self.temp_scatter_mode = True
+            self.target_tile = self.maze_corner
+
+    def get_state(self):
+        return super().get_state() + (self.temp_scatter_timer,
+                                      self.temp_scatter_mode)
+
+    def set_state(self, state):
+        super().set_state(state[:-2])
+        self.temp_scatter_timer, self.temp_scatter_mode = state[-2:]
+
+    def chase_target(self, pacman, facing, blinky, own):
+        '''Pac-Man's position, or Clyde's corner when Pac-Man is within his
+        scatter radius. Used by the forward model, which doesn't keep track
+        of how long Clyde has been scattering for.'''
+
+        dist = self.calculate_distance(own[0], own[1], pacman[0], pacman[1],
+                                       False)
+        if dist <= self.scatter_radius:
+            return self.maze_corner.x, self.maze_corner.y
+        return pacman[0], pacman[1]
+
+    def increment_temp_scatter_timer(self):
+        '''Increments timer when in temporary scatter mode.'''
+
+        if self.temp_scatter_mode:
+            self.temp_scatter_timer += self.game.time_delta
+
+    def set_target_tile(self):
+        '''Check if it's time to exit temporary scatter mode.'''
+
+        if self.temp_scatter_mode:
+            if (self.temp_scatter_timer
+                    >= self.temp_scatter_duration - TIMER_EPSILON):
+                self.target_tile = self.game.player.position
+                self.temp_scatter_timer = 0
+                self.temp_scatter_mode = False
+        else:
+            self.target_tile = Vector(self.game.player.position.x,
+                                      self.game.player.position.y)
+
+
+class WallCollision:
+    '''Collision that span the walls of the maze. Filed under the tiles they
+    cover so that only the walls nearby are checked.'''
+
+    def __init__(self, game, x, y, width, height):
+        self.game = game
+        self.rect = Rect(x, y, width, height)
+        game.walls.append(self)
+        for tile in tiles_under(self.rect):
+            game.wall_tiles.setdefault(tile, []).append(self)
+
+
+class Pellet:
+    '''The pellets scattered throughout the maze.'''
+
+    def __init__(self, game, x, y):
+        self.game = game
+
+        self.position = Vector(x, y)
+        self.frame = 0
+        self.rect = Rect(x, y, TILESIZE, TILESIZE)
+
+        # smaller version of bounding box used for non-wall collision
+        self.hitbox = self.rect.inflate(-15, -15)
+        offset = Vector(10, 10)
+        self.hitbox.center = self.position + offset
+
+        self.powered = False
+        self.bonus = False
+
+        self.eaten_score = 1
+
+        self.index = len(game.pellet_list)
+        game.pellet_list.append(self)
+        game.pellets.add(self)
+
+    def kill(self):
+        self.game.pellets.remove(self)
+
+    def alive(self):
+        return self in self.game.pellets
+
+
+class PowerPellet(Pellet):
+    '''Placed at specific spots for Pac-Man to eat and frighten ghosts.'''
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+        self.powered = True
+        game.power_pellets.append(self)
+
+        self.frame = 1
+        self.last_flash = 0
+        self.flash_delay = .2
+        self.eaten_score = 10
+        self.bonus = False
+
+    def update(self):
+        '''Animate flashing'''
+
+        now = self.game.elapsed
+        if now - self.last_flash > self.flash_delay:
+            self.last_flash = now
+            self.frame = 2 if self.frame == 1 else 1
+
+
+class BonusFruit(Pellet):
+    '''Appears just below the ghost house after a set time in the level.'''
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+        self.frame = self.game.rng.randrange(FRUIT_FRAMES)
+        self.eaten_score = 2500
+        self.bonus = True
+
+
+class Simulation:
+    '''The rules of the game with nothing to do with drawing, windows or
+    input, so it doesn't need pygame. Runs headless as it is, and many can
+    run in one process; 'Game' draws one and plays it from the keyboard.
+
+    'step' advances the simulation one frame of 'time_delta' seconds, and
+    'fast_forward' several. Pac-Man is moved with 'player.queue_move'.
+    Entities keep the frame they show in 'frame' for whatever draws them.
+    'latency', 'autopilot', 'telemetry', 'recorder', 'ghost_batch' and
+    'macro_steps' can be set to hook those in.'''
+
+    def __init__(self):
+        self.playing = False
+        self.time_delta = 1 / FPS
+        self.latency = None
+        self.autopilot = None
+        self.telemetry = None
+        self.recorder = None
+        self.ghost_batch = None
+        self.macro_steps = None
+
+        self.maze_flash_duration = .25
+        self.maze_flash_alternate = .25
+
+        self.dots_threshold = DOTS_THRESHOLD
+
+        # all of the game's randomness comes from here so it can be seeded
+        self.rng = SnapshotRandom()
+
+        self.root = path.dirname(__file__)
+        self.maze_dir = path.join(self.root, 'maze')
+        self.maze_file = path.join(self.maze_dir, 'maze.tmx')
+        # the maze file and its modification time when it was last read
+        self.maze_key = None
+
+    def read_maze(self):
+        '''Read the maze's objects and size, unless it's the same file, not
+        changed since they were last read. Parsing it again for every game is slow,
+        and leaves a little more memory behind each time. Returns whether it
+        was read.'''
+
+        # another file can have the same modification time, such as a copy
+        key = (self.maze_file, os.stat(self.maze_file).st_mtime_ns)
+        if key == self.maze_key:
+            return False
+        self.maze_objects = read_maze_objects(self.maze_file)
+        # actors wrap around at the maze's edges
+        self.maze_width, self.maze_height = read_maze_size(self.maze_file)
+        self.maze_key = key
+        return True
+
+    def load_level(self):
+        '''Reset the level and place everything from the maze's objects.'''
+
+        if self.recorder:
+            self.recorder.new_level(self)
+
+        self.pause_countdown = 1.5
+        self.pre_game_countdown = True
+        self.manual_pause = False
+        # seconds simulated, which animations are timed by
+        self.elapsed = 0
+        self.maze_flash = True
+
+        self.bonus_time = BONUS_TIME
+        self.bonus_timer = 0  # count the time elapsed since game begun
+
+        self.bonus_spawned = False
+        self.noup_coords = []
+        self.pellet_list = []  # every pellet by index, eaten or not
+        self.eaten_pellets = []  # indices in the order they were eaten
+
+        self.read_maze()
+
+        self.walls = []
+        self.wall_tiles = {}
+        self.pellets = PelletGroup()
+        self.power_pellets = []
+        self.ghosts = []
+
+        self.create_walls()
+        self.create_pellets()
+
+        for tile_object in self.maze_objects:
+
+            if tile_object.name == 'bonus_spawn':
+                self.bonus_coords = Vector(tile_object.x, tile_object.y)
+
+            elif tile_object.name == 'player_spawn':
+                self.player = Player(self, tile_object.x, tile_object.y)
+
+            elif tile_object.name == 'blinky_spawn':
+                self.blinky = Ghost(self, tile_object.x, tile_object.y)
+            elif tile_object.name == 'pinky_spawn':
+                self.pinky = Pinky(self, tile_object.x, tile_object.y)
+            elif tile_object.name == 'inky_spawn':
+                self.inky = Inky(self, tile_object.x, tile_object.y)
+            elif tile_object.name == 'clyde_spawn':
+                self.clyde = Clyde(self, tile_object.x, tile_object.y)
+            elif tile_object.name == 'ghost_spawn':
+                # any more ghosts chase Pac-Man like Blinky
+                Ghost(self, tile_object.x, tile_object.y)
+
+            elif tile_object.name == 'no_up':
+                self.noup_coords.append(Vector(tile_object.x, tile_object.y))
+
+        if self.autopilot:
+            self.autopilot.new_level()
+
+    def create_walls(self):
+        '''Create the wall collision boxes from the maze's wall objects.'''
+
+        for tile_object in self.maze_objects:
+            if tile_object.name == 'wall':
+                WallCollision(self, tile_object.x, tile_object.y,
+                              tile_object.width, tile_object.height)
+
+    def create_pellets(self):
+        '''Create a pellet for each of the maze's pellet objects.'''
+
+        for tile_object in self.maze_objects:
+            if tile_object.name == 'pellet_spawn':
+                Pellet(self, tile_object.x, tile_object.y)
+            elif tile_object.name == 'power_pellet_spawn':
+                PowerPellet(self, tile_object.x, tile_object.y)
+
+        self.dots_remain = len(self.pellets)
+        self.dots_total = self.dots_remain
+
+    def collides_with_wall(self, rect):
+        '''Whether a rect overlaps any of the walls.'''
+
+        wall_tiles = self.wall_tiles
+        for tile in tiles_under(rect):
+            for wall in wall_tiles.get(tile, ()):
+                if rect.colliderect(wall.rect):
+                    return True
+        return False
+
+    def rebuild_walls(self):
+        '''Replace the wall collision boxes with those of the current maze.'''
+
+        self.walls = []
+        self.wall_tiles = {}
+        self.create_walls()
+
+    def rebuild_pellets(self):
+        '''Replace the pellets with those of the current maze. Pellets that
+        are where an eaten one was stay eaten and the bonus fruit is kept, so
+        the level carries on as it was. Snapshots taken before can't be
+        restored afterwards.'''
+
+        eaten = Counter()
+        fruits = []
+        for pellet in self.pellet_list:
+            if pellet.bonus:
+                if pellet.alive():
+                    fruits.append(pellet)
+            elif not pellet.alive():
+                eaten[pellet.powered, tuple(pellet.position)] += 1
+            pellet.kill()
+
+        self.pellet_list = []
+        self.eaten_pellets = []
+        self.power_pellets = []
+        self.create_pellets()
+
+        for pellet in self.pellet_list[:]:
+            key = pellet.powered, tuple(pellet.position)
+            if eaten[key]:
+                eaten[key] -= 1
+                self.eaten_pellets.append(pellet.index)
+                self.dots_remain -= 1
+                pellet.kill()
+
+        for fruit in fruits:
+            fruit.index = len(self.pellet_list)
+            self.pellet_list.append(fruit)
+            self.pellets.add(fruit)
+
+    def apply_settings(self):
+        '''Give the game and its actors the speeds and timers from settings,
+        after settings.py has been reloaded.'''
+
+        self.bonus_time = BONUS_TIME
+        self.dots_threshold = DOTS_THRESHOLD
+        self.player.apply_settings()
+        for ghost in self.ghosts:
+            ghost.apply_settings()
+
+    def step(self):
+        '''Advance the game state by one frame of 'time_delta'. Returns False
+        when the frame should not be drawn, either because the game has ended
+        or the entities have just been reset.'''
+
+        self.elapsed += self.time_delta
+        if self.recorder:
+            self.recorder.frame(self.time_delta, self.manual_pause)
+
+        # when the game is not paused
+        if self.pause_countdown <= TIMER_EPSILON and not self.manual_pause:
+            self.pre_game_countdown = False
+            if not self.bonus_spawned:
+                self.bonus_timer += self.time_delta
+
+            # force Blinky into chase mode if there is less than 30
+            # pellets on screen
+            if self.dots_remain < self.dots_threshold:
+                self.blinky.ignore_scatter = True
+
+            # break into game over screen if all lives are depleted
+            if self.player.lives < 0:
+                self.post_message = "Game Over!"
+                self.playing = False
+                return False
+
+            # clear the level once all pellets have been eaten
+            if self.player.level_clear:
+                self.post_message = "Level Clear!"
+                self.playing = False
+                return False
+
+            # reset position once death animation has finished playing
+            if self.player.death_animation:
+                self.reset_entities()
+
+                # set ready for the next pre-game pause
+                self.pause_countdown = 1.5
+                self.pre_game_countdown = True
+                return False
+
+            # check if it's time to spawn the bonus fruit
+            elif (not self.bonus_spawned
+                  and self.bonus_timer >= self.bonus_time - TIMER_EPSILON):
+                BonusFruit(self, self.bonus_coords.x, self.bonus_coords.y)
+                self.bonus_spawned = True
+
+            self.update()  # game only updates when not paused
+
+        else:
+            self.pause_countdown -= self.time_delta
+
+            if self.player.death_animation:
+                if self.pause_countdown <= 3:
+                    # play out death animation
+                    self.player.animate()
+                    for ghost in self.ghosts:
+                        # make ghosts disappear
+                        ghost.frame = None
+
+            elif self.player.level_clear:
+                self.maze_flash_duration += self.time_delta
+
+                if self.pause_countdown <= 4:
+                    # enter vibe mode
+                    self.player.frame = (-1, 0)
+                    # make ghosts disappear
+                    for ghost in self.ghosts:
+                        ghost.frame = None
+
+                    # flash the walls on a delay
+                    if self.maze_flash_duration >= self.maze_flash_alternate:
+                        self.maze_flash_duration = 0
+                        self.maze_flash = not self.maze_flash
+
+        return True  # always draw no matter if game is paused or not.
+
+    def fast_forward(self, frames):
+        '''Play up to 'frames' frames of 'time_delta' without drawing them,
+        stopping early if the game ends. With 'macro_steps' set, as many
+        frames as nothing needs deciding in are played as one step of their
+        total time, otherwise each is a step of its own. Returns the frames
+        played.'''
+
+        time_delta = self.time_delta
+        played = 0
+        try:
+            while played < frames and self.playing:
+                count = 1
+                if self.macro_steps:
+                    count = self.macro_steps.frames(frames - played)
+                self.time_delta = time_delta * count
+                self.step()
+                played += count
+        finally:
+            self.time_delta = time_delta
+        return played
+
+    def update(self):
+        '''Update everything in the order it's drawn in, pellets first, then
+        Pac-Man, then the ghosts.'''
+
+        for pellet in self.power_pellets:
+            if pellet.alive():
+                pellet.update()
+        self.player.update()
+        if self.ghost_batch:
+            self.ghost_batch.update()
+        else:
+            for ghost in self.ghosts:
+                ghost.update()
+
+        if self.telemetry:
+            self.telemetry.tick(self.time_delta)
+
+    def reset_entities(self):
+        '''Reset the states and position of ghosts and player.'''
+
+        self.player.reset_status()
+        for ghost in self.ghosts:
+            ghost.reset_status()
+
+    def snapshot(self):
+        '''Capture the whole simulation state as nested tuples of plain values,
+        so that it's cheap to take and to keep many of. Restored by 'restore'.
+        Only state that changes during a level is captured, so a snapshot can
+        only be restored into the level it was taken from.'''
+
+        return ((self.pause_countdown, self.pre_game_countdown,
+                 self.manual_pause, self.bonus_timer, self.bonus_spawned,
+                 self.dots_remain, self.playing, self.maze_flash,
+                 self.maze_flash_duration, self.elapsed),
+                self.player.get_state(),
+                tuple(ghost.get_state() for ghost in self.ghosts),
+                len(self.pellet_list), tuple(self.eaten_pellets),
+                self.rng.getstate())
+
+    def restore(self, snapshot):
+        '''Put the simulation back to the state in a snapshot.'''
+
+        game_state, player_state, ghost_states, pellet_count, eaten, \
+            rng_state = snapshot
+
+        (self.pause_countdown, self.pre_game_countdown, self.manual_pause,
+         self.bonus_timer, self.bonus_spawned, self.dots_remain, self.playing,
+         self.maze_flash, self.maze_flash_duration, self.elapsed) = game_state
+
+        # the bonus fruit is the only pellet that comes and goes
+        pellet_list = self.pellet_list
+        while len(pellet_list) > pellet_count:
+            pellet_list.pop().kill()
+        while len(pellet_list) < pellet_count:
+            BonusFruit(self, self.bonus_coords.x, self.bonus_coords.y)
+
+        # both are logs of the same level, so only pellets after the point
+        # they differ need reviving or eating
+        current = self.eaten_pellets
+        same = 0
+        for same, (index, other) in enumerate(zip(current, eaten)):
+            if index != other:
+                break
+        else:
+            same = min(len(current), len(eaten))
+
+        for index in current[same:]:
+            if index < pellet_count:
+                self.pellets.add(pellet_list[index])
+        for index in eaten[same:]:
+            pellet_list[index].kill()
+        self.eaten_pellets = list(eaten)
+
+        self.player.set_state(player_state)
+        for ghost, state in zip(self.ghosts, ghost_states):
+            ghost.set_state(state)
+
+        self.rng.setstate(rng_state)
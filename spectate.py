@@ -0,0 +1,148 @@
+'''Watches a game streamed by another running game, drawn with the game's own
+maze, sprites and HUD.
+
+Run from the repository root with:
+    python spectate.py [address]
+where the address is host:port or the path of a Unix socket, the game's
+SPECTATOR_ADDRESS by default.'''
+
+import argparse
+import socket
+import sys
+
+import pygame as pg
+
+from settings import *
+from simulation import BonusFruit
+from stream import (HIDDEN, KEYFRAME, MANUAL_PAUSE, MAZE_FLASH,
+                    POWER_PELLETS_LIT, PRE_GAME_COUNTDOWN, StreamReader,
+                    decode_delta, decode_keyframe)
+
+
+def parse_address(text):
+    '''A (host, port) from 'host:port', otherwise the path of a Unix
+    socket.'''
+
+    host, colon, port = text.rpartition(':')
+    if colon and port.isdigit():
+        return host, int(port)
+    return text
+
+
+class Spectator:
+    '''Keeps a game that is never stepped showing what the stream says, so
+    that drawing it draws the streamed game.'''
+
+    def __init__(self, game, address):
+        self.game = game
+        self.reader = StreamReader()
+        # pellets the level has before any fruit appears
+        self.level_pellets = len(game.pellet_list)
+
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX)
+            self.socket.connect(address)
+        else:
+            self.socket = socket.create_connection(address)
+        self.socket.setblocking(False)
+
+    def receive(self):
+        '''Apply everything received since the last call. Returns False once
+        the game has hung up.'''
+
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except BlockingIOError:
+                return True
+            except ConnectionError:
+                return False
+            if not data:
+                return False
+
+            for kind, body in self.reader.feed(data):
+                if kind == KEYFRAME:
+                    self.apply_keyframe(*decode_keyframe(body))
+                else:
+                    self.apply(*decode_delta(body))
+
+    def apply_keyframe(self, hud, actors, bonuses, eaten):
+        '''Start the level over from its pellets, then apply everything.'''
+
+        game = self.game
+        pellet_list = game.pellet_list
+        while len(pellet_list) > self.level_pellets:
+            pellet_list.pop().kill()
+        for pellet in pellet_list:
+            game.pellets.add(pellet)
+        self.apply(hud, actors, bonuses, eaten)
+
+    def apply(self, hud, actors, bonuses, eaten):
+        game = self.game
+        player = game.player
+
+        if hud:
+            player.score, player.lives, flags, countdown = hud
+            game.maze_flash = bool(flags & MAZE_FLASH)
+            game.pre_game_countdown = bool(flags & PRE_GAME_COUNTDOWN)
+            game.manual_pause = bool(flags & MANUAL_PAUSE)
+            game.pause_countdown = countdown / 100
+            for pellet in game.power_pellets:
+                pellet.frame = 2 if flags & POWER_PELLETS_LIT else 1
+
+        everyone = [player] + game.ghosts
+        for index, (x, y, row, column, mode) in actors:
+            if index < len(everyone):
+                actor = everyone[index]
+                actor.rect.topleft = (x, y)
+                actor.frame = None if row == HIDDEN else (row, column)
+
+        for index, frame in bonuses:
+            if index == len(game.pellet_list):
+                BonusFruit(game, game.bonus_coords.x,
+                           game.bonus_coords.y).frame = frame
+
+        for index in eaten:
+            if index < len(game.pellet_list):
+                game.pellet_list[index].kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a game being played.")
+    parser.add_argument('address', nargs='?',
+                        help="host:port or the path of a Unix socket")
+    args = parser.parse_args()
+
+    address = (parse_address(args.address) if args.address
+               else SPECTATOR_ADDRESS)
+    if address is None:
+        sys.exit("No address given and SPECTATOR_ADDRESS isn't set")
+
+    from main import Game
+
+    # the level is loaded, but only ever drawn
+    game = Game()
+    pg.display.set_caption(f"{TITLE} - spectating")
+    try:
+        spectator = Spectator(game, address)
+    except OSError as error:
+        sys.exit(f"Couldn't connect to {address}: {error}")
+
+    watching = True
+    while watching:
+        game.clock.tick(FPS)
+        for event in pg.event.get():
+            if event.type == pg.QUIT or (event.type == pg.KEYUP
+                                         and event.key == pg.K_ESCAPE):
+                watching = False
+
+        if not spectator.receive():
+            print("The game has stopped streaming.")
+            watching = False
+        game.draw()
+
+    pg.quit()
+
+
+if __name__ == '__main__':
+    main()
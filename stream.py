@@ -0,0 +1,402 @@
+'''Streams a game to spectators as it's played, for spectate.py to draw.
+
+Only what changed since the last frame is sent: the position, frame and
+mode of each actor that changed, the pellets eaten and fruit that appeared,
+and the score, lives and the like when they changed. Every so often a
+keyframe with everything in it is sent instead, and one is sent as soon as
+a spectator joins, which is where they start watching from.'''
+
+import asyncio
+import math
+import struct
+import threading
+import time
+
+from settings import *
+
+# sent once when a spectator connects: magic and format version
+HELLO = struct.Struct('<4sH')
+MAGIC = b'PMST'
+VERSION = 1
+
+# every message: the length of what follows and its kind
+MESSAGE = struct.Struct('<IB')
+KEYFRAME = 1
+DELTA = 2
+
+# score, lives, flags below and the pause countdown in hundredths of a
+# second
+HUD = struct.Struct('<ibBh')
+MAZE_FLASH = 1
+PRE_GAME_COUNTDOWN = 2
+MANUAL_PAUSE = 4
+POWER_PELLETS_LIT = 8
+
+# each actor, Pac-Man then the ghosts: top left, frame row and column, and
+# flags for the mode it's in
+ACTOR = struct.Struct('<hhbbB')
+HIDDEN = -128  # frame row of an actor that isn't shown
+DYING = FRIGHTENED = 1
+CLEARED = EATEN = 2
+SCATTERING = 4
+
+COUNT = struct.Struct('<H')
+ACTOR_INDEX = struct.Struct('<H')
+# a pellet added after the level loaded, the bonus fruit: its index and frame
+BONUS = struct.Struct('<HB')
+
+# a delta's first byte, whether the HUD follows
+HUD_CHANGED = 1
+
+
+def hud_state(game):
+    '''The HUD fields of a game, as packed by 'HUD'.'''
+
+    flags = ((MAZE_FLASH if game.maze_flash else 0)
+             | (PRE_GAME_COUNTDOWN if game.pre_game_countdown else 0)
+             | (MANUAL_PAUSE if game.manual_pause else 0))
+    # the power pellets all flash together
+    if game.power_pellets and game.power_pellets[0].frame == 2:
+        flags |= POWER_PELLETS_LIT
+    # rounded up, so that what the HUD shows at a whole hundredth is kept
+    countdown = min(max(math.ceil(game.pause_countdown * 100), -32768),
+                    32767)
+    return (game.player.score, game.player.lives, flags, countdown)
+
+
+def actor_states(game):
+    '''The fields of each actor, as packed by 'ACTOR'.'''
+
+    player = game.player
+    states = [(player.rect.x, player.rect.y)
+              + ((HIDDEN, 0) if player.frame is None else player.frame)
+              + ((DYING if player.death_animation else 0)
+                 | (CLEARED if player.level_clear else 0),)]
+    for ghost in game.ghosts:
+        states.append((ghost.rect.x, ghost.rect.y)
+                      + ((HIDDEN, 0) if ghost.frame is None else ghost.frame)
+                      + ((FRIGHTENED if ghost.fright_mode else 0)
+                         | (EATEN if ghost.eaten_mode else 0)
+                         | (SCATTERING if ghost.scatter_mode else 0),))
+    return states
+
+
+def pack_indices(indices):
+    return COUNT.pack(len(indices)) + struct.pack(f'<{len(indices)}H',
+                                                  *indices)
+
+
+def pack_bonuses(pellets):
+    return COUNT.pack(len(pellets)) + b''.join(
+        BONUS.pack(pellet.index, pellet.frame) for pellet in pellets)
+
+
+class Broadcaster:
+    '''Serves a game to any number of spectators from an asyncio event loop
+    on a thread of its own.
+
+    'send_frame' is called by the game each frame it draws. It works out what
+    changed and encodes it once, however many are watching, and hands it to
+    the event loop, which writes it to each spectator without the game
+    waiting on any of them. With no one watching it does nothing at all. A
+    spectator too far behind skips to the next keyframe.
+
+    'address' is a (host, port) to listen on, or the path of a Unix socket.'''
+
+    def __init__(self, address=SPECTATOR_ADDRESS,
+                 keyframe_interval=SPECTATOR_KEYFRAME_INTERVAL,
+                 backlog=SPECTATOR_BACKLOG):
+        self.keyframe_interval = keyframe_interval
+        self.backlog_limit = backlog
+
+        # what spectators have been sent so far, kept by the game's thread
+        self.pellet_list = None
+        self.pellet_count = 0
+        self.eaten_count = 0
+        self.hud = None
+        self.actors = []
+        self.last_keyframe = -math.inf
+
+        # changed by the event loop only: who is watching, who is waiting
+        # for a keyframe to start from and who has fallen behind
+        self.clients = set()
+        self.joining = set()
+        self.lagging = set()
+        # set by the event loop for the game's thread to send a keyframe
+        self.keyframe_due = False
+
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes_encoded = 0
+        self.encode_time = 0
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        self.send_time = 0
+        self.spectators = 0
+
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self.serve, args=(address,),
+                                       daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error:
+            raise self.error
+
+    def serve(self, address):
+        '''Run the event loop until 'close' is called.'''
+
+        loop = self.loop
+        asyncio.set_event_loop(loop)
+        try:
+            if isinstance(address, str):
+                server = loop.run_until_complete(asyncio.start_unix_server(
+                    self.handle_spectator, address))
+            else:
+                server = loop.run_until_complete(asyncio.start_server(
+                    self.handle_spectator, *address))
+        except OSError as error:
+            self.error = error
+            self.started.set()
+            loop.close()
+            return
+
+        # the port actually listened on, if the address left it to the OS
+        self.address = server.sockets[0].getsockname()
+        self.started.set()
+        loop.run_forever()
+
+        server.close()
+        for writer in self.clients:
+            writer.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+    async def handle_spectator(self, reader, writer):
+        '''Have a keyframe sent for a new spectator to start from and keep
+        them until they hang up.'''
+
+        writer.write(HELLO.pack(MAGIC, VERSION))
+        self.joining.add(writer)
+        self.keyframe_due = True
+        self.spectators += 1
+
+        try:
+            # spectators have nothing to say, only hanging up is listened for
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            self.joining.discard(writer)
+            self.lagging.discard(writer)
+            writer.close()
+
+    def publish(self, kind, message):
+        '''Send a message to every spectator, on the event loop's thread.'''
+
+        start = time.thread_time()
+        if kind == KEYFRAME and self.joining:
+            self.clients |= self.joining
+            self.joining.clear()
+
+        for writer in self.clients:
+            backlog = writer.transport.get_write_buffer_size()
+            if writer in self.lagging:
+                # what was missed is in the keyframe
+                if kind != KEYFRAME or backlog > self.backlog_limit:
+                    continue
+                self.lagging.discard(writer)
+            elif backlog > self.backlog_limit:
+                self.lagging.add(writer)
+                continue
+            writer.write(message)
+            self.bytes_sent += len(message)
+            self.messages_sent += 1
+        self.send_time += time.thread_time() - start
+
+    def send_frame(self, game):
+        '''Send what changed in 'game' since the last frame sent. Called from
+        the game's thread.'''
+
+        if not self.clients and not self.joining:
+            return
+
+        start = time.thread_time()
+        now = time.perf_counter()
+        self.frames += 1
+        if (self.keyframe_due or game.pellet_list is not self.pellet_list
+                or len(game.pellet_list) < self.pellet_count
+                or len(game.eaten_pellets) < self.eaten_count
+                or len(game.ghosts) + 1 != len(self.actors)
+                or now - self.last_keyframe >= self.keyframe_interval):
+            kind = KEYFRAME
+            self.keyframe_due = False
+            body = self.encode_keyframe(game)
+            self.last_keyframe = now
+            self.keyframes += 1
+        else:
+            kind = DELTA
+            body = self.encode_delta(game)
+
+        if body is not None:
+            message = MESSAGE.pack(len(body), kind) + body
+            self.bytes_encoded += len(message)
+            self.loop.call_soon_threadsafe(self.publish, kind, message)
+        self.encode_time += time.thread_time() - start
+
+    def encode_keyframe(self, game):
+        '''Everything a spectator needs to draw the frame.'''
+
+        self.pellet_list = game.pellet_list
+        self.pellet_count = len(game.pellet_list)
+        self.eaten_count = len(game.eaten_pellets)
+        self.hud = hud_state(game)
+        self.actors = actor_states(game)
+
+        return (HUD.pack(*self.hud)
+                + COUNT.pack(len(self.actors))
+                + b''.join(ACTOR.pack(*actor) for actor in self.actors)
+                + pack_bonuses([pellet for pellet in game.pellet_list
+                                if pellet.bonus])
+                + pack_indices(game.eaten_pellets))
+
+    def encode_delta(self, game):
+        '''What changed since the last frame sent, or None if nothing did.'''
+
+        hud = hud_state(game)
+        actors = actor_states(game)
+        changed = [(index, actor) for index, (actor, last) in
+                   enumerate(zip(actors, self.actors)) if actor != last]
+        added = game.pellet_list[self.pellet_count:]
+        eaten = game.eaten_pellets[self.eaten_count:]
+        if hud == self.hud and not changed and not added and not eaten:
+            return None
+
+        body = [bytes((HUD_CHANGED if hud != self.hud else 0,))]
+        if hud != self.hud:
+            body.append(HUD.pack(*hud))
+        body.append(COUNT.pack(len(changed)))
+        for index, actor in changed:
+            body.append(ACTOR_INDEX.pack(index) + ACTOR.pack(*actor))
+        body.append(pack_bonuses(added))
+        body.append(pack_indices(eaten))
+
+        self.hud = hud
+        self.actors = actors
+        self.pellet_count = len(game.pellet_list)
+        self.eaten_count = len(game.eaten_pellets)
+        return b''.join(body)
+
+    def close(self):
+        '''Hang up on every spectator and stop serving.'''
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def report(self):
+        '''Summarise the bandwidth and time streaming took.'''
+
+        if not self.frames:
+            return "Spectators: no one watched."
+
+        per_frame = self.bytes_encoded / self.frames
+        return (f"Spectators: {self.spectators} watched {self.frames} "
+                f"frames, {per_frame:.0f} bytes a frame or "
+                f"{per_frame * FPS / 1024:.1f} KiB/s each at {FPS} FPS, "
+                f"{self.keyframes} keyframes. CPU time encoding "
+                f"{self.encode_time / self.frames * 1e6:.1f} us a frame and "
+                f"sending "
+                f"{self.send_time / max(self.messages_sent, 1) * 1e6:.1f} us "
+                f"a message to each spectator")
+
+
+class StreamReader:
+    '''Splits what a spectator receives back into messages and decodes
+    them.'''
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.greeted = False
+
+    def feed(self, data):
+        '''Add received bytes and return the (kind, body) of every message
+        now complete.'''
+
+        self.buffer += data
+        if not self.greeted:
+            if len(self.buffer) < HELLO.size:
+                return []
+            magic, version = HELLO.unpack_from(self.buffer)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"not a version {VERSION} game stream")
+            del self.buffer[:HELLO.size]
+            self.greeted = True
+
+        messages = []
+        offset = 0
+        buffer = self.buffer
+        while len(buffer) - offset >= MESSAGE.size:
+            length, kind = MESSAGE.unpack_from(buffer, offset)
+            end = offset + MESSAGE.size + length
+            if len(buffer) < end:
+                break
+            messages.append((kind, bytes(buffer[offset + MESSAGE.size:end])))
+            offset = end
+        del buffer[:offset]
+        return messages
+
+
+def unpack_indices(body, offset):
+    count, = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    return list(struct.unpack_from(f'<{count}H', body, offset)), \
+        offset + count * 2
+
+
+def unpack_bonuses(body, offset):
+    count, = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    bonuses = [BONUS.unpack_from(body, offset + index * BONUS.size)
+               for index in range(count)]
+    return bonuses, offset + count * BONUS.size
+
+
+def decode_keyframe(body):
+    '''The HUD, every actor as (index, fields), the bonus pellets and the
+    indices of the pellets eaten, from a keyframe.'''
+
+    hud = HUD.unpack_from(body)
+    offset = HUD.size
+    count, = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    actors = [(index, ACTOR.unpack_from(body, offset + index * ACTOR.size))
+              for index in range(count)]
+    offset += count * ACTOR.size
+    bonuses, offset = unpack_bonuses(body, offset)
+    eaten, offset = unpack_indices(body, offset)
+    return hud, actors, bonuses, eaten
+
+
+def decode_delta(body):
+    '''The same as 'decode_keyframe', but only what changed: the HUD is None
+    if it didn't and only actors that changed are listed.'''
+
+    offset = 1
+    hud = None
+    if body[0] & HUD_CHANGED:
+        hud = HUD.unpack_from(body, offset)
+        offset += HUD.size
+    count, = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    actors = []
+    for entry in range(count):
+        index, = ACTOR_INDEX.unpack_from(body, offset)
+        actors.append((index, ACTOR.unpack_from(body,
+                                                offset + ACTOR_INDEX.size)))
+        offset += ACTOR_INDEX.size + ACTOR.size
+    bonuses, offset = unpack_bonuses(body, offset)
+    eaten, offset = unpack_indices(body, offset)
+    return hud, actors, bonuses, eaten
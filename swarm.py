@@ -0,0 +1,313 @@
+import numpy as np
+
+from settings import *
+from simulation import (VECTOR_EPSILON, Clyde, Ghost, Inky, Pinky, Rect,
+                        Vector, tiles_under)
+
+# how each kind of ghost picks its chase target
+BLINKY = 0  # Pac-Man's position
+PINKY = 1  # four tiles ahead of Pac-Man
+INKY = 2  # twice the way from Blinky to two tiles ahead of Pac-Man
+CLYDE = 3  # Pac-Man, or Clyde's corner when Pac-Man is close
+PERSONALITIES = {Ghost: BLINKY, Pinky: PINKY, Inky: INKY, Clyde: CLYDE}
+# how many tiles ahead of Pac-Man each kind aims
+TILES_AHEAD = np.array([0, 4, 2, 0]) * TILESIZE
+
+# the tile each direction leads to, in the priority order of
+# 'Ghost.directions'
+DIRECTION_OFFSETS = ((0., -TILESIZE), (-TILESIZE, 0.), (0., TILESIZE),
+                     (TILESIZE, 0.))
+UP = 0
+
+
+def round_coordinates(values):
+    '''Round an array to whole pixels like 'round_coordinate' does, halves
+    away from zero.'''
+
+    whole = np.trunc(values)
+    fraction = values - whole
+    return whole + (fraction >= .5) - (fraction <= -.5)
+
+
+class GhostBatch:
+    '''Updates all of a simulation's ghosts together, with exactly the
+    outcome of updating them one at a time, for games with hundreds of them.
+
+    Each ghost still keeps its own mode timers and moves itself, but the
+    chase targets of every ghost at a tile are worked out in arrays per
+    personality, and every exit of every such ghost is scored at once, with
+    the walls looked up in a grid of tiles. Ties go to the first direction in
+    'Ghost.directions', as they do one at a time.
+
+    Ghosts that reach a tile part way through a frame turn there together
+    too, in rounds, for as long as any has time left to move on from one.
+    Frightened ghosts pick their way at random, so they're updated one at a
+    time to take their turns with the random numbers in the same order.
+    Blinky is updated on his own in between the others, as Inky aims by where
+    Blinky is after he has moved. With fewer than 'minimum' ghosts they're
+    all updated one at a time, which is quicker for so few.
+
+    'turns' counts the turns worked out together and 'single_turns' those
+    the ghosts made one at a time.'''
+
+    def __init__(self, game, minimum=BATCH_GHOSTS):
+        self.game = game
+        self.minimum = minimum
+
+        # rebuilt whenever the game's walls or no-up markers are replaced
+        self.walls = None
+        self.wall_grid = None
+        self.grid_origin = (0, 0)
+        self.noup_coords = None
+        self.noup_array = None
+
+        self.turns = 0
+        self.single_turns = 0
+
+    def update(self):
+        '''Update every ghost for the frame, in place of each 'Ghost.update'.'''
+
+        ghosts = self.game.ghosts
+        if len(ghosts) < self.minimum:
+            for ghost in ghosts:
+                self.update_ghost(ghost)
+            return
+
+        blinky = self.game.blinky
+        index = ghosts.index(blinky)
+        self.update_ghosts(ghosts[:index])
+        self.update_ghost(blinky)
+        self.update_ghosts(ghosts[index + 1:])
+
+    def update_ghost(self, ghost):
+        '''Update a ghost on its own, as 'Ghost.update' does.'''
+
+        ghost.check_current_state()
+        self.single_turns += ghost.travel()
+
+    def update_ghosts(self, ghosts):
+        '''The steps of 'Ghost.update', each taken for all of 'ghosts' before
+        the next. No ghost's update depends on another's, Blinky aside.'''
+
+        for ghost in ghosts:
+            ghost.check_current_state()
+
+        batched = []
+        for ghost in ghosts:
+            if ghost.fright_mode:
+                self.single_turns += ghost.travel()
+            else:
+                batched.append(ghost)
+
+        self.turn_ghosts([ghost for ghost in batched
+                          if not ghost.between_tiles])
+        moving = batched
+        times = [ghost.advance(self.game.time_delta) for ghost in moving]
+        # the ghosts that got to a tile with time to spare turn there
+        # together, and move on for the rest of the frame
+        while True:
+            arrived = [(ghost, time_left)
+                       for ghost, time_left in zip(moving, times) if time_left]
+            if not arrived:
+                break
+            moving = [ghost for ghost, time_left in arrived]
+            self.turn_ghosts(moving)
+            times = [ghost.advance(time_left) for ghost, time_left in arrived]
+
+        for ghost in batched:
+            ghost.end_frame()
+
+    def turn_ghosts(self, turning):
+        '''Have every ghost in 'turning', each on a tile, choose its way on
+        from it, as 'Ghost.turn' would.'''
+
+        if not turning:
+            return
+
+        self.set_targets([ghost for ghost in turning
+                          if not ghost.scatter_mode
+                          and not ghost.eaten_mode
+                          and not ghost.fright_mode])
+
+        for ghost in turning:
+            ghost.position, ghost.next_tile, ghost.last_tile = \
+                ghost.screen_wrap_check(ghost.position, ghost.direction,
+                                        ghost.next_tile, ghost.last_tile)
+
+        self.choose_directions(turning)
+        for ghost in turning:
+            ghost.leave_tile()
+        self.turns += len(turning)
+
+    def set_targets(self, chasing):
+        '''Set the chase targets of 'chasing', as 'set_target_tile' would.'''
+
+        if not chasing:
+            return
+
+        game = self.game
+        player = game.player
+        pacman_x, pacman_y = player.position
+        facing_x, facing_y = player.facing_direction
+        blinky_x, blinky_y = game.blinky.position
+
+        kinds = np.array([PERSONALITIES.get(type(ghost), -1)
+                          for ghost in chasing])
+        own = np.array([(ghost.position.x, ghost.position.y)
+                        for ghost in chasing])
+
+        ahead = TILES_AHEAD[kinds]
+        ahead_x = pacman_x + facing_x * ahead
+        ahead_y = pacman_y + facing_y * ahead
+        inky = kinds == INKY
+        target_x = np.where(inky, ahead_x + (ahead_x - blinky_x), ahead_x)
+        target_y = np.where(inky, ahead_y + (ahead_y - blinky_y), ahead_y)
+
+        # Clyde scatters when Pac-Man is within his radius
+        radii = np.array([ghost.scatter_radius if kind == CLYDE else -1
+                          for ghost, kind in zip(chasing, kinds.tolist())])
+        near = ((own[:, 0] - pacman_x)**2 + (own[:, 1] - pacman_y)**2
+                <= radii)
+
+        for ghost, kind, x, y, close in zip(chasing, kinds.tolist(),
+                                            target_x.tolist(),
+                                            target_y.tolist(), near.tolist()):
+            if kind == CLYDE:
+                # his target depends on how long he has been scattering for
+                if close:
+                    ghost.temp_scatter_mode = True
+                    ghost.target_tile = ghost.maze_corner
+                ghost.set_target_tile()
+            elif kind < 0:
+                ghost.check_distance_from_pacman()
+                ghost.set_target_tile()
+            else:
+                ghost.target_tile = Vector(x, y)
+
+    def update_wall_grid(self):
+        '''Mark every tile a wall overlaps. A rect exactly covering a tile
+        collides with a wall if and only if its tile is marked.'''
+
+        self.walls = self.game.walls
+        tiles = [tile for wall in self.walls
+                 if wall.rect.width > 0 and wall.rect.height > 0
+                 for tile in tiles_under(wall.rect)]
+        if not tiles:
+            self.wall_grid = np.zeros((0, 0), bool)
+            self.grid_origin = (0, 0)
+            return
+
+        columns, rows = (np.array(values) for values in zip(*tiles))
+        left, top = columns.min(), rows.min()
+        self.wall_grid = np.zeros((rows.max() - top + 1,
+                                   columns.max() - left + 1), bool)
+        self.wall_grid[rows - top, columns - left] = True
+        self.grid_origin = (left, top)
+
+    def collide_with_walls(self, x, y):
+        '''Whether tile sized rects at the whole pixel positions in arrays
+        'x' and 'y' overlap any wall, as 'collides_with_wall' tells.'''
+
+        if self.game.walls is not self.walls:
+            self.update_wall_grid()
+
+        grid = self.wall_grid
+        left, top = self.grid_origin
+        aligned = (x % TILESIZE == 0) & (y % TILESIZE == 0)
+        columns = (x // TILESIZE).astype(int) - left
+        rows = (y // TILESIZE).astype(int) - top
+        inside = (aligned & (columns >= 0) & (columns < grid.shape[1])
+                  & (rows >= 0) & (rows < grid.shape[0]))
+
+        walls = np.zeros(x.shape, bool)
+        walls[inside] = grid[rows[inside], columns[inside]]
+
+        # rects that don't line up with the tiles are checked the slow way
+        collides_with_wall = self.game.collides_with_wall
+        for index in zip(*np.nonzero(~aligned)):
+            walls[index] = collides_with_wall(
+                Rect(x[index], y[index], TILESIZE, TILESIZE))
+        return walls
+
+    def on_noup_tiles(self, x, y):
+        '''Which of the positions in arrays 'x' and 'y' are on a no-up tile.'''
+
+        noup_coords = self.game.noup_coords
+        if (noup_coords is not self.noup_coords
+                or len(noup_coords) != len(self.noup_array)):
+            self.noup_coords = noup_coords
+            self.noup_array = np.array([(coords.x, coords.y)
+                                        for coords in noup_coords]).reshape(-1, 2)
+
+        if not len(self.noup_array):
+            return np.zeros(x.shape, bool)
+        return ((np.abs(x[:, None] - self.noup_array[:, 0]) < VECTOR_EPSILON)
+                & (np.abs(y[:, None] - self.noup_array[:, 1]) < VECTOR_EPSILON)
+                ).any(axis=1)
+
+    def choose_directions(self, turning):
+        '''Pick the direction of each ghost in 'turning', as
+        'choose_direction' would.'''
+
+        state = np.array([(ghost.position.x, ghost.position.y,
+                           ghost.last_tile.x, ghost.last_tile.y,
+                           ghost.target_tile.x, ghost.target_tile.y,
+                           ghost.first_move, ghost.last_tile is ghost.position)
+                          for ghost in turning])
+        x, y, last_x, last_y, target_x, target_y, first_move, on_last = state.T
+        noup = self.on_noup_tiles(x, y)
+
+        # try each direction in turn from where the last one moved the ghost
+        # back to, the way 'choose_direction' does
+        candidate_x = np.empty((len(turning), 4))
+        candidate_y = np.empty((len(turning), 4))
+        for index, (offset_x, offset_y) in enumerate(DIRECTION_OFFSETS):
+            candidate_x[:, index] = x + offset_x
+            candidate_y[:, index] = y + offset_y
+            moved_back_x = candidate_x[:, index] - offset_x
+            moved_back_y = candidate_y[:, index] - offset_y
+            if index == UP:
+                moved_back_x = np.where(noup, x, moved_back_x)
+                moved_back_y = np.where(noup, y, moved_back_y)
+            x, y = moved_back_x, moved_back_y
+
+        # no U-turns, bar the first move, and no walking into walls. A last
+        # tile that is the position itself moves along with it
+        u_turns = ((((np.abs(candidate_x - last_x[:, None]) < VECTOR_EPSILON)
+                     & (np.abs(candidate_y - last_y[:, None]) < VECTOR_EPSILON))
+                    | (on_last == 1)[:, None])
+                   & (first_move == 0)[:, None])
+        rect_x = round_coordinates(candidate_x)
+        rect_y = round_coordinates(candidate_y)
+        valid = ~(u_turns | self.collide_with_walls(rect_x, rect_y))
+        valid[:, UP] &= ~noup
+
+        distances = ((rect_x + TILESIZE // 2 - target_x[:, None])**2
+                     + (rect_y + TILESIZE // 2 - target_y[:, None])**2)
+
+        # a distance of 0 stands for none yet, as in 'choose_direction'
+        shortest = np.zeros(len(turning))
+        choice = np.zeros(len(turning), int)
+        for index in range(4):
+            distance = distances[:, index]
+            better = valid[:, index] & ((distance < shortest) | (shortest == 0))
+            shortest = np.where(better, distance, shortest)
+            choice[better] = index
+
+        rng = self.game.rng
+        for ghost, index, options, moved_x, moved_y in zip(
+                turning, choice.tolist(), valid.tolist(), x.tolist(),
+                y.tolist()):
+            if ghost.fright_mode:
+                index = rng.choice([option for option, open_exit
+                                    in enumerate(options) if open_exit])
+                ghost.direction = ghost.directions[index]
+            else:
+                ghost.direction = ghost.directions[index]
+                ghost.frame_direction = index
+                ghost.frame = (ghost.frame_colour, index)
+            ghost.first_move = False
+
+            ghost.position.x = moved_x
+            ghost.position.y = moved_y
+            ghost.rect.topleft = ghost.position
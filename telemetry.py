@@ -0,0 +1,173 @@
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from settings import *
+
+GRID_COLUMNS = int(GRID_WIDTH)
+GRID_ROWS = int(GRID_HEIGHT)
+
+# the heat maps, in the order they are stored
+MAP_NAMES = (
+    'pacman_time',  # frames Pac-Man spent on each tile
+    'ghost_time',  # frames ghosts spent on each tile, eaten ones aside
+    'deaths',  # where Pac-Man was caught
+    'ghosts_eaten',  # where Pac-Man ate a frightened ghost
+    'pellets_eaten',  # how many pellets were eaten on each tile
+    'pellet_order',  # permille of the level's pellets already gone, summed
+)
+
+# file header: magic, format version, columns, rows and number of maps
+HEADER = struct.Struct('<4sHHHH')
+MAGIC = b'PMHM'
+VERSION = 1
+
+
+def tile_index(rect):
+    '''Index of the tile a rect's centre is in. Clamped so that actors half
+    way through the tunnel stay on the grid.'''
+
+    column = (rect.x + rect.width // 2) // TILESIZE
+    row = (rect.y + rect.height // 2) // TILESIZE
+    # cheaper than min and max, which matters at several calls a frame
+    if not 0 <= column < GRID_COLUMNS:
+        column = 0 if column < 0 else GRID_COLUMNS - 1
+    if not 0 <= row < GRID_ROWS:
+        row = 0 if row < 0 else GRID_ROWS - 1
+    return row * GRID_COLUMNS + column
+
+
+def read_heat_maps(filename):
+    '''Read a file written by 'Telemetry.flush'. Returns the columns, rows
+    and a dictionary of each map's counts, row by row.'''
+
+    with open(filename, 'rb') as file:
+        data = file.read()
+
+    magic, version, columns, rows, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or count != len(MAP_NAMES):
+        raise ValueError(f"{filename} isn't a version {VERSION} heat map file")
+
+    maps = {}
+    offset = HEADER.size
+    for name in MAP_NAMES:
+        counts = array('I')
+        counts.frombytes(data[offset:offset + columns * rows * counts.itemsize])
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        maps[name] = counts
+        offset += columns * rows * counts.itemsize
+
+    return columns, rows, maps
+
+
+class Telemetry:
+    '''Per-tile heat maps of where things happen, for level design and
+    balancing.
+
+    Pac-Man and the ghosts call the recording methods from 'check_collision'
+    and 'update'. Each one only adds to a counter in an array allocated up
+    front, so they cost a fixed fraction of a microsecond whatever the
+    counts. The counts carry on from those already in the file, so the maps
+    build up over many sessions, and are written out every
+    TELEMETRY_FLUSH_INTERVAL seconds of play and on 'flush'.
+
+    The writes during play are made by a thread of its own, which 'tick'
+    only wakes, so a frame never waits on the disk. The thread takes each
+    map in one go while the game carries on counting, so one map may be a
+    frame or so ahead of another, which the next write puts right. Keeping
+    within TELEMETRY_BUDGET per frame, writes included, is checked by
+    benchmarks.telemetry.'''
+
+    def __init__(self, filename=TELEMETRY_FILE):
+        self.filename = filename
+        self.tiles = GRID_COLUMNS * GRID_ROWS
+        self.maps = {name: array('I', [0]) * self.tiles
+                     for name in MAP_NAMES}
+        for name, counts in self.maps.items():
+            setattr(self, name, counts)
+
+        try:
+            columns, rows, maps = read_heat_maps(filename)
+        except (OSError, ValueError, struct.error):
+            pass  # nothing recorded yet, or from another maze size
+        else:
+            if (columns, rows) == (GRID_COLUMNS, GRID_ROWS) and all(
+                    len(counts) == self.tiles for counts in maps.values()):
+                for name, counts in maps.items():
+                    self.maps[name][:] = counts
+
+        self.since_flush = 0
+        # one write at a time, from the thread or from 'flush'
+        self.lock = threading.Lock()
+        self.write_due = threading.Event()
+        self.thread = threading.Thread(target=self.write_when_due,
+                                       name='telemetry', daemon=True)
+        self.thread.start()
+
+    def pacman_visit(self, rect):
+        self.pacman_time[tile_index(rect)] += 1
+
+    def ghost_visit(self, rect):
+        self.ghost_time[tile_index(rect)] += 1
+
+    def death(self, rect):
+        self.deaths[tile_index(rect)] += 1
+
+    def ghost_eaten(self, rect):
+        self.ghosts_eaten[tile_index(rect)] += 1
+
+    def pellet_eaten(self, rect, eaten, total):
+        '''A pellet was eaten with 'eaten' out of the level's 'total' already
+        gone before it.'''
+
+        index = tile_index(rect)
+        self.pellets_eaten[index] += 1
+        self.pellet_order[index] += eaten * 1000 // total
+
+    def tick(self, time_delta):
+        '''Called once a frame of play, to have the counts written out every
+        TELEMETRY_FLUSH_INTERVAL seconds.'''
+
+        self.since_flush += time_delta
+        if self.since_flush >= TELEMETRY_FLUSH_INTERVAL:
+            self.since_flush = 0
+            self.write_due.set()
+
+    def write_when_due(self):
+        '''Write the counts out each time 'tick' asks, on the thread.'''
+
+        while True:
+            self.write_due.wait()
+            self.write_due.clear()
+            try:
+                self.write()
+            except OSError as error:
+                # tried again at the next interval
+                print(f"Heat maps not written: {error}", file=sys.stderr)
+
+    def flush(self):
+        '''Write the counts out now, waiting for it, as on exit.'''
+
+        self.since_flush = 0
+        self.write()
+
+    def write(self):
+        '''Write the counts out. The file is replaced in one go, so it's
+        never left half written.'''
+
+        with self.lock:
+            temp_name = self.filename + '.tmp'
+            with open(temp_name, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, VERSION, GRID_COLUMNS,
+                                       GRID_ROWS, len(MAP_NAMES)))
+                for name in MAP_NAMES:
+                    # copied in one call, so the counts can't change part
+                    # way through a map
+                    counts = array('I', self.maps[name])
+                    if sys.byteorder == 'big':
+                        counts.byteswap()
+                    file.write(counts.tobytes())
+            os.replace(temp_name, self.filename)
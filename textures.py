@@ -0,0 +1,123 @@
+import pygame as pg
+
+# files
+from settings import *
+
+# textures kept before they're all let go and uploaded again as they're used,
+# so that ones uploaded from surfaces since thrown away don't pile up
+TEXTURE_CACHE_SIZE = 512
+
+
+class TextureScreen:
+    '''Draws the game with SDL's 2D renderer, for RENDER_BACKEND = 'texture'.
+
+    Stands in for the surface the game renders to, so the game draws to it
+    exactly as it draws to a surface. Each surface blitted to it, such as
+    the maze, a sprite's frame or a line of the HUD, is uploaded as a texture
+    the first time it's seen and copied by the renderer from then on. What
+    is blitted is only recorded, and drawn all at once by 'present', which
+    also lets the static screens present the same frame again. The renderer
+    scales the frame up to the window itself.'''
+
+    def __init__(self, size, driver=None, resizable=False):
+        ''''driver' is the name of the SDL render driver to use, such as
+        'software', or None for SDL's choice. Raises ImportError without
+        pygame's _sdl2 module, and ValueError or pygame.error when the
+        renderer can't be created.'''
+
+        # only this backend needs it, and not every pygame build has it
+        from pygame._sdl2 import video
+
+        index = -1  # SDL's choice
+        if driver:
+            names = [info.name for info in video.get_drivers()]
+            if driver not in names:
+                raise ValueError(f"no {driver} render driver, only "
+                                 f"{', '.join(names)}")
+            index = names.index(driver)
+
+        self.window = video.Window(TITLE, size, resizable=resizable)
+        try:
+            self.renderer = video.Renderer(self.window, index)
+        except video.error as error:
+            self.window.destroy()
+            # not pygame's own error, which it's raised as to callers
+            raise pg.error(str(error)) from error
+        self.renderer.logical_size = (WIDTH, HEIGHT)
+        self.driver = driver or 'default'
+        self.create_texture = video.Texture.from_surface
+
+        self.textures = {}  # by the surface uploaded from
+        self.background = pg.Color(BACKGROUND_COLOUR)
+        self.copies = []  # (texture, area, rect) in the order blitted
+
+    def get_size(self):
+        return (WIDTH, HEIGHT)
+
+    def get_rect(self, **kwargs):
+        return pg.Rect(0, 0, WIDTH, HEIGHT).move_to(**kwargs)
+
+    def texture(self, surface):
+        '''The texture uploaded from 'surface', uploading it if it hasn't
+        been yet. Surfaces are expected not to change once blitted.'''
+
+        texture = self.textures.get(surface)
+        if texture is None:
+            if len(self.textures) >= TEXTURE_CACHE_SIZE:
+                self.textures.clear()
+            texture = self.textures[surface] = self.create_texture(
+                self.renderer, surface)
+        return texture
+
+    def fill(self, colour):
+        '''Start a new frame, cleared to 'colour'. Only whole frames are
+        filled.'''
+
+        self.background = pg.Color(colour)
+        self.copies.clear()
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        '''Copy 'source' to 'dest' when the frame is presented. Returns the
+        rectangle it will cover.'''
+
+        if area is None:
+            rect = pg.Rect(dest[0], dest[1], *source.get_size())
+        else:
+            area = pg.Rect(area)
+            rect = pg.Rect(dest[0], dest[1], area.width, area.height)
+        # such as a line of text with nothing in it, which can't be a texture
+        if rect.width and rect.height:
+            self.copies.append((self.texture(source), area, rect))
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        '''Blit each (source, dest) pair in turn. There can be hundreds of
+        sprites, so this is 'blit' without anything they don't need.'''
+
+        textures = self.textures
+        append = self.copies.append
+        rects = []
+        for source, dest in blit_sequence:
+            texture = textures.get(source)
+            if texture is None:
+                texture = self.texture(source)
+            rect = pg.Rect(dest[0], dest[1], *source.get_size())
+            append((texture, None, rect))
+            if doreturn:
+                rects.append(rect)
+        return rects if doreturn else None
+
+    def present(self):
+        '''Draw everything blitted since the frame was filled and show it.'''
+
+        renderer = self.renderer
+        renderer.draw_color = self.background
+        renderer.clear()
+        for texture, area, rect in self.copies:
+            texture.draw(area, rect)
+        renderer.present()
+
+    def close(self):
+        self.textures.clear()
+        self.copies.clear()
+        self.window.destroy()
@@ -0,0 +1,193 @@
+import importlib
+import importlib.util
+import os
+import sys
+import time
+from os import path
+
+import pytmx
+
+import settings
+from settings import *
+from simulation import Vector, read_maze_objects
+
+# the maze's objects are split into these parts, each rebuilt on its own
+PELLET_OBJECTS = ('pellet_spawn', 'power_pellet_spawn')
+ACTOR_SPAWNS = {'player_spawn': 'player', 'blinky_spawn': 'blinky',
+                'pinky_spawn': 'pinky', 'inky_spawn': 'inky',
+                'clyde_spawn': 'clyde'}
+
+
+def maze_parts(maze, maze_objects):
+    '''Split a loaded maze and its objects into the parts that can be
+    rebuilt separately: wall objects, pellet objects, every other object and
+    the tile layers. Each part is a tuple of plain values so they can be
+    compared.'''
+
+    walls = []
+    pellets = []
+    markers = []
+    for tile_object in maze_objects:
+        entry = tuple(tile_object)
+        if tile_object.name == 'wall':
+            walls.append(entry)
+        elif tile_object.name in PELLET_OBJECTS:
+            pellets.append(entry)
+        else:
+            markers.append(entry)
+
+    tiles = tuple(tuple(map(tuple, layer.data))
+                  for layer in maze.tmxdata.visible_layers
+                  if isinstance(layer, pytmx.TiledTileLayer))
+
+    return {'walls': tuple(walls), 'pellets': tuple(pellets),
+            'markers': tuple(markers), 'tiles': tiles}
+
+
+class FileWatcher:
+    '''Watch mode for working on the maze and the settings while playing.
+
+    The maze file and settings.py are checked for a new modification time
+    every WATCH_INTERVAL seconds. When the maze changes it is loaded again
+    and only the parts that differ are rebuilt: the wall collision boxes, the
+    pellets, the maze images, or the spawn points and no-up tiles. When the
+    settings change they are reloaded and the new speeds and timers are given
+    to the actors straight away. Everything else, such as positions, modes,
+    timers and score, carries on as it was.
+
+    Settings that size the window or the maze only take effect on restart.'''
+
+    def __init__(self, game):
+        self.game = game
+        self.files = (game.maze_file, settings.__file__)
+        self.mtimes = {file: self.get_mtime(file) for file in self.files}
+        self.parts = maze_parts(game.maze, game.maze_objects)
+        self.next_poll = 0
+
+    def get_mtime(self, file):
+        '''Modification time of a file, or None while it can't be read, which
+        editors that save by replacing the file can cause for a moment.'''
+
+        try:
+            return os.stat(file).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self):
+        '''Rebuild whatever has changed since the last poll. Cheap to call
+        every frame, the files are only checked once per WATCH_INTERVAL.
+        Returns True if anything was rebuilt.'''
+
+        now = time.perf_counter()
+        if now < self.next_poll:
+            return False
+        self.next_poll = now + WATCH_INTERVAL
+
+        changed = False
+        for file in self.files:
+            mtime = self.get_mtime(file)
+            if mtime is None or mtime == self.mtimes[file]:
+                continue
+            self.mtimes[file] = mtime
+
+            start = time.perf_counter()
+            if file == settings.__file__:
+                rebuilt = self.reload_settings()
+            else:
+                rebuilt = self.reload_maze()
+            if rebuilt:
+                print(f"Reloaded {path.basename(file)} "
+                      f"({', '.join(rebuilt)}) in "
+                      f"{(time.perf_counter() - start) * 1000:.0f} ms")
+                changed = True
+
+        if changed and self.game.autopilot:
+            # the forward model is built from the walls, markers and speeds
+            self.game.autopilot.new_level()
+
+        return changed
+
+    def reload_settings(self):
+        '''Reload settings.py and hand the new values to every module that
+        star-imported them, then to the live game.'''
+
+        old_values = {name: value for name, value in vars(settings).items()
+                      if name.isupper()}
+        # the cached bytecode only records the source's mtime to the second,
+        # so two quick saves could otherwise load the stale one
+        try:
+            os.remove(importlib.util.cache_from_source(settings.__file__))
+        except OSError:
+            pass
+
+        try:
+            importlib.reload(settings)
+        except Exception as error:
+            print(f"Couldn't reload settings: {error!r}")
+            return []
+
+        # only update names that still hold the old setting, so that a module
+        # which has since given a name its own value keeps it
+        root = path.dirname(path.abspath(settings.__file__))
+        modules = [module for module in list(sys.modules.values())
+                   if getattr(module, '__file__', None)
+                   and path.dirname(path.abspath(module.__file__)) == root]
+        changed = []
+        for name, value in vars(settings).items():
+            if not name.isupper() or old_values.get(name) == value:
+                continue
+            changed.append(name)
+            for module in modules:
+                if (name in vars(module)
+                        and vars(module)[name] is old_values.get(name)):
+                    setattr(module, name, value)
+
+        if changed:
+            self.game.apply_settings()
+        return changed
+
+    def reload_maze(self):
+        '''Load the maze again and rebuild the parts of it that differ.'''
+
+        game = self.game
+        try:
+            # load it the same way as the maze it replaces
+            maze = type(game.maze)(game.maze_file)
+            maze_objects = read_maze_objects(game.maze_file)
+        except Exception as error:
+            # most likely caught half way through being saved
+            print(f"Couldn't load the maze: {error!r}")
+            return []
+
+        parts = maze_parts(maze, maze_objects)
+        changed = [name for name in parts if parts[name] != self.parts[name]]
+        self.parts = parts
+        game.maze = maze
+        game.maze_objects = maze_objects
+
+        if 'walls' in changed:
+            game.rebuild_walls()
+        if 'pellets' in changed:
+            game.rebuild_pellets()
+        if 'markers' in changed:
+            self.update_markers()
+        if 'tiles' in changed:
+            game.load_maze_images()
+
+        return changed
+
+    def update_markers(self):
+        '''Move the spawn points and no-up tiles. Actors keep going from
+        where they are and use their new spawn point when next reset.'''
+
+        game = self.game
+        game.noup_coords = []
+        for tile_object in game.maze_objects:
+            coords = Vector(tile_object.x, tile_object.y)
+            if tile_object.name == 'no_up':
+                game.noup_coords.append(coords)
+            elif tile_object.name == 'bonus_spawn':
+                game.bonus_coords = coords
+            elif tile_object.name in ACTOR_SPAWNS:
+                actor = getattr(game, ACTOR_SPAWNS[tile_object.name])
+                actor.ORIGINAL_POSITION = coords